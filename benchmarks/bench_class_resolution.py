@@ -0,0 +1,95 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+"""
+Micro-benchmark comparing the cost of resolving pluggable classes from their
+classpath on every construction (the behaviour prior to ClassRegistry) with
+looking them up in a ClassRegistry resolved once at start-up, along with the
+resulting per-Invocation construction cost.
+
+Run from the repository root with
+``PYTHONPATH=. python benchmarks/bench_class_resolution.py``
+"""
+import asyncio
+from argparse import ArgumentParser
+from timeit import timeit
+
+from opendna.autobahn.repl.output import PrintOutput, ERROR
+from opendna.autobahn.repl.utils import ClassRegistry, get_class
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+INVOCATION_CLASSPATH = 'opendna.autobahn.repl.rpc.Invocation'
+
+
+class IdleApplicationRunner(object):
+    """
+    Application runner that never connects, leaving the Session future
+    pending so that only object construction is measured
+    """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run(self, *args, **kwargs):
+        pass
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=20000)
+    args = parser.parse_args()
+    number = args.number
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    classes = ClassRegistry({'application_runner': IdleApplicationRunner})
+    output = PrintOutput(loop, ERROR)
+    manager = classes['connection_manager'](loop, classes, output)
+    session = manager('ws://localhost:8080/ws', 'realm1').session()
+    call = session.call('bench.procedure')
+
+    lookup_before = timeit(lambda: get_class(INVOCATION_CLASSPATH), number=number)
+    lookup_after = timeit(lambda: classes['invocation'], number=number)
+
+    def construct_before():
+        invocation_class = get_class(INVOCATION_CLASSPATH)
+        invocation_class(call=call, args=(1, 2, 3), kwargs={'x': None})
+
+    def construct_after():
+        classes['invocation'](call=call, args=(1, 2, 3), kwargs={'x': None})
+
+    construct_before_time = timeit(construct_before, number=number)
+    construct_after_time = timeit(construct_after, number=number)
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+    usec = 1e6 / number
+    print(f'{number} iterations')
+    print(f'class lookup:   before {lookup_before * usec:8.3f}us  '
+          f'after {lookup_after * usec:8.3f}us')
+    print(f'invocation:     before {construct_before_time * usec:8.3f}us  '
+          f'after {construct_after_time * usec:8.3f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+"""
+End-to-end benchmark suite driving the REPL object model (ConnectionManager,
+Connection.session and the Call, Publisher, Registration and Subscription
+managers) against the in-process loopback router. Reports calls/s,
+publications/s, events/s ingested by Subscription._handler_wrapper, hits/s
+through Registration._endpoint_wrapper, latency percentiles and peak RSS as
+JSON so that results can be compared across releases.
+
+Run from the repository root with
+``PYTHONPATH=. python benchmarks/bench_end_to_end.py [-o results.json]``
+"""
+import asyncio
+import json
+import platform
+import resource
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+
+from opendna.autobahn.repl.loopback import LoopbackApplicationRunner
+from opendna.autobahn.repl.output import PrintOutput, ERROR
+from opendna.autobahn.repl.stats import LatencyHistogram
+from opendna.autobahn.repl.utils import ClassRegistry
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+SCENARIOS = ('invocations', 'map', 'publications', 'stream')
+
+
+def latency_summary(histogram: LatencyHistogram) -> dict:
+    """
+    Summarise a LatencyHistogram as a dict of percentiles in milliseconds
+
+    :param histogram:
+    :return:
+    """
+    def ms(value):
+        return None if value is None else round(value * 1e3, 4)
+    return {
+        'count': histogram.count,
+        'mean_ms': ms(histogram.mean),
+        'min_ms': ms(histogram.min),
+        'p50_ms': ms(histogram.p50),
+        'p90_ms': ms(histogram.p90),
+        'p99_ms': ms(histogram.p99),
+        'p999_ms': ms(histogram.p999),
+        'max_ms': ms(histogram.max),
+    }
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of this process in bytes
+
+    :return:
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+class Counter(object):
+    """
+    Callable used as an end-point or handler which counts calls and resolves
+    a future once an expected number have been seen
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.count = 0
+        self.expected = None
+        self.future = None
+        self.finished_at = None
+
+    def expect(self, expected: int):
+        self.count = 0
+        self.expected = expected
+        self.future = self._loop.create_future()
+        self.finished_at = None
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+        if self.count == self.expected:
+            self.finished_at = perf_counter()
+            self.future.set_result(None)
+        return args[0] if args else None
+
+
+async def wait_for_count(get_count, expected: int):
+    while get_count() < expected:
+        await asyncio.sleep(0.001)
+
+
+class Bench(object):
+    def __init__(self, loop: asyncio.AbstractEventLoop, number: int,
+                 concurrency: int, payload: int, max_concurrency: int=None):
+        self._loop = loop
+        self._number = number
+        self._concurrency = concurrency
+        self._payload = 'x' * payload
+        classes = ClassRegistry({
+            'application_runner': LoopbackApplicationRunner
+        })
+        self._output = PrintOutput(loop, ERROR)
+        manager = classes['connection_manager'](loop, classes, self._output)
+        connection = manager('ws://loopback/bench', 'bench')
+        self._callee = connection.session()
+        self._caller = connection.session(max_concurrency=max_concurrency)
+        self._hits = Counter(loop)
+        self._events = Counter(loop)
+        self._registration = None
+        self._subscription = None
+
+    async def setup(self):
+        await asyncio.gather(self._callee.future, self._caller.future)
+        self._registration = self._callee.register('bench.echo', self._hits)
+        self._subscription = self._callee.subscribe(
+            'bench.topic', self._events, max_events=self._number
+        )
+        await wait_for_count(
+            lambda: (self._registration.registration is not None) +
+                    (self._subscription.subscription is not None),
+            2
+        )
+
+    def _result(self, name: str, elapsed: float, operations: int,
+                latency: LatencyHistogram, receiver: Counter,
+                started: float, errors: int) -> dict:
+        received = (receiver.finished_at or perf_counter()) - started
+        return {
+            'scenario': name,
+            'operations': operations,
+            'errors': errors,
+            'elapsed_s': round(elapsed, 6),
+            'operations_per_s': round(operations / elapsed, 1),
+            'received': receiver.count,
+            'received_per_s': round(receiver.count / received, 1),
+            'latency': latency_summary(latency),
+            'peak_rss_bytes': peak_rss(),
+        }
+
+    async def invocations(self) -> dict:
+        n = self._number
+        call = self._caller.call('bench.echo', keep='none')
+        self._hits.expect(n)
+        started = perf_counter()
+        for i in range(n):
+            call(i, self._payload)
+        await wait_for_count(lambda: call.stats.count, n)
+        elapsed = perf_counter() - started
+        return self._result(
+            'invocations', elapsed, n, call.stats.latency, self._hits, started,
+            call.stats.errors
+        )
+
+    async def map(self) -> dict:
+        n = self._number
+        call = self._caller.call('bench.echo', keep='none')
+        self._hits.expect(n)
+        started = perf_counter()
+        result = await call.amap(
+            ((i, self._payload) for i in range(n)),
+            concurrency=self._concurrency
+        )
+        elapsed = perf_counter() - started
+        return self._result(
+            'map', elapsed, n, call.stats.latency, self._hits, started,
+            result.failed
+        )
+
+    async def publications(self) -> dict:
+        n = self._number
+        publisher = self._caller.publish(
+            'bench.topic', keep='none', acknowledge=True
+        )
+        latency = LatencyHistogram()
+        self._events.expect(n)
+        started = perf_counter()
+        publications = [
+            (perf_counter(), publisher(i, self._payload)) for i in range(n)
+        ]
+        # Publications carry no timings of their own so latency here is
+        # measured from issue, including time spent queued on the session
+        for issued, publication in publications:
+            while publication.future is None:
+                await asyncio.sleep(0)
+            publication.future.add_done_callback(
+                lambda _, issued=issued: latency.record(perf_counter() - issued)
+            )
+        publications = [publication for _, publication in publications]
+        await asyncio.gather(*(p.future for p in publications))
+        elapsed = perf_counter() - started
+        await asyncio.wait_for(self._events.future, 10)
+        return self._result(
+            'publications', elapsed, n, latency, self._events, started,
+            sum(p.exception is not None for p in publications)
+        )
+
+    async def stream(self) -> dict:
+        n = self._number
+        publisher = self._caller.publish('bench.topic', keep='none')
+        self._events.expect(n)
+        started = perf_counter()
+        result = await publisher.astream(
+            ((i, self._payload) for i in range(n)), window=self._concurrency
+        )
+        elapsed = perf_counter() - started
+        await asyncio.wait_for(self._events.future, 10)
+        return self._result(
+            'stream', elapsed, n, result.latency, self._events, started,
+            len(result.exceptions)
+        )
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=20000)
+    parser.add_argument('-c', '--concurrency', type=int, default=100)
+    parser.add_argument('-m', '--max-concurrency', type=int, default=None,
+                        help='Session max_concurrency for the invocations and '
+                             'publications scenarios. Default: no limit')
+    parser.add_argument('-p', '--payload', type=int, default=64,
+                        help='Size of the string payload in bytes')
+    parser.add_argument('-s', '--scenario', action='append', choices=SCENARIOS,
+                        help='Scenario to run. May be repeated. Default: all')
+    parser.add_argument('-o', '--output', help='File to write JSON results to')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bench = Bench(
+        loop, args.number, args.concurrency, args.payload,
+        args.max_concurrency
+    )
+    loop.run_until_complete(bench.setup())
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'number': args.number,
+        'concurrency': args.concurrency,
+        'payload': args.payload,
+        'scenarios': [
+            loop.run_until_complete(getattr(bench, scenario)())
+            for scenario in args.scenario or SCENARIOS
+        ],
+        'peak_rss_bytes': peak_rss(),
+    }
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+"""
+Memory benchmark reporting the bytes retained per stored Subscription event,
+Registration hit, Invocation and Publication, measured with tracemalloc. The
+legacy_events scenario reproduces the storage used for events prior to
+compact records (a namedtuple with a datetime timestamp, stored under a
+generated name in three dicts) for comparison with the events scenario.
+The logged_events scenario stores events in an EventLog in a temporary
+directory, so only the in-memory indexes are retained.
+Arguments are a shared payload so that only per-record overhead is measured.
+
+Run from the repository root with
+``PYTHONPATH=. python benchmarks/bench_memory.py [-o results.json]``
+"""
+import asyncio
+import gc
+import json
+import platform
+import tracemalloc
+from tempfile import TemporaryDirectory
+from argparse import ArgumentParser
+from collections import namedtuple
+from datetime import datetime
+
+from opendna.autobahn.repl.loopback import LoopbackApplicationRunner
+from opendna.autobahn.repl.output import PrintOutput, ERROR
+from opendna.autobahn.repl.utils import ClassRegistry, generate_name
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+SCENARIOS = (
+    'legacy_events', 'events', 'logged_events', 'hits', 'invocations',
+    'publications'
+)
+PAYLOAD = 'x' * 64
+
+
+class IdleApplicationRunner(object):
+    """
+    Application runner that never connects, so that events and hits can be
+    stored by feeding Subscription and Registration wrappers directly
+    """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run(self, *args, **kwargs):
+        pass
+
+
+async def wait_until_idle(item):
+    while item.in_flight:
+        await asyncio.sleep(0.001)
+
+
+class Bench(object):
+    def __init__(self, loop: asyncio.AbstractEventLoop, number: int):
+        self._loop = loop
+        self._number = number
+        output = PrintOutput(loop, ERROR)
+        idle = ClassRegistry({'application_runner': IdleApplicationRunner})
+        self._idle = idle['connection_manager'](loop, idle, output)(
+            'ws://idle/bench', 'bench'
+        ).session()
+        loopback = ClassRegistry({
+            'application_runner': LoopbackApplicationRunner
+        })
+        connection = loopback['connection_manager'](loop, loopback, output)(
+            'ws://loopback/bench', 'bench'
+        )
+        self._callee = connection.session()
+        self._caller = connection.session()
+
+    async def setup(self):
+        await asyncio.gather(self._callee.future, self._caller.future)
+        await self._callee.application_session.register(
+            lambda *args, **kwargs: None, 'bench.echo'
+        )
+
+    async def measure(self, name: str, store) -> dict:
+        """
+        Bytes allocated and still retained after await store(number)
+        completes, per stored item
+
+        :param name:
+        :param store:
+        :return:
+        """
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        retained = await store(self._number)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del retained
+        return {
+            'scenario': name,
+            'number': self._number,
+            'bytes': after - before,
+            'bytes_per_item': round((after - before) / self._number, 1),
+        }
+
+    async def legacy_events(self) -> dict:
+        event_class = namedtuple('Event', ('timestamp', 'args', 'kwargs'))
+
+        async def store(number: int):
+            items, names__items, items__names = {}, {}, {}
+            for event_id in range(number):
+                name = generate_name()
+                while name in names__items:
+                    name = generate_name(length=len(name) + 1)
+                items[event_id] = event_class(
+                    datetime.now(), (PAYLOAD,), {}
+                )
+                items__names[event_id] = name
+                names__items[name] = event_id
+            return items, names__items, items__names
+        return await self.measure('legacy_events', store)
+
+    async def events(self) -> dict:
+        async def store(number: int):
+            subscription = self._idle.subscribe('bench.topic')
+            for _ in range(number):
+                await subscription._handler_wrapper(PAYLOAD)
+            return subscription
+        return await self.measure('events', store)
+
+    async def logged_events(self) -> dict:
+        async def store(number: int):
+            subscription = self._idle.subscribe(
+                'bench.topic', log_path=directory
+            )
+            for _ in range(number):
+                await subscription._handler_wrapper(PAYLOAD)
+            return subscription
+        with TemporaryDirectory() as directory:
+            return await self.measure('logged_events', store)
+
+    async def hits(self) -> dict:
+        async def store(number: int):
+            registration = self._idle.register('bench.procedure')
+            for _ in range(number):
+                await registration._endpoint_wrapper(PAYLOAD)
+            return registration
+        return await self.measure('hits', store)
+
+    async def invocations(self) -> dict:
+        async def store(number: int):
+            call = self._caller.call('bench.echo')
+            for index in range(number):
+                call(PAYLOAD)
+                if index % 1000 == 999:
+                    await wait_until_idle(call)
+            await wait_until_idle(call)
+            return call
+        return await self.measure('invocations', store)
+
+    async def publications(self) -> dict:
+        async def store(number: int):
+            publisher = self._caller.publish('bench.topic', acknowledge=True)
+            for index in range(number):
+                publisher(PAYLOAD)
+                if index % 1000 == 999:
+                    await wait_until_idle(publisher)
+            await wait_until_idle(publisher)
+            return publisher
+        return await self.measure('publications', store)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='Number of items stored per scenario')
+    parser.add_argument('-s', '--scenario', action='append', choices=SCENARIOS,
+                        help='Scenario to run. May be repeated. Default: all')
+    parser.add_argument('-o', '--output', help='File to write JSON results to')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bench = Bench(loop, args.number)
+    loop.run_until_complete(bench.setup())
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'number': args.number,
+        'scenarios': [
+            loop.run_until_complete(getattr(bench, scenario)())
+            for scenario in args.scenario or SCENARIOS
+        ],
+    }
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+"""
+Cold-start benchmark for the autobahn_python_repl entry point. Each scenario
+runs in a fresh interpreter, so the wall-clock times reported include
+interpreter start-up and every import, along with the peak RSS of the child
+process:
+
+* interpreter: An empty Python process, as a baseline
+* prompt: Everything start_repl does before PtPython draws its prompt
+* headless_session: ``autobahn_python_repl run`` of a script which opens a
+  session and waits for it to join, using the loopback router by default
+
+Run from the repository root with
+``PYTHONPATH=. python benchmarks/bench_startup.py [-o results.json]``
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+SCENARIOS = ('interpreter', 'prompt', 'headless_session')
+LOOPBACK_RUNNER = 'opendna.autobahn.repl.loopback.LoopbackApplicationRunner'
+
+REPORT_RSS = '''
+import json, resource, sys
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'peak_rss_bytes': rss if sys.platform == 'darwin' else rss * 1024
+}))
+'''
+
+PROMPT = '''
+import asyncio
+from opendna.autobahn.repl import repl
+from opendna.autobahn.repl.output import LEVELS
+from ptpython.repl import embed
+loop = asyncio.new_event_loop()
+classes = repl.ClassRegistry()
+output = classes['output'](loop, LEVELS['error'])
+manager = classes['connection_manager'](loop, classes, output)
+repl.namespace(manager)
+''' + REPORT_RSS
+
+SESSION = '''
+import sys
+session = connect(sys.argv[1], sys.argv[2]).session()
+await session.future
+''' + REPORT_RSS
+
+
+def measure(command: list, repeat: int) -> dict:
+    """
+    Run command repeat times, returning wall-clock times in seconds and the
+    largest peak RSS reported by the command
+
+    :param command:
+    :param repeat:
+    :return:
+    """
+    times = []
+    rss = None
+    for _ in range(repeat):
+        started = perf_counter()
+        completed = subprocess.run(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        times.append(perf_counter() - started)
+        if completed.returncode:
+            raise RuntimeError(
+                f'{command} exited with {completed.returncode}:\n'
+                f'{completed.stderr}'
+            )
+        lines = completed.stdout.strip().splitlines()
+        if lines:
+            rss = max(
+                rss or 0, json.loads(lines[-1]).get('peak_rss_bytes', 0)
+            )
+    return {
+        'min_s': round(min(times), 4),
+        'median_s': round(median(times), 4),
+        'max_s': round(max(times), 4),
+        'peak_rss_bytes': rss,
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-r', '--repeat', type=int, default=10,
+                        help='Number of processes started per scenario')
+    parser.add_argument('-s', '--scenario', action='append', choices=SCENARIOS,
+                        help='Scenario to run. May be repeated. Default: all')
+    parser.add_argument('--uri', default='ws://loopback/ws',
+                        help='Router URI for the headless_session scenario')
+    parser.add_argument('--realm', default='realm1',
+                        help='Realm for the headless_session scenario')
+    parser.add_argument('--application-runner', default=LOOPBACK_RUNNER,
+                        help='Application runner classpath for the '
+                             'headless_session scenario. Defaults to the '
+                             'loopback router')
+    parser.add_argument('-o', '--output', help='File to write JSON results to')
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        script = os.path.join(directory, 'session.py')
+        with open(script, 'w') as f:
+            f.write(SESSION)
+        commands = {
+            'interpreter': [sys.executable, '-c', REPORT_RSS],
+            'prompt': [sys.executable, '-c', PROMPT],
+            'headless_session': [
+                sys.executable, '-m', 'opendna.autobahn.repl.repl',
+                '--application-runner', args.application_runner,
+                '--output-level', 'error',
+                'run', script, args.uri, args.realm
+            ],
+        }
+        results = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'scenarios': {
+                scenario: measure(commands[scenario], args.repeat)
+                for scenario in args.scenario or SCENARIOS
+            },
+        }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -23,12 +23,15 @@
 ################################################################################
 import asyncio
 from asyncio import AbstractEventLoop
-from ssl import SSLContext
-from typing import Callable, Union, List, Iterable, Dict, Any, Optional
+from typing import Callable, Union, List, Iterable, Dict, Any, Optional, \
+    Mapping, Awaitable, Tuple, TYPE_CHECKING
 
-from autobahn.wamp import ComponentConfig, RegisterOptions
-from autobahn.wamp.types import IRegistration, ISubscription
-from autobahn.wamp.interfaces import ISerializer, ISession
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from ssl import SSLContext
+    from autobahn.wamp import ComponentConfig
+    from autobahn.wamp.types import IRegistration, ISubscription
+    from autobahn.wamp.interfaces import ISerializer, ISession
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
 
@@ -38,21 +41,35 @@ class AbstractConnectionManager(object):
     def loop(self) -> AbstractEventLoop:
         raise NotImplementedError
 
+    @property
+    def classes(self) -> Mapping[str, type]:
+        raise NotImplementedError
+
+    @property
+    def output(self):
+        raise NotImplementedError
+
+    @property
+    def executors(self) -> Mapping[str, 'Executor']:
+        raise NotImplementedError
+
     def __call__(self, *args, **kwargs) -> 'AbstractConnection':
         raise NotImplementedError
 
 
 class AbstractConnection(object):
     def __init__(self, manager: AbstractConnectionManager, uri: str, realm: str,
-                 extra: dict=None, serializers: List[ISerializer]=None,
-                 ssl: Union[SSLContext, bool]=None, proxy: dict=None,
+                 extra: dict=None, serializers: List['ISerializer']=None,
+                 ssl: Union['SSLContext', bool]=None, proxy: dict=None,
                  headers: dict=None):
         assert isinstance(manager, AbstractConnectionManager)
         assert isinstance(uri, str)
         assert realm is None or isinstance(realm, str)
         assert extra is None or isinstance(extra, dict)
         assert serializers is None or isinstance(serializers, list)
-        assert ssl is None or isinstance(ssl, (SSLContext, bool))
+        if ssl is not None and not isinstance(ssl, bool):
+            from ssl import SSLContext
+            assert isinstance(ssl, SSLContext)
         assert proxy is None or isinstance(proxy, dict)
         assert headers is None or isinstance(headers, dict)
         self._manager = manager
@@ -102,6 +119,12 @@ class AbstractConnection(object):
                 *, name: str=None) -> 'AbstractSession':
         raise NotImplementedError
 
+    def pool(self, size: int, dispatch: str='round_robin',
+             authmethods: Union[str, List[str]]='anonymous', authid: str=None,
+             authrole: str=None, authextra: dict=None, *, name: str=None,
+             **session_kwargs) -> 'AbstractSessionPool':
+        raise NotImplementedError
+
 
 class AbstractSession(object):
     def __init__(self,
@@ -163,10 +186,56 @@ class AbstractSession(object):
         return self._session_kwargs
 
     @property
-    def application_session(self) -> ISession:
+    def application_session(self) -> 'ISession':
         return self._application_session
 
-    def _factory(self, config: ComponentConfig):
+    def _factory(self, config: 'ComponentConfig'):
+        raise NotImplementedError
+
+    @property
+    def future(self) -> asyncio.Future:
+        raise NotImplementedError
+
+    @property
+    def queue_depth(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def in_flight(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def outstanding(self) -> List[asyncio.Future]:
+        raise NotImplementedError
+
+    @property
+    def failures(self) -> int:
+        raise NotImplementedError
+
+    def _enqueue(self, item, operation: Callable[[], Awaitable]):
+        raise NotImplementedError
+
+    def _welcomed(self, welcome):
+        raise NotImplementedError
+
+    def _joined(self, resumed: bool):
+        raise NotImplementedError
+
+    def _connection_lost(self, exception: Exception):
+        raise NotImplementedError
+
+    @property
+    def recorder(self):
+        raise NotImplementedError
+
+    def record(self, path: str):
+        raise NotImplementedError
+
+    def stop_recording(self):
+        raise NotImplementedError
+
+    def replay(self, path: str, speed: Optional[float]=1.0,
+               kinds: Iterable[str]=None, max_in_flight: int=None):
         raise NotImplementedError
 
     @property
@@ -186,6 +255,29 @@ class AbstractSession(object):
         raise NotImplementedError
 
 
+class AbstractSessionPool(object):
+    @property
+    def connection(self) -> AbstractConnection:
+        raise NotImplementedError
+
+    @property
+    def sessions(self) -> List[AbstractSession]:
+        raise NotImplementedError
+
+    @property
+    def dispatch(self) -> str:
+        raise NotImplementedError
+
+    def call(self, procedure: str, on_progress: Callable=None, *,
+             keep: str='all', max_invocations: int=None,
+             **call_options_kwargs):
+        raise NotImplementedError
+
+    def publish(self, topic: str, *, keep: str='all',
+                max_publications: int=None, **publish_options_kwargs):
+        raise NotImplementedError
+
+
 class AbstractCallManager(object):
     @property
     def session(self) -> AbstractSession:
@@ -206,12 +298,22 @@ class AbstractCall(object):
                  manager: AbstractCallManager,
                  procedure: str,
                  on_progress: Callable=None,
-                 call_options_kwargs: dict=None):
+                 call_options_kwargs: dict=None,
+                 keep: str='all',
+                 max_invocations: int=None,
+                 cache=None,
+                 coalesce: bool=False,
+                 store_progress: bool=True):
         assert isinstance(manager, AbstractCallManager)
         self._manager = manager
         self._procedure = procedure
         self._on_progress = on_progress
         self._call_options_kwargs = call_options_kwargs
+        self._keep = keep
+        self._max_invocations = max_invocations
+        self._cache = cache
+        self._coalesce = coalesce
+        self._store_progress = store_progress
 
     @property
     def manager(self) -> AbstractCallManager:
@@ -229,9 +331,52 @@ class AbstractCall(object):
     def call_options_kwargs(self) -> Optional[dict]:
         return self._call_options_kwargs
 
+    @property
+    def keep(self) -> str:
+        return self._keep
+
+    @property
+    def store_progress(self) -> bool:
+        return self._store_progress
+
+    @property
+    def max_invocations(self) -> Optional[int]:
+        return self._max_invocations
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def coalesce(self) -> bool:
+        return self._coalesce
+
+    @property
+    def coalesced(self) -> int:
+        raise NotImplementedError
+
+    def invalidate(self, *args, **kwargs) -> bool:
+        raise NotImplementedError
+
     def __call__(self, *args, **kwargs) -> 'AbstractInvocation':
         raise NotImplementedError
 
+    @property
+    def stats(self):
+        raise NotImplementedError
+
+    @property
+    def in_flight(self) -> int:
+        raise NotImplementedError
+
+    def map(self, iterable: Iterable, concurrency: int=10,
+            ordered: bool=True):
+        raise NotImplementedError
+
+    async def amap(self, iterable: Iterable, concurrency: int=10,
+                   ordered: bool=True):
+        raise NotImplementedError
+
     def __getitem__(self, item) -> 'AbstractInvocation':
         raise NotImplementedError
 
@@ -240,6 +385,8 @@ class AbstractCall(object):
 
 
 class AbstractInvocation(object):
+    __slots__ = ()
+
     def __init__(self,
                  call: 'AbstractCall',
                  args: Iterable,
@@ -249,11 +396,37 @@ class AbstractInvocation(object):
         self._kwargs = kwargs
         self._result = None
         self._exception = None
+        self._queued_at = None
+        self._sent_at = None
+        self._completed_at = None
+        self._cached = False
 
     @property
     def result(self) -> Optional[Any]:
         return self._result
 
+    @property
+    def cached(self) -> bool:
+        return self._cached
+
+    @property
+    def queued_at(self) -> Optional[float]:
+        return self._queued_at
+
+    @property
+    def sent_at(self) -> Optional[float]:
+        return self._sent_at
+
+    @property
+    def completed_at(self) -> Optional[float]:
+        return self._completed_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        if self._completed_at is None or self._sent_at is None:
+            return None
+        return self._completed_at - self._sent_at
+
     @property
     def progress(self) -> list:
         return self._progress
@@ -262,15 +435,33 @@ class AbstractInvocation(object):
     def exception(self) -> Optional[Exception]:
         return self._exception
 
-    def _default_on_progress(self, value):
+    @property
+    def progress_count(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def progress_bytes(self) -> int:
+        raise NotImplementedError
+
+    def progress_stream(self, maxsize: int=1000, overflow: str='drop_oldest'):
+        raise NotImplementedError
+
+    def _default_on_progress(self, *args, **kwargs):
         raise NotImplementedError
 
     async def _invoke(self):
         raise NotImplementedError
 
+    def _fail(self, exception: Exception):
+        raise NotImplementedError
+
     def __call__(self, *args, **kwargs):
         raise NotImplementedError
 
+    def sweep(self, *arg_ranges,
+              **kwarg_ranges) -> List['AbstractInvocation']:
+        raise NotImplementedError
+
 
 class AbstractRegistrationManager(object):
     @property
@@ -293,13 +484,21 @@ class AbstractRegistration(object):
                  procedure: str,
                  endpoint: Callable=None,
                  prefix: str=None,
-                 register_options_kwargs: dict=None):
+                 register_options_kwargs: dict=None,
+                 executor: Union[str, 'Executor']=None,
+                 max_concurrency: int=None,
+                 max_queue: int=None,
+                 reject_uri: str=None):
         assert isinstance(manager, AbstractRegistrationManager)
         self._manager = manager
         self._procedure = procedure
         self._endpoint = endpoint
         self._prefix = prefix
         self._register_options_kwargs = register_options_kwargs
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+        self._max_queue = max_queue
+        self._reject_uri = reject_uri
         self._registration = None
         self._exception = None
 
@@ -324,7 +523,23 @@ class AbstractRegistration(object):
         return self._register_options_kwargs
 
     @property
-    def registration(self) -> Optional[IRegistration]:
+    def executor(self) -> Union[str, 'Executor', None]:
+        return self._executor
+
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return self._max_concurrency
+
+    @property
+    def max_queue(self) -> Optional[int]:
+        return self._max_queue
+
+    @property
+    def reject_uri(self) -> Optional[str]:
+        return self._reject_uri
+
+    @property
+    def registration(self) -> Optional['IRegistration']:
         return self._registration
 
     @property
@@ -340,6 +555,9 @@ class AbstractRegistration(object):
     async def _register(self):
         raise NotImplementedError
 
+    def _fail(self, exception: Exception):
+        raise NotImplementedError
+
     async def _endpoint_wrapper(self, *args, **kwargs):
         raise NotImplementedError
 
@@ -366,11 +584,15 @@ class AbstractPublisher(object):
     def __init__(self,
                  manager: AbstractPublisherManager,
                  topic: str,
-                 publish_options_kwargs: dict=None):
+                 publish_options_kwargs: dict=None,
+                 keep: str='all',
+                 max_publications: int=None):
         assert isinstance(manager, AbstractPublisherManager)
         self._manager = manager
         self._topic = topic
         self._publish_options_kwargs = publish_options_kwargs
+        self._keep = keep
+        self._max_publications = max_publications
 
     @property
     def manager(self) -> AbstractPublisherManager:
@@ -384,9 +606,28 @@ class AbstractPublisher(object):
     def publish_options_kwargs(self) -> Optional[dict]:
         return self._publish_options_kwargs
 
+    @property
+    def keep(self) -> str:
+        return self._keep
+
+    @property
+    def max_publications(self) -> Optional[int]:
+        return self._max_publications
+
     def __call__(self, *args, **kwargs) -> 'AbstractPublication':
         raise NotImplementedError
 
+    @property
+    def in_flight(self) -> int:
+        raise NotImplementedError
+
+    def stream(self, iterable: Iterable, window: int=10, retry_policy=None):
+        raise NotImplementedError
+
+    async def astream(self, iterable: Iterable, window: int=10,
+                      retry_policy=None):
+        raise NotImplementedError
+
     def __getitem__(self, item) -> 'AbstractPublication':
         raise NotImplementedError
 
@@ -395,6 +636,8 @@ class AbstractPublisher(object):
 
 
 class AbstractPublication(object):
+    __slots__ = ()
+
     def __init__(self,
                  publisher: AbstractPublisher,
                  args: Iterable,
@@ -417,9 +660,16 @@ class AbstractPublication(object):
     async def _invoke(self):
         raise NotImplementedError
 
+    def _fail(self, exception: Exception):
+        raise NotImplementedError
+
     def __call__(self, *args, **kwargs) -> 'AbstractPublication':
         raise NotImplementedError
 
+    def sweep(self, *arg_ranges,
+              **kwarg_ranges) -> List['AbstractPublication']:
+        raise NotImplementedError
+
 
 class AbstractSubscriptionManager(object):
     @property
@@ -441,11 +691,23 @@ class AbstractSubscription(object):
                  manager: AbstractSubscriptionManager,
                  topic: str,
                  handler: Callable=None,
-                 subscribe_options_kwargs: dict=None):
+                 subscribe_options_kwargs: dict=None,
+                 max_events: int=None,
+                 max_age: float=None,
+                 indexes: Iterable[str]=(),
+                 log_path: str=None,
+                 executor: Union[str, 'Executor']=None,
+                 max_concurrency: int=None):
         self._manager = manager
         self._topic = topic
         self._handler = handler
         self._subscribe_options_kwargs = subscribe_options_kwargs
+        self._max_events = max_events
+        self._max_age = max_age
+        self._indexes = tuple(indexes)
+        self._log_path = log_path
+        self._executor = executor
+        self._max_concurrency = max_concurrency
         self._subscription = None
         self._exception = None
 
@@ -466,7 +728,31 @@ class AbstractSubscription(object):
         return self._subscribe_options_kwargs
 
     @property
-    def subscription(self) -> Optional[ISubscription]:
+    def max_events(self) -> Optional[int]:
+        return self._max_events
+
+    @property
+    def max_age(self) -> Optional[float]:
+        return self._max_age
+
+    @property
+    def indexes(self) -> Tuple[str, ...]:
+        return self._indexes
+
+    @property
+    def log_path(self) -> Optional[str]:
+        return self._log_path
+
+    @property
+    def executor(self) -> Union[str, 'Executor', None]:
+        return self._executor
+
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return self._max_concurrency
+
+    @property
+    def subscription(self) -> Optional['ISubscription']:
         return self._subscription
 
     @property
@@ -482,9 +768,30 @@ class AbstractSubscription(object):
     async def _subscribe(self):
         raise NotImplementedError
 
+    def _fail(self, exception: Exception):
+        raise NotImplementedError
+
     async def _handler_wrapper(self, *args, **kwargs):
         raise NotImplementedError
 
+    def stream(self, maxsize: int=1000, overflow: str='drop_oldest'):
+        raise NotImplementedError
+
+    def between(self, start=None, end=None) -> list:
+        raise NotImplementedError
+
+    def where(self, start=None, end=None, **conditions) -> list:
+        raise NotImplementedError
+
+    def count(self, start=None, end=None, **conditions) -> int:
+        raise NotImplementedError
+
+    def first(self, start=None, end=None, **conditions):
+        raise NotImplementedError
+
+    def last(self, start=None, end=None, **conditions):
+        raise NotImplementedError
+
     def __call__(self, *args, **kwargs):
         raise NotImplementedError
 
@@ -0,0 +1,176 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return dict, tuple(sorted(
+            ((_freeze(key), _freeze(item)) for key, item in value.items()),
+            key=lambda key_item: repr(key_item[0])
+        ))
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset, frozenset(_freeze(item) for item in value)
+    hash(value)
+    # Tagged with the type as equal values of different types, such as 1,
+    # 1.0 and True, hash the same and may not give the same result
+    return type(value), value
+
+
+def cache_key(procedure: str, args: Iterable,
+              kwargs: Dict[str, Any]) -> Optional[Hashable]:
+    """
+    Generate a stable, hashable key for a call to procedure with a set of
+    arguments. The procedure is part of the key so that an LRU may be shared
+    by several Calls. Lists, tuples, dicts and sets are converted recursively
+    into hashable equivalents and every value is tagged with its type, so
+    that 1, 1.0 and True give different keys. None is returned if the
+    arguments contain other unhashable values, in which case they cannot be
+    used as a key
+
+    :param procedure:
+    :param args:
+    :param kwargs:
+    :return:
+    """
+    try:
+        return procedure, _freeze(tuple(args)), _freeze(kwargs)
+    except TypeError:
+        return None
+
+
+class LRU(object):
+    """
+    Least-recently-used cache holding at most maxsize entries, each of which
+    expires ttl seconds after it was stored. A maxsize of None places no
+    limit on the number of entries and a ttl of None means entries never
+    expire
+    """
+    def __init__(self, maxsize: Optional[int]=1024, ttl: Optional[float]=None):
+        assert maxsize is None or maxsize > 0
+        assert ttl is None or ttl > 0
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def maxsize(self) -> Optional[int]:
+        return self._maxsize
+
+    @property
+    def ttl(self) -> Optional[float]:
+        return self._ttl
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else None
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up key, returning a (hit, value) tuple
+
+        :param key:
+        :return:
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires is None or expires > monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return True, value
+            del self._entries[key]
+        self._misses += 1
+        return False, None
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store value under key, evicting the least recently used entry if the
+        cache is full
+
+        :param key:
+        :param value:
+        :return:
+        """
+        entries = self._entries
+        entries[key] = (
+            None if self._ttl is None else monotonic() + self._ttl, value
+        )
+        entries.move_to_end(key)
+        if self._maxsize is not None and len(entries) > self._maxsize:
+            entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        Remove the entry for key
+
+        :param key:
+        :return: Whether an entry was removed
+        """
+        return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters
+
+        :return:
+        """
+        self._entries.clear()
+        self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __repr__(self):
+        return (
+            f'<LRU size={len(self._entries)} maxsize={self._maxsize} '
+            f'ttl={self._ttl} hits={self._hits} misses={self._misses} '
+            f'evictions={self._evictions}>'
+        )
@@ -22,32 +22,37 @@
 # SOFTWARE.
 ################################################################################
 from asyncio import AbstractEventLoop
-from os import environ
-from ssl import SSLContext
-from typing import List, Union, Iterable
+from typing import List, Union, Mapping, Dict, TYPE_CHECKING
 
-from autobahn.wamp.interfaces import ISerializer
 
 from opendna.autobahn.repl.abc import (
     AbstractConnection,
     AbstractConnectionManager,
-    AbstractSession
+    AbstractSession,
+    AbstractSessionPool
 )
 from opendna.autobahn.repl.mixins import ManagesNames, HasLoop, HasName, \
-    ManagesNamesProxy
-from opendna.autobahn.repl.utils import get_class
+    ManagesNamesProxy, HasClasses, HasOutput
+from opendna.autobahn.repl.executors import Executors
+from opendna.autobahn.repl.output import Output
+from opendna.autobahn.repl.utils import ClassRegistry, generate_name
+
+if TYPE_CHECKING:
+    from ssl import SSLContext
+    from autobahn.wamp.interfaces import ISerializer
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
 
 
-class Connection(HasName, ManagesNames, AbstractConnection):
+class Connection(HasName, HasClasses, HasOutput, ManagesNames,
+                 AbstractConnection):
     def __init__(self,
                  manager: Union[ManagesNames, AbstractConnectionManager],
                  uri: str,
                  realm: str,
                  extra: dict=None,
-                 serializers: List[ISerializer]=None,
-                 ssl: Union[SSLContext, bool]=None,
+                 serializers: List['ISerializer']=None,
+                 ssl: Union['SSLContext', bool]=None,
                  proxy: dict=None,
                  headers: dict=None):
         super().__init__(
@@ -55,16 +60,22 @@ class Connection(HasName, ManagesNames, AbstractConnection):
             serializers=serializers, ssl=ssl, proxy=proxy, headers=headers
         )
         self.__init_has_name__(manager)
+        self.__init_has_classes__(manager.classes)
+        self.__init_has_output__(manager.output)
         self.__init_manages_names__()
         self._sessions_proxy = ManagesNamesProxy(self)
+        self._pools = {}
 
     @property
     def sessions(self) -> ManagesNamesProxy:
         return self._sessions_proxy
 
+    @property
+    def pools(self) -> Dict[str, AbstractSessionPool]:
+        return self._pools
+
     def name_for(self, item):
-        session_class = get_class(environ['session'])
-        assert isinstance(item, session_class)
+        assert isinstance(item, self._classes['session'])
         return super().name_for(id(item))
 
     @ManagesNames.with_name
@@ -79,12 +90,11 @@ class Connection(HasName, ManagesNames, AbstractConnection):
                 *,
                 name: str=None,
                 **session_kwargs) -> AbstractSession:
-        print(
-            f'Generating {authmethods} session to {self._realm}@{self._uri} '
-            f'with name {name}'
+        self._output.info(
+            'Generating %s session to %s@%s with name %s',
+            authmethods, self._realm, self._uri, name
         )
-        session_class = get_class(environ['session'])
-        session = session_class(
+        session = self._classes['session'](
             connection=self, authmethods=authmethods, authid=authid,
             authrole=authrole, authextra=authextra, resumable=resumable,
             resume_session=resume_session, resume_token=resume_token,
@@ -96,6 +106,51 @@ class Connection(HasName, ManagesNames, AbstractConnection):
         self._names__items[name] = session_id
         return session
 
+    def pool(self,
+             size: int,
+             dispatch: str='round_robin',
+             authmethods: Union[str, List[str]]= 'anonymous',
+             authid: str=None,
+             authrole: str=None,
+             authextra: dict=None,
+             *,
+             name: str=None,
+             **session_kwargs) -> AbstractSessionPool:
+        """
+        Generates a pool of size Sessions opened with the same authentication
+        parameters, exposing call and publish methods which dispatch
+        operations across the members either round-robin or to the least
+        loaded member
+
+        :param size:
+        :param dispatch: Optional. 'round_robin' or 'least_loaded'
+        :param authmethods:
+        :param authid:
+        :param authrole:
+        :param authextra:
+        :param name: Optional. Keyword-only argument.
+        :return:
+        """
+        assert size > 0
+        name = generate_name(name)
+        while name in self._pools:
+            name = generate_name(length=len(name) + 1)
+        self._output.info(
+            'Generating pool of %s %s sessions to %s@%s with name %s',
+            size, authmethods, self._realm, self._uri, name
+        )
+        sessions = [
+            self.session(
+                authmethods, authid, authrole, authextra,
+                name=f'{name}_{index}', **session_kwargs
+            )
+            for index in range(size)
+        ]
+        pool = self._pools[name] = self._classes['session_pool'](
+            connection=self, sessions=sessions, dispatch=dispatch
+        )
+        return pool
+
     def __call__(self,
                  authmethods: Union[str, List[str]]= 'anonymous',
                  authid: str=None,
@@ -113,16 +168,29 @@ class Connection(HasName, ManagesNames, AbstractConnection):
         )
 
 
-class ConnectionManager(ManagesNames, HasLoop, AbstractConnectionManager):
+class ConnectionManager(ManagesNames, HasLoop, HasClasses, HasOutput,
+                        AbstractConnectionManager):
 
-    def __init__(self, loop: AbstractEventLoop):
+    def __init__(self, loop: AbstractEventLoop,
+                 classes: Mapping[str, type]=None,
+                 output: Output=None):
         super().__init__()
         self.__init_manages_names__()
         self.__init_has_loop__(loop)
+        self.__init_has_classes__(
+            ClassRegistry() if classes is None else classes
+        )
+        self.__init_has_output__(
+            self._classes['output'](loop) if output is None else output
+        )
+        self._executors = Executors()
+
+    @property
+    def executors(self) -> Executors:
+        return self._executors
 
     def name_for(self, item):
-        connection_class = get_class(environ['connection'])
-        assert isinstance(item, connection_class)
+        assert isinstance(item, self._classes['connection'])
         return super().name_for(id(item))
 
     @ManagesNames.with_name
@@ -137,9 +205,10 @@ class ConnectionManager(ManagesNames, HasLoop, AbstractConnectionManager):
                  *,
                  name: str=None) -> AbstractConnection:
 
-        print(f'Generating connection to {realm}@{uri} with name {name}')
-        connection_class = get_class(environ['connection'])
-        connection = connection_class(
+        self._output.info(
+            'Generating connection to %s@%s with name %s', realm, uri, name
+        )
+        connection = self._classes['connection'](
             manager=self, uri=uri, realm=realm, extra=extra,
             serializers=serializers, ssl=ssl, proxy=proxy, headers=headers
         )
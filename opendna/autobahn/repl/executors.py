@@ -0,0 +1,206 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+from concurrent.futures import Executor
+from time import perf_counter
+from typing import Callable, Union, Optional, Any, Tuple
+
+from opendna.autobahn.repl.stats import LatencyHistogram
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class Executors(dict):
+    """
+    Mapping of names to the executors shared by the Registrations and
+    Subscriptions of a ConnectionManager. The names 'thread' and 'process'
+    resolve to a ThreadPoolExecutor and a ProcessPoolExecutor with default
+    sizes created on first use, while other names must be added by the user,
+    e.g. executors['crunch'] = ProcessPoolExecutor(4)
+    """
+    DEFAULTS = ('thread', 'process')
+
+    def __missing__(self, key: str) -> Executor:
+        if key not in self.DEFAULTS:
+            raise KeyError(key)
+        # Imported on first use as process pools import multiprocessing
+        from concurrent.futures import ThreadPoolExecutor, \
+            ProcessPoolExecutor
+
+        executor_class = (
+            ThreadPoolExecutor if key == 'thread' else ProcessPoolExecutor
+        )
+        executor = self[key] = executor_class()
+        return executor
+
+    def resolve(self, executor: Union[str, Executor, None]) -> Optional[Executor]:
+        """
+        The executor named by executor if it is a string, otherwise executor
+        itself
+
+        :param executor:
+        :return:
+        """
+        if isinstance(executor, str):
+            return self[executor]
+        assert executor is None or isinstance(executor, Executor)
+        return executor
+
+    def shutdown(self, wait: bool=True):
+        """
+        Shut down and forget every executor
+
+        :param wait:
+        :return:
+        """
+        for executor in self.values():
+            executor.shutdown(wait=wait)
+        self.clear()
+
+
+def _timed(function: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    started = perf_counter()
+    result = function(*args, **kwargs)
+    return result, perf_counter() - started
+
+
+class Offload(object):
+    """
+    Runs the synchronous end-point or handler of a Registration or
+    Subscription in an executor rather than on the event loop, with at most
+    max_concurrency calls submitted to the executor at once. Calls beyond
+    that limit wait in a queue. Tracks the queue depth, the number of calls
+    running and a histogram of the time calls spend executing in the
+    executor. Functions and arguments given to process pools must be
+    picklable
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, executor: Executor,
+                 max_concurrency: int=None):
+        assert max_concurrency is None or (
+            isinstance(max_concurrency, int) and max_concurrency > 0
+        )
+        self._loop = loop
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+        self._semaphore = (
+            None if max_concurrency is None
+            else asyncio.Semaphore(max_concurrency)
+        )
+        self._queued = 0
+        self._peak_queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._execution = LatencyHistogram()
+
+    @property
+    def executor(self) -> Executor:
+        return self._executor
+
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return self._max_concurrency
+
+    @property
+    def queued(self) -> int:
+        """
+        Number of calls waiting for one of the max_concurrency slots
+        """
+        return self._queued
+
+    @property
+    def peak_queued(self) -> int:
+        return self._peak_queued
+
+    @property
+    def running(self) -> int:
+        """
+        Number of calls submitted to the executor and not yet completed
+        """
+        return self._running
+
+    @property
+    def completed(self) -> int:
+        """
+        Number of calls which returned successfully
+        """
+        return self._completed
+
+    @property
+    def failed(self) -> int:
+        """
+        Number of calls which raised an exception
+        """
+        return self._failed
+
+    @property
+    def execution(self) -> LatencyHistogram:
+        return self._execution
+
+    async def run(self, function: Callable, args: tuple, kwargs: dict) -> Any:
+        """
+        Call function with args and kwargs in the executor once a slot is
+        free and return its result
+
+        :param function:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        semaphore = self._semaphore
+        if semaphore is not None:
+            if semaphore.locked():
+                self._queued += 1
+                self._peak_queued = max(self._peak_queued, self._queued)
+                try:
+                    await semaphore.acquire()
+                finally:
+                    self._queued -= 1
+            else:
+                await semaphore.acquire()
+        self._running += 1
+        try:
+            result, elapsed = await self._loop.run_in_executor(
+                self._executor, _timed, function, args, kwargs
+            )
+            self._execution.record(elapsed)
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._running -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def __repr__(self):
+        return (
+            f'<Offload {type(self._executor).__name__} '
+            f'max_concurrency={self._max_concurrency} queued={self._queued} '
+            f'running={self._running} completed={self._completed} '
+            f'failed={self._failed} '
+            f'p50={(self._execution.p50 or 0) * 1000:.3f}ms '
+            f'p99={(self._execution.p99 or 0) * 1000:.3f}ms>'
+        )
@@ -0,0 +1,455 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+"""
+Minimal in-process WAMP router used as a stand-in for a real router (e.g.
+Crossbar) in tests and benchmarks. Select it by starting the REPL with::
+
+  --application-runner opendna.autobahn.repl.loopback.LoopbackApplicationRunner
+
+Sessions created by the LoopbackApplicationRunner are connected to a
+LoopbackRouter shared by every runner with the same URI and realm over a
+LoopbackTransport which hands WAMP messages between them on the event loop
+without touching the network. The router implements a WAMP broker and dealer
+supporting exact-match subscriptions and registrations, publisher exclusion,
+acknowledged publications, progressive call results and anonymous or ticket
+authentication (any ticket is accepted)
+"""
+import asyncio
+from itertools import count
+from typing import Dict, List, Optional, Callable
+
+import txaio
+txaio.use_asyncio()  # Must precede autobahn.wamp imports which bind txaio functions
+
+from autobahn.wamp import message, ComponentConfig
+from autobahn.wamp.exception import TransportLost
+from autobahn.wamp.role import RoleBrokerFeatures, RoleDealerFeatures
+from autobahn.wamp.serializer import JsonSerializer
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class LoopbackTransport(object):
+    """
+    In-memory WAMP transport connecting a client session to a LoopbackRouter.
+    Messages are delivered in order using loop.call_soon so that, as with a
+    network transport, sending never re-enters the receiving session. When
+    serializers are supplied messages are serialized and unserialized in
+    transit using the first of them, otherwise message objects are handed
+    over directly
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 router: 'LoopbackRouter', handler, serializers: list=None):
+        self._loop = loop
+        self._router = router
+        self._handler = handler
+        self._serialize = bool(serializers)
+        self._serializer = serializers[0] if serializers else JsonSerializer()
+        self._open = True
+        self.session_id = None
+
+    @property
+    def transport_details(self):
+        return None
+
+    @property
+    def is_closed(self) -> bool:
+        return not self._open
+
+    def isOpen(self) -> bool:
+        return self._open
+
+    def _transit(self, msg):
+        if self._serialize:
+            payload, is_binary = self._serializer.serialize(msg)
+            msg, = self._serializer.unserialize(payload, is_binary)
+        return msg
+
+    def send(self, msg):
+        """
+        Send a message from the client session to the router
+
+        :param msg:
+        :return:
+        """
+        if not self._open:
+            raise TransportLost()
+        self._loop.call_soon(self._router.process, self, self._transit(msg))
+
+    def deliver(self, msg):
+        """
+        Deliver a message from the router to the client session
+
+        :param msg:
+        :return:
+        """
+        if self._open:
+            self._loop.call_soon(self._deliver, self._transit(msg))
+
+    def _deliver(self, msg):
+        if self._open:
+            self._handler.onMessage(msg)
+
+    def close(self, was_clean: bool=True):
+        if self._open:
+            self._open = False
+            self._router.detach(self)
+            self._loop.call_soon(self._handler.onClose, was_clean)
+
+    def abort(self):
+        self.close(False)
+
+
+class LoopbackRouter(object):
+    """
+    Minimal in-process WAMP router for a single realm
+    """
+    _routers: Dict[tuple, 'LoopbackRouter'] = {}
+
+    ROLES = {
+        'broker': RoleBrokerFeatures(
+            publisher_exclusion=True, publisher_identification=True
+        ),
+        'dealer': RoleDealerFeatures(
+            progressive_call_results=True, caller_identification=True
+        )
+    }
+
+    def __init__(self, realm: str):
+        self._realm = realm
+        self._ids = count(1)
+        self._sessions: Dict[int, LoopbackTransport] = {}
+        self._topics: Dict[str, int] = {}
+        self._subscribers: Dict[int, List[LoopbackTransport]] = {}
+        self._subscription_topics: Dict[int, str] = {}
+        self._procedures: Dict[str, int] = {}
+        self._registrations: Dict[int, tuple] = {}
+        self._invocations: Dict[int, tuple] = {}
+        self._handlers: Dict[type, Callable] = {
+            message.Hello: self._hello,
+            message.Authenticate: self._authenticate,
+            message.Goodbye: self._goodbye,
+            message.Subscribe: self._subscribe,
+            message.Unsubscribe: self._unsubscribe,
+            message.Publish: self._publish,
+            message.Register: self._register,
+            message.Unregister: self._unregister,
+            message.Call: self._call,
+            message.Yield: self._yield,
+            message.Error: self._error,
+            message.Cancel: self._cancel,
+        }
+
+    @classmethod
+    def instance(cls, uri: str, realm: str) -> 'LoopbackRouter':
+        """
+        Return the router shared by every runner with the given URI and realm
+
+        :param uri:
+        :param realm:
+        :return:
+        """
+        router = cls._routers.get((uri, realm))
+        if router is None:
+            router = cls._routers[(uri, realm)] = cls(realm)
+        return router
+
+    @property
+    def realm(self) -> str:
+        return self._realm
+
+    @property
+    def sessions(self) -> int:
+        return len(self._sessions)
+
+    def restart(self):
+        """
+        Simulate a router restart by dropping the transport of every attached
+        session, discarding all subscriptions and registrations
+
+        :return:
+        """
+        for transport in list(self._sessions.values()):
+            transport.abort()
+
+    def attach(self, loop: asyncio.AbstractEventLoop, handler,
+               serializers: list=None) -> LoopbackTransport:
+        transport = LoopbackTransport(loop, self, handler, serializers)
+        handler.onOpen(transport)
+        return transport
+
+    def detach(self, transport: LoopbackTransport):
+        session_id = transport.session_id
+        if self._sessions.pop(session_id, None) is None:
+            return
+        for subscription_id, subscribers in list(self._subscribers.items()):
+            if transport in subscribers:
+                subscribers.remove(transport)
+                if not subscribers:
+                    self._drop_subscription(subscription_id)
+        for registration_id, (callee, _) in list(self._registrations.items()):
+            if callee is transport:
+                self._drop_registration(registration_id)
+        for invocation_id, (caller, request, callee, _) in list(
+                self._invocations.items()):
+            if callee is transport:
+                del self._invocations[invocation_id]
+                caller.deliver(message.Error(
+                    message.Call.MESSAGE_TYPE, request, 'wamp.error.canceled'
+                ))
+            elif caller is transport:
+                del self._invocations[invocation_id]
+
+    def process(self, transport: LoopbackTransport, msg):
+        if not transport.isOpen():
+            return
+        handler = self._handlers.get(type(msg))
+        if handler is None:
+            transport.deliver(message.Abort(
+                'wamp.error.protocol_violation',
+                f'Unsupported message {type(msg).__name__}'
+            ))
+            transport.close(False)
+            return
+        handler(transport, msg)
+
+    def _welcome(self, transport: LoopbackTransport, authid: Optional[str],
+                 authmethod: str, authrole: str):
+        session_id = next(self._ids)
+        transport.session_id = session_id
+        self._sessions[session_id] = transport
+        transport.deliver(message.Welcome(
+            session_id, self.ROLES, realm=self._realm,
+            authid=authid or f'loopback-{session_id}', authrole=authrole,
+            authmethod=authmethod, authprovider='loopback'
+        ))
+
+    def _hello(self, transport: LoopbackTransport, msg: message.Hello):
+        authmethods = msg.authmethods or ['anonymous']
+        transport.authid = msg.authid
+        if 'ticket' in authmethods:
+            transport.deliver(message.Challenge('ticket', {}))
+        elif 'anonymous' in authmethods:
+            self._welcome(transport, None, 'anonymous', 'anonymous')
+        else:
+            transport.deliver(message.Abort(
+                'wamp.error.no_auth_method',
+                f'Loopback router does not support {authmethods}'
+            ))
+            transport.close(False)
+
+    def _authenticate(self, transport: LoopbackTransport,
+                      msg: message.Authenticate):
+        if msg.signature:
+            self._welcome(transport, transport.authid, 'ticket', 'user')
+        else:
+            transport.deliver(message.Abort(
+                'wamp.error.not_authorized', 'Empty ticket'
+            ))
+            transport.close(False)
+
+    def _goodbye(self, transport: LoopbackTransport, msg: message.Goodbye):
+        transport.deliver(message.Goodbye('wamp.close.goodbye_and_out'))
+
+    def _subscribe(self, transport: LoopbackTransport, msg: message.Subscribe):
+        if msg.match not in (None, 'exact'):
+            transport.deliver(message.Error(
+                message.Subscribe.MESSAGE_TYPE, msg.request,
+                'wamp.error.invalid_argument',
+                [f'Loopback router does not support {msg.match} matching']
+            ))
+            return
+        subscription_id = self._topics.get(msg.topic)
+        if subscription_id is None:
+            subscription_id = self._topics[msg.topic] = next(self._ids)
+            self._subscribers[subscription_id] = []
+            self._subscription_topics[subscription_id] = msg.topic
+        subscribers = self._subscribers[subscription_id]
+        if transport not in subscribers:
+            subscribers.append(transport)
+        transport.deliver(message.Subscribed(msg.request, subscription_id))
+
+    def _drop_subscription(self, subscription_id: int):
+        del self._subscribers[subscription_id]
+        del self._topics[self._subscription_topics.pop(subscription_id)]
+
+    def _unsubscribe(self, transport: LoopbackTransport,
+                     msg: message.Unsubscribe):
+        subscribers = self._subscribers.get(msg.subscription, ())
+        if transport not in subscribers:
+            transport.deliver(message.Error(
+                message.Unsubscribe.MESSAGE_TYPE, msg.request,
+                'wamp.error.no_such_subscription'
+            ))
+            return
+        subscribers.remove(transport)
+        if not subscribers:
+            self._drop_subscription(msg.subscription)
+        transport.deliver(message.Unsubscribed(msg.request))
+
+    def _publish(self, transport: LoopbackTransport, msg: message.Publish):
+        publication_id = next(self._ids)
+        subscription_id = self._topics.get(msg.topic)
+        if subscription_id is not None:
+            exclude_me = msg.exclude_me is None or msg.exclude_me
+            for subscriber in self._subscribers[subscription_id]:
+                if exclude_me and subscriber is transport:
+                    continue
+                subscriber.deliver(message.Event(
+                    subscription_id, publication_id, args=msg.args,
+                    kwargs=msg.kwargs
+                ))
+        if msg.acknowledge:
+            transport.deliver(message.Published(msg.request, publication_id))
+
+    def _register(self, transport: LoopbackTransport, msg: message.Register):
+        if msg.procedure in self._procedures:
+            transport.deliver(message.Error(
+                message.Register.MESSAGE_TYPE, msg.request,
+                'wamp.error.procedure_already_exists'
+            ))
+            return
+        registration_id = self._procedures[msg.procedure] = next(self._ids)
+        self._registrations[registration_id] = (transport, msg.procedure)
+        transport.deliver(message.Registered(msg.request, registration_id))
+
+    def _drop_registration(self, registration_id: int):
+        _, procedure = self._registrations.pop(registration_id)
+        del self._procedures[procedure]
+
+    def _unregister(self, transport: LoopbackTransport,
+                    msg: message.Unregister):
+        registration = self._registrations.get(msg.registration)
+        if registration is None or registration[0] is not transport:
+            transport.deliver(message.Error(
+                message.Unregister.MESSAGE_TYPE, msg.request,
+                'wamp.error.no_such_registration'
+            ))
+            return
+        self._drop_registration(msg.registration)
+        transport.deliver(message.Unregistered(msg.request))
+
+    def _call(self, transport: LoopbackTransport, msg: message.Call):
+        registration_id = self._procedures.get(msg.procedure)
+        if registration_id is None:
+            transport.deliver(message.Error(
+                message.Call.MESSAGE_TYPE, msg.request,
+                'wamp.error.no_such_procedure'
+            ))
+            return
+        callee, _ = self._registrations[registration_id]
+        invocation_id = next(self._ids)
+        self._invocations[invocation_id] = (
+            transport, msg.request, callee, msg.receive_progress
+        )
+        callee.deliver(message.Invocation(
+            invocation_id, registration_id, args=msg.args, kwargs=msg.kwargs,
+            receive_progress=msg.receive_progress, timeout=msg.timeout
+        ))
+
+    def _yield(self, transport: LoopbackTransport, msg: message.Yield):
+        if msg.progress:
+            invocation = self._invocations.get(msg.request)
+            if invocation is None:
+                return
+            caller, request, _, receive_progress = invocation
+            if receive_progress:
+                caller.deliver(message.Result(
+                    request, args=msg.args, kwargs=msg.kwargs, progress=True
+                ))
+            return
+        invocation = self._invocations.pop(msg.request, None)
+        if invocation is not None:
+            caller, request, _, _ = invocation
+            caller.deliver(
+                message.Result(request, args=msg.args, kwargs=msg.kwargs)
+            )
+
+    def _error(self, transport: LoopbackTransport, msg: message.Error):
+        if msg.request_type != message.Invocation.MESSAGE_TYPE:
+            return
+        invocation = self._invocations.pop(msg.request, None)
+        if invocation is not None:
+            caller, request, _, _ = invocation
+            caller.deliver(message.Error(
+                message.Call.MESSAGE_TYPE, request, msg.error,
+                args=msg.args, kwargs=msg.kwargs
+            ))
+
+    def _cancel(self, transport: LoopbackTransport, msg: message.Cancel):
+        for invocation_id, (caller, request, callee, _) in list(
+                self._invocations.items()):
+            if caller is transport and request == msg.request:
+                del self._invocations[invocation_id]
+                callee.deliver(message.Interrupt(invocation_id, msg.mode))
+                transport.deliver(message.Error(
+                    message.Call.MESSAGE_TYPE, request, 'wamp.error.canceled'
+                ))
+
+
+class LoopbackApplicationRunner(object):
+    """
+    Drop-in replacement for autobahn.asyncio.wamp.ApplicationRunner which
+    connects sessions to the in-process LoopbackRouter for its URI and realm
+    instead of a WAMP router on the network
+    """
+    def __init__(self, url: str, realm: str=None, extra: dict=None,
+                 serializers: list=None, ssl=None, proxy: dict=None,
+                 headers: dict=None):
+        self.url = url
+        self.realm = realm
+        self.extra = extra or dict()
+        self.serializers = serializers
+        self.ssl = ssl
+        self.proxy = proxy
+        self.headers = headers
+
+    async def _connect(self, make: Callable):
+        loop = asyncio.get_event_loop()
+        txaio.config.loop = loop
+        session = make(ComponentConfig(self.realm, self.extra))
+        router = LoopbackRouter.instance(self.url, self.realm)
+        transport = router.attach(loop, session, self.serializers)
+        return transport, session
+
+    def run(self, make: Callable, start_loop: bool=True,
+            log_level: str='info'):
+        """
+        Connect the session produced by make to the router. When start_loop
+        is False the connection coroutine is returned for the caller to
+        schedule, otherwise the event loop is run until interrupted
+
+        :param make:
+        :param start_loop:
+        :param log_level:
+        :return:
+        """
+        if not start_loop:
+            return self._connect(make)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(self._connect(make))
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
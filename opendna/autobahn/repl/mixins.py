@@ -21,19 +21,30 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 ################################################################################
+from array import array
 from asyncio import AbstractEventLoop, Future
-from typing import Optional, Iterable
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from itertools import count
+from time import monotonic, perf_counter
+from weakref import WeakKeyDictionary, WeakValueDictionary
+from typing import Optional, Iterable, Iterator, Mapping, Hashable, Any, \
+    List, Sequence, Tuple, Union
 
 from decorator import decorator
 
 from opendna.autobahn.repl.abc import AbstractSession
-from opendna.autobahn.repl.utils import generate_name
+from opendna.autobahn.repl.output import Output
+from opendna.autobahn.repl.utils import generate_name, RingBuffer, Received
 
 
 class HasFuture(object):
     """
     Mix-in providing read-only access to an asyncio.Future instance
     """
+    __slots__ = ()
+
     def __init_has_future__(self, future: Future=None):
         assert isinstance(future, (type(None), Future))
         self._future = future
@@ -43,6 +54,64 @@ class HasFuture(object):
         return self._future
 
 
+class HasClasses(object):
+    """
+    Mix-in providing read-only access to the mapping of class destinations to
+    the classes resolved for them at start-up
+    """
+    def __init_has_classes__(self, classes: Mapping[str, type]):
+        self._classes = classes
+
+    @property
+    def classes(self) -> Mapping[str, type]:
+        return self._classes
+
+
+class HasOutput(object):
+    """
+    Mix-in providing read-only access to the Output sink used to report on
+    REPL activity
+    """
+    __slots__ = ()
+
+    def __init_has_output__(self, output: Output):
+        self._output = output
+
+    @property
+    def output(self) -> Output:
+        return self._output
+
+
+class HasThroughput(object):
+    """
+    Mix-in providing elapsed time and throughput for bulk operations. Classes
+    using it increment _count as operations complete and set _started and
+    _finished using time.perf_counter
+    """
+    def __init_has_throughput__(self):
+        self._count = 0
+        self._started = None
+        self._finished = None
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        if self._started is None:
+            return None
+        return (self._finished or perf_counter()) - self._started
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """
+        Completed operations per second
+        """
+        elapsed = self.elapsed
+        return self._count / elapsed if elapsed else None
+
+
 class HasLoop(object):
     """
     Mix-in providing read-only access to an AbstractEventLoop instance
@@ -110,10 +179,371 @@ class ManagesNames(object, metaclass=ManagesNamesMeta):
     def __contains__(self, item) -> bool:
         return item in self._items or item in self._names__items
 
+    def __iter__(self) -> Iterator:
+        return iter(list(self._items.values()))
+
     def __dir__(self) -> Iterable[str]:
         return self._names__items.keys()
 
 
+class NamesSequentially(object):
+    """
+    Mix-in for classes using the ManagesNames mix-in which store large numbers
+    of records, such as events and invocations. Items are keyed by sequential
+    integer ids and named by rendering the id after NAME_PREFIX when a name is
+    required, so no per-item name strings or name indexes are stored. Items
+    can be accessed by either name or id
+    """
+    NAME_PREFIX = 'n'
+
+    def _name_of(self, item_id: int) -> str:
+        return f'{self.NAME_PREFIX}{item_id}'
+
+    def _id_of(self, item: Hashable) -> Hashable:
+        """
+        The id named by item if it is a name rendered by _name_of, otherwise
+        item itself
+
+        :param item:
+        :return:
+        """
+        prefix = self.NAME_PREFIX
+        if isinstance(item, str) and item.startswith(prefix):
+            digits = item[len(prefix):]
+            if digits.isdigit():
+                return int(digits)
+        return item
+
+    def name_for(self, item_id: int) -> str:
+        return self._name_of(item_id)
+
+    def __getitem__(self, item):
+        return self._items[self._id_of(item)]
+
+    def __contains__(self, item) -> bool:
+        return self._id_of(item) in self._items
+
+    def __dir__(self) -> Iterable[str]:
+        return [self._name_of(item_id) for item_id in self._items]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._items.values())
+
+
+class RetainsItems(object):
+    """
+    Mix-in for classes using the ManagesNames mix-in which bounds the items
+    they store. Items are tracked in insertion order, using a fixed-capacity
+    RingBuffer when max_items is set, and the oldest items are evicted from
+    ManagesNames storage and name indexes once more than max_items are stored
+    or they are older than max_age seconds. Retention is unbounded when
+    neither limit is set
+    """
+    def __init_retains_items__(self, max_items: int=None,
+                               max_age: float=None):
+        assert max_items is None or (isinstance(max_items, int) and max_items > 0)
+        assert max_age is None or max_age > 0
+        self._retain_max_items = max_items
+        self._retain_max_age = max_age
+        self._retain_bounded = max_items is not None or max_age is not None
+        self._retained = deque() if max_items is None else RingBuffer(max_items)
+
+    def _retain(self, item_id: Hashable, name: Optional[str], item: Any):
+        """
+        Store item under item_id and name, evicting items as required by the
+        retention policy. Items of classes using the NamesSequentially mix-in
+        are stored without a name
+
+        :param item_id:
+        :param name:
+        :param item:
+        :return:
+        """
+        if self._retain_bounded:
+            self._bound(item_id, monotonic())
+        self._items[item_id] = item
+        if name is not None:
+            self._items__names[item_id] = name
+            self._names__items[name] = item_id
+
+    def _bound(self, item_id: Hashable, stored_at: float):
+        """
+        Apply the retention policy to item_id, stored at the time.monotonic
+        time stored_at, evicting older items as required. Used directly for
+        items which are already held in storage, such as the events of a
+        re-opened EventLog
+
+        :param item_id:
+        :param stored_at:
+        :return:
+        """
+        retained = self._retained
+        if self._retain_max_age is not None:
+            expired = monotonic() - self._retain_max_age
+            while retained and retained[0][1] < expired:
+                self._evict(retained.popleft()[0])
+        if len(retained) == self._retain_max_items:
+            self._evict(retained.popleft()[0])
+        retained.append((item_id, stored_at))
+
+    def _evict(self, item_id: Hashable):
+        del self._items[item_id]
+        name = self._items__names.pop(item_id, None)
+        if name is not None:
+            del self._names__items[name]
+
+
+class IndexesItems(object):
+    """
+    Mix-in for classes using the RetainsItems mix-in which store Received
+    records under consecutive ids, such as Subscription events. Maintains a
+    sorted index of record times and optional hash indexes over the values of
+    the kwargs named by indexes, so stored records can be queried by time range
+    and kwarg values in sub-linear time. Record times are clamped so that the
+    time index never runs backwards if the system clock does. Indexes are
+    trimmed lazily as records are evicted, the space used by evicted records
+    being reclaimed once they outnumber the records retained
+    """
+    def __init_indexes_items__(self, indexes: Iterable[str]=(),
+                               first_id: int=0):
+        self._index_base = first_id
+        self._index_first = first_id
+        self._index_times = array('d')
+        self._index_values = {key: {} for key in indexes}
+
+    def _index(self, item_id: int, item: Received):
+        """
+        Add item, stored under item_id, to the indexes. Items must be indexed
+        in the order of their consecutive ids
+
+        :param item_id:
+        :param item:
+        :return:
+        """
+        times = self._index_times
+        assert item_id == self._index_base + len(times)
+        times.append(max(item.time, times[-1]) if times else item.time)
+        if self._index_values:
+            kwargs = item.kwargs
+            for key, postings_by_value in self._index_values.items():
+                if key not in kwargs:
+                    continue
+                value = kwargs[key]
+                try:
+                    postings_by_value[value].append(item_id)
+                except KeyError:
+                    postings_by_value[value] = array('q', (item_id,))
+                except TypeError:
+                    pass
+
+    def _evict(self, item_id: Hashable):
+        super()._evict(item_id)
+        self._index_first = item_id + 1
+        evicted = self._index_first - self._index_base
+        if evicted > len(self._index_times) - evicted:
+            first = self._index_first
+            del self._index_times[:evicted]
+            self._index_base = first
+            for postings_by_value in self._index_values.values():
+                for value, postings in list(postings_by_value.items()):
+                    del postings[:bisect_left(postings, first)]
+                    if not postings:
+                        del postings_by_value[value]
+
+    def _query(self, start, end, conditions: dict) -> Tuple[Sequence[int], list]:
+        """
+        The ids of items stored between start and end, narrowed using the
+        smallest matching hash index, along with the (key, value) conditions
+        still to be checked against each item
+
+        :param start:
+        :param end:
+        :param conditions:
+        :return:
+        """
+        times = self._index_times
+        base = self._index_base
+        low = self._index_first - base
+        if start is not None:
+            low = bisect_left(times, _as_time(start), low)
+        high = len(times)
+        if end is not None:
+            high = bisect_right(times, _as_time(end), low)
+        ids = range(base + low, base + high)
+        remaining = list(conditions.items())
+        best = None
+        for key, value in remaining:
+            if key in self._index_values:
+                try:
+                    postings = self._index_values[key].get(value, ())
+                except TypeError:
+                    continue
+                if best is None or len(postings) < len(best[1]):
+                    best = (key, postings)
+        if best is not None:
+            key, postings = best
+            ids = postings[
+                bisect_left(postings, ids.start):bisect_left(postings, ids.stop)
+            ]
+            remaining = [
+                condition for condition in remaining if condition[0] != key
+            ]
+        return ids, remaining
+
+    def _matching(self, ids: Iterable[int], conditions: list) -> Iterator:
+        items = self._items
+        for item_id in ids:
+            item = items[item_id]
+            if conditions:
+                kwargs = item.kwargs
+                if not all(
+                    key in kwargs and kwargs[key] == value
+                    for key, value in conditions
+                ):
+                    continue
+            yield item
+
+    def between(self, start=None, end=None) -> List[Received]:
+        """
+        Stored items received between start and end inclusive, oldest first
+
+        :param start: Optional. POSIX time or datetime
+        :param end: Optional. POSIX time or datetime
+        :return:
+        """
+        return list(self._matching(*self._query(start, end, {})))
+
+    def where(self, start=None, end=None, **conditions) -> List[Received]:
+        """
+        Stored items whose kwargs hold every value given in conditions,
+        oldest first. Conditions on keys declared as indexes are resolved
+        using hash indexes, other conditions are checked item by item
+
+        :param start: Optional. POSIX time or datetime
+        :param end: Optional. POSIX time or datetime
+        :param conditions:
+        :return:
+        """
+        return list(self._matching(*self._query(start, end, conditions)))
+
+    def count(self, start=None, end=None, **conditions) -> int:
+        """
+        Number of stored items matched by where(start, end, **conditions)
+
+        :param start: Optional. POSIX time or datetime
+        :param end: Optional. POSIX time or datetime
+        :param conditions:
+        :return:
+        """
+        ids, remaining = self._query(start, end, conditions)
+        if not remaining:
+            return len(ids)
+        return sum(1 for _ in self._matching(ids, remaining))
+
+    def first(self, start=None, end=None, **conditions) -> Optional[Received]:
+        """
+        Oldest stored item matched by where(start, end, **conditions), if any
+
+        :param start: Optional. POSIX time or datetime
+        :param end: Optional. POSIX time or datetime
+        :param conditions:
+        :return:
+        """
+        ids, remaining = self._query(start, end, conditions)
+        return next(self._matching(ids, remaining), None)
+
+    def last(self, start=None, end=None, **conditions) -> Optional[Received]:
+        """
+        Newest stored item matched by where(start, end, **conditions), if any
+
+        :param start: Optional. POSIX time or datetime
+        :param end: Optional. POSIX time or datetime
+        :param conditions:
+        :return:
+        """
+        ids, remaining = self._query(start, end, conditions)
+        return next(self._matching(reversed(ids), remaining), None)
+
+
+def _as_time(value: Union[float, datetime]) -> float:
+    return value.timestamp() if isinstance(value, datetime) else value
+
+
+class TracksItems(NamesSequentially, RetainsItems):
+    """
+    Extends the RetainsItems mix-in for items which complete asynchronously,
+    such as Invocations and Publications. Every item is tracked weakly by id
+    for as long as it is referenced elsewhere (e.g. while it is in flight),
+    while strong references are only retained according to the keep policy:
+
+    * all: Every item is retained from the moment it is tracked
+    * failures: Only items that complete with a failure are retained
+    * none: No items are retained
+
+    Item ids are sequential rather than id() based so they are never re-used
+    once items are freed and items are named as described by the
+    NamesSequentially mix-in
+    """
+    KEEP_POLICIES = ('all', 'failures', 'none')
+
+    def __init_tracks_items__(self, keep: str='all', max_items: int=None):
+        assert keep in self.KEEP_POLICIES
+        self.__init_retains_items__(max_items)
+        self._keep = keep
+        self._item_ids = count()
+        self._tracked_ids = WeakKeyDictionary()
+        self._tracked_items = WeakValueDictionary()
+
+    def _track(self, item: Any) -> int:
+        """
+        Track item under the next sequential id
+
+        :param item:
+        :return: The id of item
+        """
+        item_id = next(self._item_ids)
+        self._tracked_ids[item] = item_id
+        self._tracked_items[item_id] = item
+        if self._keep == 'all':
+            self._retain(item_id, None, item)
+        return item_id
+
+    def _completed(self, item: Any, failed: bool):
+        """
+        Notify the tracker that item has completed, retaining it if it failed
+        and only failures are being kept
+
+        :param item:
+        :param failed:
+        :return:
+        """
+        if failed and self._keep == 'failures':
+            self._retain(self._tracked_ids[item], None, item)
+
+    def name_for(self, item) -> str:
+        return self._name_of(self._tracked_ids[item])
+
+    def __getitem__(self, item):
+        try:
+            return super().__getitem__(item)
+        except KeyError:
+            item_id = self._id_of(item)
+            if item_id in self._tracked_items:
+                return self._tracked_items[item_id]
+            raise
+
+    def __contains__(self, item) -> bool:
+        return (
+            super().__contains__(item)
+            or self._id_of(item) in self._tracked_items
+        )
+
+    def __dir__(self) -> Iterable[str]:
+        return [
+            self._name_of(item_id) for item_id in self._tracked_items.keys()
+        ]
+
+
 class ManagesNamesProxy(object):
     """
     An object proxy for classes that make use of the ManagesNames mix-in. This
@@ -138,6 +568,9 @@ class ManagesNamesProxy(object):
     def __contains__(self, item) -> bool:
         return item in self._target
 
+    def __iter__(self) -> Iterator:
+        return iter(self._target)
+
     def __dir__(self) -> Iterable[str]:
         return dir(self._target)
 
@@ -147,6 +580,8 @@ class HasName(object):
     Mix-in providing access to the name for a class instance managed by the
     ManagesNames mix-in
     """
+    __slots__ = ()
+
     def __init_has_name__(self, name_provider: ManagesNames):
         self._name_provider = name_provider
 
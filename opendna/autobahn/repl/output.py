@@ -0,0 +1,184 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from asyncio import AbstractEventLoop
+from typing import Optional, Tuple
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+
+
+class Output(object):
+    """
+    Base class for the output sinks the REPL uses to report on its activity.
+
+    Messages are %-formatted lazily using the supplied arguments so that
+    messages below the current level cost little more than a comparison.
+    Messages reporting high-rate activity (e.g. events received) carry a
+    summary key, a tuple of strings describing the activity, which sinks may
+    use to collapse bursts of such messages
+    """
+    def __init__(self, loop: AbstractEventLoop, level: int=INFO):
+        self._loop = loop
+        self._level = level
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @level.setter
+    def level(self, level: int):
+        self._level = level
+
+    def enabled(self, level: int) -> bool:
+        return level >= self._level
+
+    def log(self, level: int, message: str, *args,
+            summary: Tuple[str, ...]=None):
+        if level >= self._level:
+            self._write(message % args if args else message, summary)
+
+    def debug(self, message: str, *args, summary: Tuple[str, ...]=None):
+        if DEBUG >= self._level:
+            self._write(message % args if args else message, summary)
+
+    def info(self, message: str, *args, summary: Tuple[str, ...]=None):
+        if INFO >= self._level:
+            self._write(message % args if args else message, summary)
+
+    def warning(self, message: str, *args, summary: Tuple[str, ...]=None):
+        if WARNING >= self._level:
+            self._write(message % args if args else message, summary)
+
+    def error(self, message: str, *args, summary: Tuple[str, ...]=None):
+        if ERROR >= self._level:
+            self._write(message % args if args else message, summary)
+
+    def flush(self):
+        """
+        Write any buffered messages immediately
+
+        :return:
+        """
+
+    def _write(self, text: str, summary: Optional[Tuple[str, ...]]):
+        raise NotImplementedError
+
+
+class PrintOutput(Output):
+    """
+    Output sink which prints every message as soon as it is logged
+    """
+    def _write(self, text: str, summary: Optional[Tuple[str, ...]]):
+        print(text)
+
+
+class BufferedOutput(Output):
+    """
+    Output sink which buffers messages and prints them in a single write
+    scheduled on the event loop every interval seconds, so that bursts of
+    messages do not each incur a synchronous console write. That single
+    write is still synchronous, and output printed by other code in the
+    meantime appears ahead of the buffered messages
+    """
+    def __init__(self, loop: AbstractEventLoop, level: int=INFO,
+                 interval: float=0.1):
+        super().__init__(loop, level)
+        self._interval = interval
+        self._buffer = []
+        self._handle = None
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def _write(self, text: str, summary: Optional[Tuple[str, ...]]):
+        self._buffer.append(text)
+        if self._handle is None:
+            self._handle = self._loop.call_later(self._interval, self.flush)
+
+    def _render(self):
+        return self._buffer
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        lines = self._render()
+        self._buffer = []
+        if lines:
+            print('\n'.join(lines))
+
+
+class SummarisingOutput(BufferedOutput):
+    """
+    Buffered output sink which collapses bursts of messages sharing a summary
+    key. When more than threshold such messages are logged within an interval
+    they are replaced by a single line such as
+    "12,408 events received on topic X in last 1s"
+    """
+    def __init__(self, loop: AbstractEventLoop, level: int=INFO,
+                 interval: float=1.0, threshold: int=10):
+        super().__init__(loop, level, interval)
+        self._threshold = threshold
+        self._buckets = {}
+
+    @property
+    def threshold(self) -> int:
+        return self._threshold
+
+    def _write(self, text: str, summary: Optional[Tuple[str, ...]]):
+        if summary is None:
+            self._buffer.append(text)
+        else:
+            bucket = self._buckets.get(summary)
+            if bucket is None:
+                bucket = self._buckets[summary] = [summary, 0, []]
+                self._buffer.append(bucket)
+            bucket[1] += 1
+            if bucket[1] <= self._threshold:
+                bucket[2].append(text)
+        if self._handle is None:
+            self._handle = self._loop.call_later(self._interval, self.flush)
+
+    def _render(self):
+        lines = []
+        for entry in self._buffer:
+            if isinstance(entry, str):
+                lines.append(entry)
+                continue
+            summary, count, texts = entry
+            if count > self._threshold:
+                lines.append(
+                    f'{count:,} {" ".join(summary)} '
+                    f'in last {self._interval:g}s'
+                )
+            else:
+                lines.extend(texts)
+        self._buckets = {}
+        return lines
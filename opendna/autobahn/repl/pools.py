@@ -0,0 +1,320 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+from itertools import count
+from typing import Union, List, Callable, Iterable, Any
+
+from opendna.autobahn.repl.abc import (
+    AbstractConnection,
+    AbstractInvocation,
+    AbstractPublication,
+    AbstractSession,
+    AbstractSessionPool
+)
+from opendna.autobahn.repl.mixins import HasClasses, HasOutput, ManagesNames
+from opendna.autobahn.repl.rpc import MapResult
+from opendna.autobahn.repl.pubsub import StreamResult
+from opendna.autobahn.repl.utils import RetryPolicy
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class PoolMembers(object):
+    """
+    Base class for objects which wrap one Call or Publisher per member of a
+    SessionPool and dispatch each operation to one of them
+    """
+    def __init__(self, pool: AbstractSessionPool, members: list):
+        self._pool = pool
+        self._members = members
+
+    @property
+    def pool(self) -> AbstractSessionPool:
+        return self._pool
+
+    @property
+    def members(self) -> list:
+        return self._members
+
+    @property
+    def in_flight(self) -> int:
+        return sum(member.in_flight for member in self._members)
+
+    def _pick(self):
+        return self._members[self._pool._pick()]
+
+
+class PoolCall(PoolMembers):
+    """
+    Pooled equivalent of opendna.autobahn.repl.rpc.Call. Each Invocation is
+    created by the Call belonging to the pool member selected by the pool's
+    dispatch policy
+    """
+    def __init__(self, pool: AbstractSessionPool, procedure: str,
+                 members: list):
+        super().__init__(pool, members)
+        self._procedure = procedure
+
+    @property
+    def procedure(self) -> str:
+        return self._procedure
+
+    def __call__(self, *args, **kwargs) -> AbstractInvocation:
+        return self._pick()(*args, **kwargs)
+
+    async def _dispatch(self, args: tuple) -> Any:
+        return await self._pick()._dispatch(args)
+
+    def map(self, iterable: Iterable, concurrency: int=10,
+            ordered: bool=True) -> MapResult:
+        """
+        Schedules PoolCall.amap and returns its MapResult immediately
+
+        :param iterable:
+        :param concurrency:
+        :param ordered:
+        :return:
+        """
+        map_result = MapResult(self._procedure, ordered)
+        map_result._future = asyncio.ensure_future(
+            self.amap(iterable, concurrency, ordered, map_result=map_result),
+            loop=self._pool.connection.manager.loop
+        )
+        return map_result
+
+    async def amap(self, iterable: Iterable, concurrency: int=10,
+                   ordered: bool=True, *,
+                   map_result: MapResult=None) -> MapResult:
+        """
+        Equivalent of Call.amap with each call dispatched to a pool member
+        according to the pool's dispatch policy. concurrency applies to the
+        pool as a whole
+
+        :param iterable:
+        :param concurrency:
+        :param ordered:
+        :param map_result: Optional. Keyword-only argument. MapResult to
+            populate
+        :return:
+        """
+        assert concurrency > 0
+        map_result = map_result or MapResult(self._procedure, ordered)
+        await self._pool.future
+        await map_result._run(iterable, concurrency, self._dispatch)
+        return map_result
+
+
+class PoolPublisher(PoolMembers):
+    """
+    Pooled equivalent of opendna.autobahn.repl.pubsub.Publisher. Each
+    Publication is created by the Publisher belonging to the pool member
+    selected by the pool's dispatch policy
+    """
+    def __init__(self, pool: AbstractSessionPool, topic: str,
+                 members: list):
+        super().__init__(pool, members)
+        self._topic = topic
+
+    @property
+    def topic(self) -> str:
+        return self._topic
+
+    def __call__(self, *args, **kwargs) -> AbstractPublication:
+        return self._pick()(*args, **kwargs)
+
+    async def _dispatch(self, args: tuple):
+        return await self._pick()._dispatch(args)
+
+    def stream(self, iterable: Iterable, window: int=10,
+               retry_policy: RetryPolicy=None) -> StreamResult:
+        """
+        Schedules PoolPublisher.astream and returns its StreamResult
+        immediately
+
+        :param iterable:
+        :param window:
+        :param retry_policy:
+        :return:
+        """
+        stream_result = StreamResult(self._topic, window)
+        stream_result._future = asyncio.ensure_future(
+            self.astream(
+                iterable, window, retry_policy, stream_result=stream_result
+            ),
+            loop=self._pool.connection.manager.loop
+        )
+        return stream_result
+
+    async def astream(self, iterable: Iterable, window: int=10,
+                      retry_policy: RetryPolicy=None, *,
+                      stream_result: StreamResult=None) -> StreamResult:
+        """
+        Equivalent of Publisher.astream with each publication dispatched to a
+        pool member according to the pool's dispatch policy. window applies
+        to the pool as a whole
+
+        :param iterable:
+        :param window:
+        :param retry_policy: Optional. Defaults to no retries
+        :param stream_result: Optional. Keyword-only argument. StreamResult to
+            populate
+        :return:
+        """
+        assert window > 0
+        stream_result = stream_result or StreamResult(self._topic, window)
+        await self._pool.future
+        await stream_result._run(
+            iterable, window, self._dispatch, retry_policy or RetryPolicy()
+        )
+        return stream_result
+
+
+class SessionPool(HasClasses, HasOutput, AbstractSessionPool):
+    """
+    A pool of Sessions to the same router opened with the same authentication
+    parameters. Calls and Publishers created using the pool wrap one Call or
+    Publisher per member Session and dispatch each operation to a member
+    according to the dispatch policy:
+
+    * round_robin: Members are used in turn
+    * least_loaded: The member with the fewest Invocations, Publications and
+      mapped or streamed operations in flight through this pool is used
+
+    """
+    DISPATCH_POLICIES = ('round_robin', 'least_loaded')
+
+    def __init__(self, connection: Union[ManagesNames, AbstractConnection],
+                 sessions: List[AbstractSession], dispatch: str='round_robin'):
+        assert dispatch in self.DISPATCH_POLICIES
+        assert len(sessions) > 0
+        self.__init_has_classes__(connection.classes)
+        self.__init_has_output__(connection.output)
+        self._connection = connection
+        self._sessions = sessions
+        self._dispatch = dispatch
+        self._turns = count()
+        self._dispatchers: List[PoolMembers] = []
+        self._pick = getattr(self, f'_pick_{dispatch}')
+
+    @property
+    def future(self) -> asyncio.Future:
+        """
+        Future which resolves once every member Session has joined. A new
+        future is returned on each access as members may reconnect
+
+        :return:
+        """
+        return asyncio.gather(*(session.future for session in self._sessions))
+
+    @property
+    def connection(self) -> AbstractConnection:
+        return self._connection
+
+    @property
+    def sessions(self) -> List[AbstractSession]:
+        return self._sessions
+
+    @property
+    def size(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def dispatch(self) -> str:
+        return self._dispatch
+
+    @property
+    def in_flight(self) -> List[int]:
+        """
+        Number of operations in flight through this pool for each member
+
+        :return:
+        """
+        return [self._load(index) for index in range(len(self._sessions))]
+
+    def _load(self, index: int) -> int:
+        return sum(
+            dispatcher.members[index].in_flight
+            for dispatcher in self._dispatchers
+        )
+
+    def _pick_round_robin(self) -> int:
+        return next(self._turns) % len(self._sessions)
+
+    def _pick_least_loaded(self) -> int:
+        return min(range(len(self._sessions)), key=self._load)
+
+    def call(self, procedure: str, on_progress: Callable=None, *,
+             keep: str='all', max_invocations: int=None,
+             **call_options_kwargs) -> PoolCall:
+        """
+        Generates a PoolCall wrapping a Call to procedure on every member
+        Session. Accepts the same arguments as CallManager.__call__
+
+        :param procedure:
+        :param on_progress:
+        :param keep: Optional. Keyword-only argument.
+        :param max_invocations: Optional. Keyword-only argument. Applies to
+            each member Call
+        :return:
+        """
+        self._output.info(
+            'Generating pooled call to %s over %s sessions',
+            procedure, self.size
+        )
+        pool_call = PoolCall(self, procedure, [
+            session.call(
+                procedure, on_progress, keep=keep,
+                max_invocations=max_invocations, **call_options_kwargs
+            )
+            for session in self._sessions
+        ])
+        self._dispatchers.append(pool_call)
+        return pool_call
+
+    def publish(self, topic: str, *, keep: str='all',
+                max_publications: int=None,
+                **publish_options_kwargs) -> PoolPublisher:
+        """
+        Generates a PoolPublisher wrapping a Publisher for topic on every
+        member Session. Accepts the same arguments as PublisherManager.__call__
+
+        :param topic:
+        :param keep: Optional. Keyword-only argument.
+        :param max_publications: Optional. Keyword-only argument. Applies to
+            each member Publisher
+        :return:
+        """
+        self._output.info(
+            'Generating pooled publisher for %s over %s sessions',
+            topic, self.size
+        )
+        pool_publisher = PoolPublisher(self, topic, [
+            session.publish(
+                topic, keep=keep, max_publications=max_publications,
+                **publish_options_kwargs
+            )
+            for session in self._sessions
+        ])
+        self._dispatchers.append(pool_publisher)
+        return pool_publisher
@@ -22,14 +22,13 @@
 # SOFTWARE.
 ################################################################################
 import asyncio
-from collections import namedtuple
+from concurrent.futures import Executor
 from copy import deepcopy
-from os import environ
+from itertools import count
+from time import monotonic, perf_counter, time
 
-from datetime import datetime
-
-from autobahn.wamp import PublishOptions, SubscribeOptions
-from typing import Union, List, Iterable, Dict, Any, Callable
+from typing import Union, List, Iterable, Dict, Any, Callable, Optional, \
+    Awaitable
 
 from opendna.autobahn.repl.abc import (
     AbstractPublication,
@@ -40,13 +39,26 @@ from opendna.autobahn.repl.abc import (
     AbstractSubscriptionManager
 )
 from opendna.autobahn.repl.mixins import ManagesNames, HasSession, HasName, \
-    HasFuture, ManagesNamesProxy
-from opendna.autobahn.repl.utils import Keep, get_class
+    HasFuture, ManagesNamesProxy, HasClasses, RetainsItems, TracksItems, \
+    HasThroughput, HasOutput, NamesSequentially, IndexesItems
+from opendna.autobahn.repl.executors import Offload
+from opendna.autobahn.repl.output import INFO
+from opendna.autobahn.repl.stats import LatencyHistogram
+from opendna.autobahn.repl.storage import EventLog
+from opendna.autobahn.repl.recording import RECORD_PUBLISH, RECORD_EVENT
+from opendna.autobahn.repl.utils import merge_args, sweep, RetryPolicy, \
+    BufferedStream, \
+    Received
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
 
 
-class Publication(HasName, HasFuture, AbstractPublication):
+class Publication(HasName, HasFuture, HasOutput, AbstractPublication):
+    __slots__ = (
+        '_publisher', '_args', '_kwargs', '_result', '_exception',
+        '_name_provider', '_future', '_output', '__weakref__'
+    )
+
     def __init__(self, publisher: Union[ManagesNames, AbstractPublisher],
                  args: Iterable, kwargs: Dict[str, Any]):
         super(Publication, self).__init__(
@@ -54,23 +66,21 @@ class Publication(HasName, HasFuture, AbstractPublication):
         )
         self.__init_has_name__(publisher)
         self.__init_has_future__()
+        self.__init_has_output__(publisher.output)
 
-        def invoke(future: asyncio.Future):
-            loop = publisher.manager.session.connection.manager.loop
-            try:
-                result = future.result()
-                self._future = asyncio.ensure_future(self._invoke(), loop=loop)
-            except Exception as e:
-                print(e)
-        # TODO: Fix this type confusion
-        publisher.manager.session.future.add_done_callback(invoke)
+        publisher.manager.session._enqueue(self, self._invoke)
 
     async def _invoke(self):
+        from autobahn.wamp import PublishOptions
+
         topic = self._publisher.topic
         try:
             options = PublishOptions(**self._publisher.publish_options_kwargs)
             session = self._publisher.manager.session.application_session
-            print(f'Publication to {topic} with name {self.name} starting')
+            self._output.info(
+                'Publication to %s with name %s starting', topic, self.name,
+                summary=('publications to', topic, 'starting')
+            )
             self._result = session.publish(
                 topic,
                 *self._args,
@@ -79,10 +89,33 @@ class Publication(HasName, HasFuture, AbstractPublication):
             )
             if self._result is not None and self._publisher.acknowledge:
                 self._result = await self._result
-            print(f'Publication to {topic} with name {self.name} succeeded')
+            self._output.info(
+                'Publication to %s with name %s succeeded', topic, self.name,
+                summary=('publications to', topic, 'succeeded')
+            )
         except Exception as e:
-            print(f'Publication to {topic} with name {self.name} failed')
+            self._output.error(
+                'Publication to %s with name %s failed', topic, self.name,
+                summary=('publications to', topic, 'failed')
+            )
             self._exception = e
+        self._publisher._completed(self, self._exception is not None)
+
+    def _fail(self, exception: Exception):
+        """
+        Complete this Publication with exception without sending it, used
+        when its session fails before the Publication leaves the queue
+
+        :param exception:
+        :return:
+        """
+        topic = self._publisher.topic
+        self._output.error(
+            'Publication to %s with name %s failed', topic, self.name,
+            summary=('publications to', topic, 'failed')
+        )
+        self._exception = exception
+        self._publisher._completed(self, True)
 
     def __call__(self, *new_args, **new_kwargs) -> AbstractPublication:
         """
@@ -91,64 +124,316 @@ class Publication(HasName, HasFuture, AbstractPublication):
         :param new_kwargs:
         :return:
         """
-        args = deepcopy(self._args)
-        new_args_len = len(new_args)
-        args_len = len(args)
-        if new_args_len < args_len:
-            new_args = list(new_args) + args[new_args_len:]
-        elif new_args_len > args_len:
-            new_args = new_args[:args_len]
-        args = [
-            arg if new_arg == Keep else new_arg
-            for arg, new_arg in zip(args, new_args)
-        ]
-        kwargs = deepcopy(self._kwargs)
-        kwargs.update(new_kwargs)
+        args = merge_args(self._args, new_args)
+        kwargs = {**self._kwargs, **new_kwargs}
         return self._publisher(*args, **kwargs)
 
+    def sweep(self, *arg_ranges, **kwarg_ranges) -> List[AbstractPublication]:
+        """
+        Create a new Publication for every combination of the values in
+        arg_ranges and kwarg_ranges applied over the arguments of this
+        Publication. Positions in arg_ranges holding Keep retain the original
+        value
+
+        :param arg_ranges: Iterables of values for positional arguments
+        :param kwarg_ranges: Iterables of values for keyword arguments
+        :return:
+        """
+        return [
+            self._publisher(*args, **kwargs)
+            for args, kwargs in sweep(
+                self._args, self._kwargs, arg_ranges, kwarg_ranges
+            )
+        ]
+
+
+class StreamResult(HasFuture, HasThroughput):
+    """
+    Compact record of the results of a Publisher.stream or Publisher.astream
+    run. Exceptions of publications which failed after all retries are
+    stored by input index, along with a histogram of acknowledgement latency
+    """
+    def __init__(self, topic: str, window: int):
+        self.__init_has_future__()
+        self.__init_has_throughput__()
+        self._topic = topic
+        self._window = window
+        self._exceptions = {}
+        self._retried = 0
+        self._in_flight = 0
+        self._latency = LatencyHistogram()
+
+    @property
+    def topic(self) -> str:
+        return self._topic
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    @property
+    def exceptions(self) -> Dict[int, Exception]:
+        return self._exceptions
+
+    @property
+    def failed(self) -> int:
+        return len(self._exceptions)
+
+    @property
+    def retried(self) -> int:
+        return self._retried
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
 
-class Publisher(HasName, ManagesNames, AbstractPublisher):
+    @property
+    def acknowledged(self) -> int:
+        return self._latency.count
+
+    @property
+    def latency(self) -> LatencyHistogram:
+        return self._latency
+
+    @property
+    def latency_mean(self) -> Optional[float]:
+        return self._latency.mean
+
+    @property
+    def latency_min(self) -> Optional[float]:
+        return self._latency.min
+
+    @property
+    def latency_max(self) -> Optional[float]:
+        return self._latency.max
+
+    async def _run(self, iterable: Iterable, window: int,
+                   dispatch: Callable[[tuple], Awaitable],
+                   retry_policy: RetryPolicy):
+        """
+        Dispatch every item in iterable with at most window dispatches
+        awaiting acknowledgement at once, retrying failures according to
+        retry_policy
+
+        :param iterable:
+        :param window:
+        :param dispatch: Coroutine function called with the arguments tuple
+            for each item which resolves once the publication is acknowledged
+        :param retry_policy:
+        :return:
+        """
+        semaphore = asyncio.Semaphore(window)
+
+        async def publish(index: int, args: tuple):
+            attempt = 0
+            try:
+                while True:
+                    sent = perf_counter()
+                    try:
+                        await dispatch(args)
+                        self._latency.record(perf_counter() - sent)
+                        return
+                    except Exception as e:
+                        if not retry_policy.should_retry(attempt):
+                            self._exceptions[index] = e
+                            return
+                    self._retried += 1
+                    await asyncio.sleep(retry_policy.delay(attempt))
+                    attempt += 1
+            finally:
+                self._count += 1
+                self._in_flight -= 1
+                semaphore.release()
+
+        self._started = perf_counter()
+        for index, args in enumerate(iterable):
+            await semaphore.acquire()
+            self._in_flight += 1
+            asyncio.ensure_future(
+                publish(index, args if isinstance(args, tuple) else (args,))
+            )
+        for _ in range(window):
+            await semaphore.acquire()
+        self._finished = perf_counter()
+
+    def __repr__(self):
+        return (
+            f'<StreamResult {self._topic} count={self._count} '
+            f'failed={self.failed} retried={self._retried} '
+            f'elapsed={self.elapsed or 0:.3f}s '
+            f'throughput={self.throughput or 0:.1f}/s '
+            f'latency_p50={(self._latency.p50 or 0) * 1000:.3f}ms '
+            f'latency_p99={(self._latency.p99 or 0) * 1000:.3f}ms>'
+        )
+
+
+class Publisher(HasName, HasClasses, HasOutput, TracksItems, ManagesNames,
+                AbstractPublisher):
     def __init__(self, manager: Union[ManagesNames, AbstractPublisherManager],
                  topic: str,
-                 publish_options_kwargs: dict=None):
+                 publish_options_kwargs: dict=None,
+                 keep: str='all',
+                 max_publications: int=None):
         super().__init__(
             manager=manager,
             topic=topic,
-            publish_options_kwargs=publish_options_kwargs
+            publish_options_kwargs=publish_options_kwargs,
+            keep=keep,
+            max_publications=max_publications
         )
         self.__init_has_name__(manager)
+        self.__init_has_classes__(manager.classes)
+        self.__init_has_output__(manager.output)
         self.__init_manages_names__()
+        self.__init_tracks_items__(keep, max_publications)
         self._proxy = ManagesNamesProxy(self)
+        self._in_flight = 0
+        self._dispatch_options = None
 
     @property
     def publications(self) -> ManagesNamesProxy:
         return self._proxy
 
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of Publications and streamed publications which have not yet
+        completed
+
+        :return:
+        """
+        return self._in_flight
+
+    def _completed(self, item: AbstractPublication, failed: bool):
+        self._in_flight -= 1
+        super()._completed(item, failed)
+
+    async def _dispatch(self, args: tuple, kwargs: dict=None, *,
+                        record: bool=True):
+        """
+        Publish an acknowledged event directly using the WAMP session without
+        creating a Publication
+
+        :param args:
+        :param kwargs:
+        :param record: Optional. Keyword-only argument. Whether to record the
+            publication if the session is recording
+        :return:
+        """
+        kwargs = kwargs or {}
+        recorder = self._manager.session.recorder
+        if record and recorder is not None:
+            recorder.record(RECORD_PUBLISH, self._topic, args, kwargs)
+        if self._dispatch_options is None:
+            from autobahn.wamp import PublishOptions
+
+            self._dispatch_options = PublishOptions(
+                **dict(self._publish_options_kwargs, acknowledge=True)
+            )
+        session = self._manager.session.application_session
+        self._in_flight += 1
+        try:
+            return await session.publish(
+                self._topic, *args, options=self._dispatch_options, **kwargs
+            )
+        finally:
+            self._in_flight -= 1
+
     def name_for(self, item):
-        publication_class = get_class(environ['publication'])
-        assert isinstance(item, publication_class)
-        return super().name_for(id(item))
+        assert isinstance(item, self._classes['publication'])
+        return super().name_for(item)
 
     def __call__(self, *args, **kwargs) -> AbstractPublication:
-        name = self._generate_name()
-        publication_class = get_class(environ['publication'])
-        publication = publication_class(publisher=self, args=args, kwargs=kwargs)
-        publication_id = id(publication)
-        self._items[publication_id] = publication
-        self._items__names[publication_id] = name
-        self._names__items[name] = publication_id
+        recorder = self._manager.session.recorder
+        if recorder is not None:
+            recorder.record(RECORD_PUBLISH, self._topic, args, kwargs)
+        publication = self._classes['publication'](
+            publisher=self, args=args, kwargs=kwargs
+        )
+        self._in_flight += 1
+        self._track(publication)
         return publication
 
+    @property
+    def acknowledge(self) -> bool:
+        return bool(self._publish_options_kwargs.get('acknowledge'))
+
+    def stream(self, iterable: Iterable, window: int=10,
+               retry_policy: RetryPolicy=None) -> StreamResult:
+        """
+        Schedules Publisher.astream and returns its StreamResult immediately.
+        The StreamResult is populated as publications are acknowledged and its
+        future resolves once every publication has completed
+
+        :param iterable:
+        :param window:
+        :param retry_policy:
+        :return:
+        """
+        stream_result = StreamResult(self._topic, window)
+        loop = self._manager.session.connection.manager.loop
+        stream_result._future = asyncio.ensure_future(
+            self.astream(
+                iterable, window, retry_policy, stream_result=stream_result
+            ),
+            loop=loop
+        )
+        return stream_result
+
+    async def astream(self, iterable: Iterable, window: int=10,
+                      retry_policy: RetryPolicy=None, *,
+                      stream_result: StreamResult=None) -> StreamResult:
+        """
+        Publishes an event for every item in iterable, pipelining publications
+        so that at most window of them are awaiting acknowledgement at once.
+        Tuple items are supplied as positional arguments, all other items as a
+        single positional argument. Publications are always acknowledged and
+        failed publications are retried according to retry_policy.
+
+        Events are published directly using the WAMP session rather than by
+        creating Publications, with failures and acknowledgement latency
+        collected in a StreamResult
+
+        :param iterable:
+        :param window:
+        :param retry_policy: Optional. Defaults to no retries
+        :param stream_result: Optional. Keyword-only argument. StreamResult to
+            populate
+        :return:
+        """
+        assert window > 0
+        stream_result = stream_result or StreamResult(self._topic, window)
+        await self._manager.session.future
+        self._output.info(
+            'Streaming to %s with window %s', self._topic, window
+        )
+        await stream_result._run(
+            iterable, window, self._dispatch, retry_policy or RetryPolicy()
+        )
+        self._output.info(
+            'Streaming to %s completed %s publications with %s failures and '
+            '%s retries in %.3fs (%.1f publications/s, ack latency p50 '
+            '%.3fms p99 %.3fms)',
+            self._topic, stream_result.count, stream_result.failed,
+            stream_result.retried, stream_result.elapsed,
+            stream_result.throughput or 0,
+            (stream_result.latency.p50 or 0) * 1000,
+            (stream_result.latency.p99 or 0) * 1000
+        )
+        return stream_result
 
-class PublisherManager(ManagesNames, HasSession, AbstractPublisherManager):
+
+class PublisherManager(ManagesNames, HasSession, HasClasses, HasOutput,
+                       AbstractPublisherManager):
 
     def __init__(self, session: AbstractSession):
         self.__init_manages_names__()
         self.__init_has_session__(session)
+        self.__init_has_classes__(session.classes)
+        self.__init_has_output__(session.output)
 
     def name_for(self, item):
-        publisher_class = get_class(environ['publisher'])
-        assert isinstance(item, publisher_class)
+        assert isinstance(item, self._classes['publisher'])
         return super().name_for(id(item))
 
     @ManagesNames.with_name
@@ -156,13 +441,30 @@ class PublisherManager(ManagesNames, HasSession, AbstractPublisherManager):
                  topic: str,
                  *,
                  name: str=None,
+                 keep: str='all',
+                 max_publications: int=None,
                  **publish_options_kwargs) -> AbstractPublisher:
-        print(f'Generating publisher for {topic} with name {name}')
-        publisher_class: AbstractPublisher = get_class(environ['publisher'])
-        publisher = publisher_class(
+        """
+        Generates a Callable which can be called to publish events to a WAMP
+        PubSub topic
+
+        :param topic:
+        :param name: Optional. Keyword-only argument.
+        :param keep: Optional. Keyword-only argument. Which Publications to
+            retain: 'all', 'failures' or 'none'
+        :param max_publications: Optional. Keyword-only argument. Maximum
+            number of Publications to retain, the oldest being evicted first
+        :return:
+        """
+        self._output.info(
+            'Generating publisher for %s with name %s', topic, name
+        )
+        publisher = self._classes['publisher'](
             manager=self,
             topic=topic,
-            publish_options_kwargs=publish_options_kwargs
+            publish_options_kwargs=publish_options_kwargs,
+            keep=keep,
+            max_publications=max_publications
         )
         publisher_id = id(publisher)
         self._items[publisher_id] = publisher
@@ -171,70 +473,236 @@ class PublisherManager(ManagesNames, HasSession, AbstractPublisherManager):
         return publisher
 
 
-class Subscription(HasName, ManagesNames, HasFuture, AbstractSubscription):
-    Event = namedtuple('Event', ('timestamp', 'args', 'kwargs'))
+class Event(Received):
+    """
+    Record of an event received by a Subscription
+    """
+    __slots__ = ()
+
+
+class EventStream(BufferedStream):
+    """
+    BufferedStream of the events received by a Subscription from the moment
+    the stream is opened. With the block overflow policy the subscription's
+    event handler waits until there is room, unless maxsize handlers are
+    waiting already, in which case the event is dropped. Each stream is
+    independent, so several consumers can iterate over the same Subscription
+    at their own pace
+    """
+    def __init__(self, subscription: AbstractSubscription,
+                 loop: asyncio.AbstractEventLoop, maxsize: int=1000,
+                 overflow: str='drop_oldest'):
+        super().__init__(loop, maxsize, overflow)
+        self._subscription = subscription
+
+    @property
+    def subscription(self) -> AbstractSubscription:
+        return self._subscription
+
+    def close(self):
+        if not self._closed:
+            self._subscription._streams.remove(self)
+        super().close()
+
+    def __repr__(self):
+        return (
+            f'<EventStream {self._subscription.topic} '
+            f'overflow={self._overflow} pending={len(self._buffer)}/'
+            f'{self._maxsize} received={self._received} '
+            f'dropped={self._dropped}{" closed" if self._closed else ""}>'
+        )
+
+
+class Subscription(HasName, HasOutput, IndexesItems, RetainsItems,
+                   NamesSequentially, ManagesNames, HasFuture,
+                   AbstractSubscription):
+    NAME_PREFIX = 'e'
+    Event = Event
 
     def __init__(self, manager: Union[ManagesNames, AbstractSubscriptionManager],
                  topic: str, handler: Callable = None,
-                 subscribe_options_kwargs: dict = None):
-        super().__init__(manager, topic, handler, subscribe_options_kwargs)
+                 subscribe_options_kwargs: dict = None,
+                 max_events: int = None, max_age: float = None,
+                 indexes: Iterable[str] = (), log_path: str = None,
+                 executor: Union[str, Executor] = None,
+                 max_concurrency: int = None):
+        super().__init__(manager, topic, handler, subscribe_options_kwargs,
+                         max_events, max_age, indexes, log_path, executor,
+                         max_concurrency)
+        assert executor is None or not asyncio.iscoroutinefunction(handler)
+        assert max_concurrency is None or executor is not None
         self.__init_manages_names__()
+        if log_path is not None:
+            self._items = manager.classes['event_log'](log_path, self.Event)
+        self.__init_retains_items__(max_events, max_age)
+        if log_path is None:
+            self.__init_indexes_items__(indexes)
+            self._event_ids = count()
+        else:
+            self.__init_indexes_items__(indexes, self._items.first_id)
+            self._event_ids = count(self._items.next_id)
+            self._adopt_logged_events()
+        self._streams = []
+        connection_manager = manager.session.connection.manager
+        self._offload = None if executor is None else Offload(
+            connection_manager.loop,
+            connection_manager.executors.resolve(executor),
+            max_concurrency
+        )
         self.__init_has_name__(manager)
+        self.__init_has_output__(manager.output)
         self.__init_has_future__()
         self._proxy = ManagesNamesProxy(self)
 
-        def invoke(future: asyncio.Future):
-            loop = manager.session.connection.manager.loop
-            try:
-                result = future.result()
-                self._future = asyncio.ensure_future(self._subscribe(), loop=loop)
-            except Exception as e:
-                print(e)
-        # TODO: Fix this type confusion
-        manager.session.future.add_done_callback(invoke)
+        manager.session._enqueue(self, self._subscribe)
 
     @property
     def events(self) -> ManagesNamesProxy:
         return self._proxy
 
+    @property
+    def log(self) -> Optional[EventLog]:
+        """
+        The EventLog events are stored in when subscribed with a log_path
+        """
+        return None if self._log_path is None else self._items
+
+    @property
+    def offload(self) -> Optional[Offload]:
+        """
+        Queue depth and execution time statistics of the handler when it
+        runs in an executor
+        """
+        return self._offload
+
+    def _adopt_logged_events(self):
+        """
+        Index the events already held by a re-opened EventLog and apply the
+        retention policy to them according to their age, so new events are
+        appended after them
+
+        :return:
+        """
+        log = self._items
+        now, monotonic_now = time(), monotonic()
+        for event_id in log.keys():
+            event = log[event_id]
+            self._index(event_id, event)
+            if self._retain_bounded:
+                self._bound(event_id, monotonic_now - (now - event.time))
+
     async def _unsubscribe(self):
         try:
-            print(f'Unsubscription from {self._topic} with name {self.name} starting')
+            self._output.info(
+                'Unsubscription from %s with name %s starting',
+                self._topic, self.name
+            )
             await self._subscription.unsubscribe()
-            print(f'Unsubscription from {self._topic} with name {self.name} succeeded')
+            self._output.info(
+                'Unsubscription from %s with name %s succeeded',
+                self._topic, self.name
+            )
+            for stream in list(self._streams):
+                stream.close()
+            if self._log_path is not None:
+                self._items.close()
         except Exception as e:
-            print(f'Unsubscription from {self._topic} with name {self.name} failed')
+            self._output.error(
+                'Unsubscription from %s with name %s failed',
+                self._topic, self.name
+            )
             self._exception = e
 
+    def _replay(self) -> bool:
+        """
+        Re-issue this Subscription on a new WAMP session if it was subscribed
+        and has not been unsubscribed
+
+        :return: Whether the Subscription was re-issued
+        """
+        if self._subscription is None or not self._subscription.active:
+            return False
+        loop = self._manager.session.connection.manager.loop
+        self._subscription = None
+        self._future = asyncio.ensure_future(self._subscribe(), loop=loop)
+        return True
+
     async def _subscribe(self):
+        from autobahn.wamp import SubscribeOptions
+
         try:
             options = SubscribeOptions(**self._subscribe_options_kwargs)
             session = self._manager.session.application_session
-            print(f'Subscription to {self._topic} with name {self.name} starting')
+            self._output.info(
+                'Subscription to %s with name %s starting',
+                self._topic, self.name
+            )
             self._subscription = await session.subscribe(
                 handler=self._handler_wrapper,
                 topic=self._topic,
                 options=options
             )
-            print(f'Subscription to {self._topic} with name {self.name} succeeded')
+            self._output.info(
+                'Subscription to %s with name %s succeeded',
+                self._topic, self.name
+            )
         except Exception as e:
-            print(f'Subscription to {self._topic} with name {self.name} failed')
+            self._output.error(
+                'Subscription to %s with name %s failed',
+                self._topic, self.name
+            )
             self._exception = e
 
+    def _fail(self, exception: Exception):
+        self._output.error(
+            'Subscription to %s with name %s failed',
+            self._topic, self.name
+        )
+        self._exception = exception
+
     async def _handler_wrapper(self, *args, **kwargs):
-        name = self._generate_name()
-        now = datetime.now()
-        event_id = len(self._items)
-        self._items[event_id] = self.Event(now, args, kwargs)
-        self._items__names[event_id] = name
-        self._names__items[name] = event_id
-        print(f'Event named {name} received at {now} on topic '
-              f'{self._topic} named {self.name}')
+        event_id = next(self._event_ids)
+        event = self.Event(time(), args, kwargs)
+        self._retain(event_id, None, event)
+        self._index(event_id, event)
+        if self._output.enabled(INFO):
+            self._output.info(
+                'Event named %s received at %s on topic %s named %s',
+                self._name_of(event_id), event.timestamp, self._topic,
+                self.name,
+                summary=('events received on topic', self._topic)
+            )
+        recorder = self._manager.session.recorder
+        if recorder is not None:
+            recorder.record(RECORD_EVENT, self._topic, args, kwargs)
+        if self._streams:
+            for stream in tuple(self._streams):
+                if not stream._offer(event):
+                    await stream._put(event)
         if asyncio.iscoroutinefunction(self._handler):
             return await self._handler(*args, **kwargs)
         elif callable(self._handler):
+            if self._offload is not None:
+                return await self._offload.run(self._handler, args, kwargs)
             return self._handler(*args, **kwargs)
 
+    def stream(self, maxsize: int=1000,
+               overflow: str='drop_oldest') -> EventStream:
+        """
+        Open an EventStream over the events received from now on, for use
+        with async for. Close the stream once it is no longer consumed
+
+        :param maxsize: Maximum number of events buffered for the consumer
+        :param overflow: One of EventStream.OVERFLOW_POLICIES
+        :return:
+        """
+        stream = EventStream(
+            self, self._manager.session.connection.manager.loop,
+            maxsize, overflow
+        )
+        self._streams.append(stream)
+        return stream
+
     def unsubscribe(self):
         if self._subscription is None:
             raise Exception(f'{self._topic} is not subscribed yet')
@@ -245,38 +713,96 @@ class Subscription(HasName, ManagesNames, HasFuture, AbstractSubscription):
                  topic: str,
                  handler: Callable=None,
                  *, name: str=None,
+                 max_events: int=None,
+                 max_age: float=None,
+                 indexes: Iterable[str]=None,
+                 log_path: str=None,
+                 executor: Union[str, Executor]=None,
+                 max_concurrency: int=None,
                  **new_subscribe_options_kwargs) -> AbstractSubscription:
         subscribe_options_kwargs = deepcopy(self._subscribe_options_kwargs)
         subscribe_options_kwargs.update(new_subscribe_options_kwargs)
         return self._manager(
             topic or self._topic,
             handler or self._handler,
+            name=name,
+            max_events=max_events or self._max_events,
+            max_age=max_age or self._max_age,
+            indexes=self._indexes if indexes is None else indexes,
+            log_path=log_path,
+            executor=executor or self._executor,
+            max_concurrency=max_concurrency or self._max_concurrency,
             **subscribe_options_kwargs
         )
 
 
-class SubscriptionManager(HasSession, ManagesNames, AbstractSubscriptionManager):
+class SubscriptionManager(HasSession, HasClasses, HasOutput, ManagesNames,
+                          AbstractSubscriptionManager):
     def __init__(self, session: AbstractSession):
         self.__init_has_session__(session)
+        self.__init_has_classes__(session.classes)
+        self.__init_has_output__(session.output)
         self.__init_manages_names__()
 
     def name_for(self, item):
-        subscription_class = get_class(environ['subscription'])
-        assert isinstance(item, subscription_class)
+        assert isinstance(item, self._classes['subscription'])
         return super().name_for(id(item))
 
+    def _replay(self) -> int:
+        """
+        Re-issue every live Subscription after the session reconnects
+
+        :return: Number of Subscriptions re-issued
+        """
+        return sum(
+            subscription._replay() for subscription in self._items.values()
+        )
+
     @ManagesNames.with_name
     def __call__(self,
                  topic: str,
                  handler: Callable=None,
                  *,
                  name: str=None,
+                 max_events: int=None,
+                 max_age: float=None,
+                 indexes: Iterable[str]=(),
+                 log_path: str=None,
+                 executor: Union[str, Executor]=None,
+                 max_concurrency: int=None,
                  **subscribe_options_kwargs) -> AbstractSubscription:
-        print(f'Generating subscription for {topic} with name {name}')
-        subscription_class = get_class(environ['subscription'])
-        subscription = subscription_class(
+        """
+        Subscribes to a WAMP PubSub topic
+
+        :param topic:
+        :param handler: Optional. Function or coroutine called for each event
+        :param name: Optional. Keyword-only argument.
+        :param max_events: Optional. Keyword-only argument. Maximum number of
+            events to retain, the oldest events being evicted first
+        :param max_age: Optional. Keyword-only argument. Number of seconds
+            after which retained events are evicted
+        :param indexes: Optional. Keyword-only argument. Names of event kwargs
+            to maintain hash indexes over for Subscription.where queries
+        :param log_path: Optional. Keyword-only argument. Directory of an
+            EventLog to store events in instead of memory. Events in an
+            existing log are kept and new events appended after them. Raises
+            RuntimeError if another EventLog is writing to the directory
+        :param executor: Optional. Keyword-only argument. Executor, or the
+            name of an executor in ConnectionManager.executors such as
+            'thread' or 'process', to run a synchronous handler in
+        :param max_concurrency: Optional. Keyword-only argument. Maximum
+            number of calls to handler running in executor at once
+        :return:
+        """
+        self._output.info(
+            'Generating subscription for %s with name %s', topic, name
+        )
+        subscription = self._classes['subscription'](
             manager=self, topic=topic, handler=handler,
-            subscribe_options_kwargs=subscribe_options_kwargs
+            subscribe_options_kwargs=subscribe_options_kwargs,
+            max_events=max_events, max_age=max_age, indexes=indexes,
+            log_path=log_path, executor=executor,
+            max_concurrency=max_concurrency
         )
         subscription_id = id(subscription)
         self._items[subscription_id] = subscription
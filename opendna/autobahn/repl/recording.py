@@ -0,0 +1,316 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+from collections import namedtuple
+from functools import partial
+from time import perf_counter, time
+from typing import Iterator, Iterable, Dict, Callable, Awaitable, Optional
+
+from opendna.autobahn.repl.abc import AbstractSession
+from opendna.autobahn.repl.mixins import HasFuture, HasThroughput
+from opendna.autobahn.repl.stats import LatencyHistogram
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+RECORD_START = 's'
+RECORD_CALL = 'c'
+RECORD_PUBLISH = 'p'
+RECORD_EVENT = 'e'
+RECORD_HIT = 'h'
+REPLAY_KINDS = (RECORD_CALL, RECORD_PUBLISH)
+
+Record = namedtuple('Record', ('offset', 'kind', 'uri', 'args', 'kwargs'))
+
+
+class Recorder(object):
+    """
+    Appends the traffic of a Session to a file as it happens. Each record is
+    a single line holding a compact JSON array of the form
+    [offset, kind, uri, args, kwargs] where offset is the number of seconds
+    since recording started and kind is one of RECORD_CALL, RECORD_PUBLISH,
+    RECORD_EVENT or RECORD_HIT. Every recording starts with a RECORD_START
+    record holding the wall-clock start time, so one file may hold several
+    recordings. Bytes arguments are encoded as autobahn's JSON serializer
+    does. Traffic whose arguments cannot be serialized is counted as skipped
+    """
+    def __init__(self, path: str):
+        from autobahn.wamp.serializer import JsonObjectSerializer
+
+        self._path = path
+        self._serializer = JsonObjectSerializer(batched=False)
+        self._file = open(path, 'ab')
+        self._started_at = perf_counter()
+        self._count = 0
+        self._skipped = 0
+        self._write(RECORD_START, None, (time(),), None)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def count(self) -> int:
+        """
+        Number of records written, excluding the RECORD_START record
+
+        :return:
+        """
+        return self._count
+
+    @property
+    def skipped(self) -> int:
+        return self._skipped
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def _write(self, kind: str, uri: Optional[str], args: Iterable,
+               kwargs: Optional[dict]):
+        self._file.write(
+            self._serializer.serialize([
+                round(perf_counter() - self._started_at, 6), kind, uri,
+                list(args), kwargs or {}
+            ]) + b'\n'
+        )
+
+    def record(self, kind: str, uri: str, args: Iterable,
+               kwargs: Optional[dict]):
+        """
+        Append a record of traffic on uri. Does nothing once closed
+
+        :param kind:
+        :param uri:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if self._file is None:
+            return
+        try:
+            self._write(kind, uri, args, kwargs)
+        except Exception:
+            self._skipped += 1
+        else:
+            self._count += 1
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __repr__(self):
+        return (
+            f'<Recorder {self._path} count={self._count} '
+            f'skipped={self._skipped} closed={self.closed}>'
+        )
+
+
+def read_records(path: str) -> Iterator[Record]:
+    """
+    Lazily read the records in a file written by a Recorder. The offsets of
+    every recording after the first are shifted to follow on from the end of
+    the previous one and a truncated final line is ignored
+
+    :param path:
+    :return:
+    """
+    from autobahn.wamp.serializer import JsonObjectSerializer
+
+    serializer = JsonObjectSerializer(batched=False)
+    base = 0.0
+    offset = 0.0
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                [record] = serializer.unserialize(line.rstrip(b'\n'))
+            except Exception:
+                if not line.endswith(b'\n'):
+                    return
+                raise
+            record = Record(*record)
+            if record.kind == RECORD_START:
+                base = offset
+                continue
+            offset = base + record.offset
+            yield record._replace(offset=offset)
+
+
+class ReplayResult(HasFuture, HasThroughput):
+    """
+    Compact record of the results of a Session.replay run. Exceptions are
+    stored by record index, along with a histogram of how late each record
+    was sent relative to its schedule. The Calls and Publishers used to
+    replay records are available by URI
+    """
+    def __init__(self, path: str, speed: Optional[float]):
+        self.__init_has_future__()
+        self.__init_has_throughput__()
+        self._path = path
+        self._speed = speed
+        self._scheduled = 0
+        self._exceptions = {}
+        self._lag = LatencyHistogram()
+        self._calls = {}
+        self._publishers = {}
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def speed(self) -> Optional[float]:
+        return self._speed
+
+    @property
+    def scheduled(self) -> int:
+        """
+        Number of records sent so far
+
+        :return:
+        """
+        return self._scheduled
+
+    @property
+    def exceptions(self) -> Dict[int, Exception]:
+        return self._exceptions
+
+    @property
+    def failed(self) -> int:
+        return len(self._exceptions)
+
+    @property
+    def succeeded(self) -> int:
+        return self._count - len(self._exceptions)
+
+    @property
+    def lag(self) -> LatencyHistogram:
+        return self._lag
+
+    @property
+    def calls(self) -> dict:
+        return self._calls
+
+    @property
+    def publishers(self) -> dict:
+        return self._publishers
+
+    def _dispatcher(self, session: AbstractSession, kind: str,
+                    uri: str) -> Callable[[tuple, dict], Awaitable]:
+        """
+        Dispatch coroutine function of the Call or Publisher replaying
+        records of kind on uri. Calls and hits are replayed as calls while
+        publications and events are replayed as acknowledged publications.
+        Replayed traffic is never recorded, so a session can replay while it
+        records its own traffic
+
+        :param session:
+        :param kind:
+        :param uri:
+        :return:
+        """
+        if kind in (RECORD_CALL, RECORD_HIT):
+            call = self._calls.get(uri)
+            if call is None:
+                call = self._calls[uri] = session.call(uri, keep='none')
+            return partial(call._dispatch, record=False)
+        publisher = self._publishers.get(uri)
+        if publisher is None:
+            publisher = self._publishers[uri] = session.publish(
+                uri, keep='none'
+            )
+        return partial(publisher._dispatch, record=False)
+
+    async def _run(self, session: AbstractSession, records: Iterable[Record],
+                   kinds: Iterable[str], max_in_flight: Optional[int]):
+        """
+        Send every record of one of kinds at its recorded offset divided by
+        speed, or as fast as possible if speed is None. Records are sent open
+        loop: each is scheduled against the start of the replay rather than
+        the previous record, so late records are sent immediately and the
+        schedule does not drift, and completions are never awaited unless
+        max_in_flight sends are outstanding
+
+        :param session:
+        :param records:
+        :param kinds:
+        :param max_in_flight:
+        :return:
+        """
+        kinds = frozenset(kinds)
+        speed = self._speed
+        exceptions = self._exceptions
+        semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        pending = set()
+
+        async def send(index: int, dispatch: Callable, args: tuple,
+                       kwargs: dict):
+            try:
+                await dispatch(args, kwargs)
+            except Exception as e:
+                exceptions[index] = e
+            finally:
+                self._count += 1
+                if semaphore:
+                    semaphore.release()
+
+        await session.future
+        self._started = started = perf_counter()
+        for index, record in enumerate(records):
+            if record.kind not in kinds:
+                continue
+            if speed is None:
+                await asyncio.sleep(0)
+            else:
+                due = started + record.offset / speed
+                delay = due - perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if semaphore:
+                await semaphore.acquire()
+            if speed is not None:
+                self._lag.record(perf_counter() - due)
+            task = asyncio.ensure_future(send(
+                index, self._dispatcher(session, record.kind, record.uri),
+                tuple(record.args), record.kwargs
+            ))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            self._scheduled += 1
+        if pending:
+            await asyncio.wait(pending)
+        self._finished = perf_counter()
+
+    def __repr__(self):
+        speed = 'max' if self._speed is None else f'{self._speed:g}x'
+        return (
+            f'<ReplayResult {self._path} speed={speed} '
+            f'scheduled={self._scheduled} count={self._count} '
+            f'failed={self.failed} elapsed={self.elapsed or 0:.3f}s '
+            f'throughput={self.throughput or 0:.1f}/s>'
+        )
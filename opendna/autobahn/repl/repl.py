@@ -22,25 +22,32 @@
 # SOFTWARE.
 ################################################################################
 import asyncio
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace, REMAINDER
 from functools import partial
 from os import environ
 import os.path
+import sys
+from traceback import print_exc
+from typing import Iterator, Sequence, TYPE_CHECKING
 
-import txaio
-from opendna.common.decorators import with_uvloop_if_possible
 from pathlib import Path
-from ptpython.repl import embed, run_config, PythonRepl
 
-from opendna.autobahn.repl.mixins import ManagesNamesProxy
-from opendna.autobahn.repl.utils import get_class
+from opendna.autobahn.repl.abc import AbstractSession
+from opendna.autobahn.repl.mixins import ManagesNames, ManagesNamesProxy
+from opendna.autobahn.repl.output import LEVELS, Output
+from opendna.autobahn.repl.utils import ClassRegistry, \
+    DEFAULT_CLASSPATHS, get_class
 
+if TYPE_CHECKING:
+    from ptpython.repl import PythonRepl
 
 DEFAULT_HISTORY_FILE = str(Path.home() / 'autobahn_python_repl.history.txt')
 DEFAULT_CONFIG_FILE = str(Path.home() / 'autobahn_python_repl.config.py')
+EXIT_SCRIPT_FAILED = 1
+EXIT_INVOCATIONS_FAILED = 3
 
 
-def default_configure(repl: PythonRepl):
+def default_configure(repl: 'PythonRepl'):
     """
     Default REPL configuration function
 
@@ -66,55 +73,167 @@ def default_configure(repl: PythonRepl):
     repl.enable_input_validation = True
 
 
-@asyncio.coroutine
-def start_repl(loop: asyncio.AbstractEventLoop):
+def namespace(manager: ManagesNames) -> dict:
+    """
+    Names made available to REPL sessions and scripts
+
+    :param manager: ConnectionManager instance
+    :return:
+    """
+    return {
+        'connect': manager,
+        'connect_to': manager,
+        'connections': ManagesNamesProxy(manager),
+        'executors': manager.executors,
+    }
+
+
+def sessions(manager: ManagesNames) -> Iterator[AbstractSession]:
+    """
+    Every Session of every Connection of manager
+
+    :param manager: ConnectionManager instance
+    :return:
+    """
+    for connection in manager:
+        yield from connection
+
+
+async def settle(manager: ManagesNames):
+    """
+    Wait until no Session of manager has operations queued or in flight
+
+    :param manager: ConnectionManager instance
+    :return:
+    """
+    while True:
+        outstanding = [
+            future
+            for session in sessions(manager)
+            for future in session.outstanding
+        ]
+        if not outstanding:
+            return
+        await asyncio.wait(outstanding)
+
+
+async def run_script(loop: asyncio.AbstractEventLoop, path: str,
+                     argv: Sequence[str]=(), classes: ClassRegistry=None,
+                     output: Output=None) -> int:
+    """
+    Execute the Python script at path without starting the REPL. The script
+    runs on the provided event loop with the same names available as in the
+    REPL and may use await at the top level. Once the script finishes, any
+    operations still queued or in flight are waited for and the executors
+    used by the script are shut down
+
+    :param loop:
+    :param path:
+    :param argv: Arguments made available to the script as sys.argv[1:]
+    :param classes: Optional. ClassRegistry of classes resolved at start-up
+    :param output: Optional. Output sink used to report REPL activity
+    :return: Exit status. 0 on success, EXIT_SCRIPT_FAILED if the script
+        raised an exception or EXIT_INVOCATIONS_FAILED if any calls,
+        publications, registrations or subscriptions failed
+    """
+    try:
+        from ast import PyCF_ALLOW_TOP_LEVEL_AWAIT
+    except ImportError:
+        raise RuntimeError(
+            'Running scripts requires Python 3.8 or later for top-level await'
+        ) from None
+
+    classes = ClassRegistry() if classes is None else classes
+    manager = classes['connection_manager'](loop, classes, output)
+    globals_ = dict(namespace(manager), __name__='__main__', __file__=path)
+    sys.argv = [path, *argv]
+    try:
+        try:
+            with open(path) as f:
+                code = compile(
+                    f.read(), path, 'exec', flags=PyCF_ALLOW_TOP_LEVEL_AWAIT
+                )
+            result = eval(code, globals_)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            # Messages buffered by the output sink precede the traceback
+            manager.output.flush()
+            print_exc()
+            return EXIT_SCRIPT_FAILED
+        await settle(manager)
+        failed = sum(session.failures for session in sessions(manager))
+        if failed:
+            manager.output.error(
+                'Script %s finished with %d failed operations', path, failed
+            )
+            return EXIT_INVOCATIONS_FAILED
+        return 0
+    finally:
+        manager.executors.shutdown()
+
+
+async def start_repl(loop: asyncio.AbstractEventLoop,
+                     classes: ClassRegistry=None, output: Output=None):
     """
     Start the REPL and attach it to the provided event loop
     :param loop:
+    :param classes: Optional. ClassRegistry of classes resolved at start-up
+    :param output: Optional. Output sink used to report REPL activity
     :return:
     """
+    from ptpython.repl import embed, run_config
+
     config_file = environ.get('config_file', DEFAULT_CONFIG_FILE)
     if os.path.exists(config_file):
         configure = partial(run_config, config_file=config_file)
     else:
         configure = default_configure
-    manager_class = get_class(environ['connection_manager'])
-    manager = manager_class(loop)
-    yield from embed(
-        globals={},
-        locals={
-            'connect': manager,
-            'connect_to': manager,
-            'connections': ManagesNamesProxy(manager),
-        },
-        title='AutoBahn-Python REPL',
-        return_asyncio_coroutine=True,
-        patch_stdout=True,
-        configure=configure,
-        history_filename=environ.get('history_file', DEFAULT_HISTORY_FILE)
-    )
+    classes = ClassRegistry() if classes is None else classes
+    manager = classes['connection_manager'](loop, classes, output)
+    try:
+        await embed(
+            globals={},
+            locals=namespace(manager),
+            title='AutoBahn-Python REPL',
+            return_asyncio_coroutine=True,
+            patch_stdout=True,
+            configure=configure,
+            history_filename=environ.get('history_file', DEFAULT_HISTORY_FILE)
+        )
+    finally:
+        manager.executors.shutdown()
+
+
+def start(args: Namespace, classes: ClassRegistry):
+    """
+    Start the REPL, or run a script if the run command was given, using the
+    parsed command line arguments and exit with the resulting status
+
+    :param args:
+    :param classes:
+    :return:
+    """
+    import txaio
+
+    loop = asyncio.get_event_loop()
+    txaio.use_asyncio()
+    txaio.config.loop = loop
+    output = classes['output'](loop, LEVELS[args.output_level])
+    if args.command == 'run':
+        status = loop.run_until_complete(run_script(
+            loop, args.script, args.script_args, classes, output
+        ))
+    else:
+        loop.run_until_complete(start_repl(loop, classes, output))
+        status = 0
+    output.flush()
+    loop.stop()
+    sys.exit(status)
 
 
-@with_uvloop_if_possible
 def main():
-    prefix = 'opendna.autobahn.repl'
-    dest__class = {
-        'connection_manager': f'{prefix}.connections.ConnectionManager',
-        'connection': f'{prefix}.connections.Connection',
-        'session': f'{prefix}.sessions.Session',
-        'call_manager': f'{prefix}.rpc.CallManager',
-        'call': f'{prefix}.rpc.Call',
-        'invocation': f'{prefix}.rpc.Invocation',
-        'registration_manager': f'{prefix}.rpc.RegistrationManager',
-        'registration': f'{prefix}.rpc.Registration',
-        'publisher_manager': f'{prefix}.pubsub.PublisherManager',
-        'publisher': f'{prefix}.pubsub.Publisher',
-        'publication': f'{prefix}.pubsub.Publication',
-        'subscription_manager': f'{prefix}.pubsub.SubscriptionManager',
-        'subscription': f'{prefix}.pubsub.Subscription',
-        'application_runner': 'autobahn.asyncio.wamp.ApplicationRunner',
-        'application_session': f'{prefix}.wamp.REPLApplicationSession'
-    }
+    dest__class = DEFAULT_CLASSPATHS
     parser = ArgumentParser(description='Python REPL for interacting with Crossbar')
     for dest, class_ in dest__class.items():
         parser.add_argument(
@@ -122,17 +241,42 @@ def main():
         )
     parser.add_argument('--history-file', dest='history_file', default=DEFAULT_HISTORY_FILE)
     parser.add_argument('--config-file', dest='config_file', default=DEFAULT_CONFIG_FILE)
+    parser.add_argument(
+        '--output-level', dest='output_level', default='info', choices=LEVELS
+    )
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser(
+        'run', help='Run a script without starting the REPL'
+    )
+    run_parser.add_argument('script')
+    run_parser.add_argument('script_args', nargs=REMAINDER)
     args = parser.parse_args()
     environ.update({
         key: value
         for key, value in vars(args).items()
         if key in dest__class or key in {'history_file', 'config_file'}
     })
-    loop = asyncio.get_event_loop()
-    txaio.use_asyncio()
-    txaio.config.loop = loop
-    loop.run_until_complete(start_repl(loop))
-    loop.stop()
+    # Classes overridden on the command line are resolved straight away so
+    # that a bad classpath is reported at start-up. The defaults are
+    # resolved from the classpaths stored in os.environ above on first use,
+    # so modules which are never needed are never imported
+    overridden = {}
+    for dest, class_ in dest__class.items():
+        classpath = getattr(args, dest)
+        if classpath == class_:
+            continue
+        try:
+            overridden[dest] = get_class(classpath)
+        except (ImportError, AttributeError, ValueError) as e:
+            parser.error(
+                f'--{dest.replace("_", "-")}: cannot load {classpath}: {e}'
+            )
+    classes = ClassRegistry(overridden)
+    # Imported here rather than at module level so that run_script and the
+    # rest of this module can be used without opendna.common installed
+    from opendna.common.decorators import with_uvloop_if_possible
+
+    with_uvloop_if_possible(start)(args, classes)
 
 
 if __name__ == '__main__':
@@ -22,15 +22,14 @@
 # SOFTWARE.
 ################################################################################
 import asyncio
-from os import environ
 
-from autobahn.wamp.types import IRegistration
-from datetime import datetime
-from collections import namedtuple
+from collections import deque
+from concurrent.futures import Executor
 from copy import deepcopy
+from time import perf_counter, time
 
-from autobahn.wamp import CallOptions, RegisterOptions
-from typing import Callable, Union, Any, Dict, Iterable, Optional
+from typing import Callable, Union, Any, Dict, Iterable, Optional, \
+    Awaitable, Hashable, List, TYPE_CHECKING
 
 from opendna.autobahn.repl.abc import (
     AbstractInvocation,
@@ -45,13 +44,62 @@ from opendna.autobahn.repl.mixins import (
     ManagesNames,
     HasName,
     HasFuture,
-    ManagesNamesProxy)
-from opendna.autobahn.repl.utils import Keep, get_class
+    ManagesNamesProxy,
+    HasClasses,
+    HasOutput,
+    HasThroughput,
+    NamesSequentially,
+    TracksItems)
+from opendna.autobahn.repl.executors import Offload
+from opendna.autobahn.repl.output import INFO
+from opendna.autobahn.repl.cache import LRU, cache_key
+from opendna.autobahn.repl.stats import CallStats
+from opendna.autobahn.repl.recording import RECORD_CALL, RECORD_HIT
+from opendna.autobahn.repl.utils import merge_args, sweep, Received, \
+    BufferedStream
+
+if TYPE_CHECKING:
+    from autobahn.wamp.types import IRegistration
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
 
+REJECT_URI = 'wamp.error.unavailable'
+
+
+class ProgressStream(BufferedStream):
+    """
+    BufferedStream of the progressive results of an Invocation, ending once
+    the Invocation completes. Progressive results cannot be held back, so
+    only the drop_oldest and drop_new overflow policies are supported
+    """
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_new')
+
+    def __init__(self, invocation: AbstractInvocation,
+                 loop: asyncio.AbstractEventLoop, maxsize: int=1000,
+                 overflow: str='drop_oldest'):
+        super().__init__(loop, maxsize, overflow)
+        self._invocation = invocation
+
+    @property
+    def invocation(self) -> AbstractInvocation:
+        return self._invocation
+
+    def __repr__(self):
+        return (
+            f'<ProgressStream {self._invocation.name} '
+            f'overflow={self._overflow} pending={len(self._buffer)}/'
+            f'{self._maxsize} received={self._received} '
+            f'dropped={self._dropped}{" closed" if self._closed else ""}>'
+        )
 
-class Invocation(HasName, HasFuture, AbstractInvocation):
+
+class Invocation(HasName, HasFuture, HasOutput, AbstractInvocation):
+    __slots__ = (
+        '_call', '_args', '_kwargs', '_result', '_exception', '_queued_at',
+        '_sent_at', '_completed_at', '_cached', '_name_provider', '_future',
+        '_output', '_progress', '_progress_count', '_progress_bytes',
+        '_progress_streams', '_key', '__weakref__'
+    )
 
     def __init__(self,
                  call: Union[ManagesNames, AbstractCall],
@@ -60,47 +108,164 @@ class Invocation(HasName, HasFuture, AbstractInvocation):
         super(Invocation, self).__init__(call=call, args=args, kwargs=kwargs)
         self.__init_has_name__(call)
         self.__init_has_future__()
-        self._progress = []
+        self.__init_has_output__(call.output)
+        self._progress = None
+        self._progress_count = 0
+        self._progress_bytes = 0
+        self._progress_streams = None
+        self._queued_at = perf_counter()
+        self._key = call._key(args, kwargs)
+        if self._key is not None and call.cache is not None:
+            hit, result = call.cache.get(self._key)
+            if hit:
+                self._complete_from_cache(result)
+                return
+        call.manager.session._enqueue(self, self._invoke)
 
-        def invoke(future: asyncio.Future):
-            loop = call.manager.session.connection.manager.loop
-            try:
-                result = future.result()
-                self._future = asyncio.ensure_future(self._invoke(), loop=loop)
-            except Exception as e:
-                print(e)
-        # TODO: Fix this type confusion
-        call.manager.session.future.add_done_callback(invoke)
+    def _complete_from_cache(self, result: Any):
+        """
+        Complete this Invocation immediately with a result from the cache of
+        its Call, without a router round trip
+
+        :param result:
+        :return:
+        """
+        loop = self._call.manager.session.connection.manager.loop
+        self._cached = True
+        self._result = result
+        self._sent_at = self._completed_at = self._queued_at
+        self._future = loop.create_future()
+        self._future.set_result(result)
+        self._call._completed(self, False)
 
     @property
     def progress(self) -> list:
-        return self._progress
+        return [] if self._progress is None else self._progress
 
-    def _default_on_progress(self, value):
-        print(f'Invocation of {self._call.procedure} with name {self.name} has progress')
-        self._progress.append(value)
+    @property
+    def progress_count(self) -> int:
+        return self._progress_count
+
+    @property
+    def progress_bytes(self) -> int:
+        """
+        Total size of the bytes-like progressive results received
+        """
+        return self._progress_bytes
+
+    def progress_stream(self, maxsize: int=1000,
+                        overflow: str='drop_oldest') -> ProgressStream:
+        """
+        Open a ProgressStream over the progressive results of this Invocation
+        for use with async for. Progressive results already stored are
+        yielded first and the stream ends once the Invocation completes
+
+        :param maxsize: Maximum number of results buffered for the consumer
+        :param overflow: One of ProgressStream.OVERFLOW_POLICIES
+        :return:
+        """
+        stream = ProgressStream(
+            self, self._call.manager.session.connection.manager.loop,
+            maxsize, overflow
+        )
+        for value in self.progress:
+            stream._offer(value)
+        if self._completed_at is None and self._exception is None:
+            if self._progress_streams is None:
+                self._progress_streams = []
+            self._progress_streams.append(stream)
+        else:
+            stream.close()
+        return stream
+
+    def _default_on_progress(self, *args, **kwargs):
+        value = args[0] if len(args) == 1 and not kwargs else (args, kwargs)
+        self._progress_count += 1
+        if isinstance(value, (bytes, bytearray)):
+            self._progress_bytes += len(value)
+        elif isinstance(value, memoryview):
+            self._progress_bytes += value.nbytes
+        if self._output.enabled(INFO):
+            self._output.info(
+                'Invocation of %s with name %s has progress',
+                self._call.procedure, self.name,
+                summary=('progress results for', self._call.procedure)
+            )
+        if self._call.store_progress:
+            if self._progress is None:
+                self._progress = []
+            self._progress.append(value)
+        if self._progress_streams:
+            for stream in self._progress_streams:
+                stream._offer(value)
         if callable(self._call.on_progress):
-            self._call.on_progress(value)
+            self._call.on_progress(*args, **kwargs)
+
+    def _close_progress_streams(self):
+        streams, self._progress_streams = self._progress_streams, None
+        if streams:
+            for stream in streams:
+                stream.close()
 
     async def _invoke(self):
+        from autobahn.wamp import CallOptions
+
         procedure = self._call.procedure
+        call_options_kwargs = self._call.call_options_kwargs
+        self._sent_at = perf_counter()
         try:
-            options = CallOptions(
-                on_progress=self._default_on_progress,
-                **self._call.call_options_kwargs
-            )
             session = self._call.manager.session.application_session
-            print(f'Invocation of {procedure} with name {self.name} starting')
-            self._result = await session.call(
-                procedure,
-                *self._args,
-                options=options,
-                **self._kwargs
+            self._output.info(
+                'Invocation of %s with name %s starting',
+                procedure, self.name,
+                summary=('invocations of', procedure, 'starting')
+            )
+            self._result = await self._call._send(
+                self._key,
+                lambda on_progress: session.call(
+                    procedure,
+                    *self._args,
+                    options=CallOptions(
+                        on_progress=on_progress, **call_options_kwargs
+                    ),
+                    **self._kwargs
+                ),
+                self._default_on_progress
+            )
+            self._output.info(
+                'Invocation of %s with name %s succeeded',
+                procedure, self.name,
+                summary=('invocations of', procedure, 'succeeded')
             )
-            print(f'Invocation of {procedure} with name {self.name} succeeded')
         except Exception as e:
-            print(f'Invocation of {procedure} with name {self.name} failed')
+            self._output.error(
+                'Invocation of %s with name %s failed',
+                procedure, self.name,
+                summary=('invocations of', procedure, 'failed')
+            )
             self._exception = e
+        self._completed_at = perf_counter()
+        self._close_progress_streams()
+        self._call._completed(self, self._exception is not None)
+
+    def _fail(self, exception: Exception):
+        """
+        Complete this Invocation with exception without sending it, used when
+        its session fails before the Invocation leaves the queue
+
+        :param exception:
+        :return:
+        """
+        self._output.error(
+            'Invocation of %s with name %s failed',
+            self._call.procedure, self.name,
+            summary=('invocations of', self._call.procedure, 'failed')
+        )
+        self._exception = exception
+        # Never sent, so sent_at stays None and no latency is recorded
+        self._completed_at = perf_counter()
+        self._close_progress_streams()
+        self._call._completed(self, True)
 
     def __call__(self, *new_args, **new_kwargs) -> AbstractInvocation:
         """
@@ -109,66 +274,404 @@ class Invocation(HasName, HasFuture, AbstractInvocation):
         :param new_kwargs:
         :return:
         """
-        args = deepcopy(self._args)
-        new_args_len = len(new_args)
-        args_len = len(args)
-        if new_args_len < args_len:
-            new_args = list(new_args) + args[new_args_len:]
-        elif new_args_len > args_len:
-            new_args = new_args[:args_len]
-        args = [
-            arg if new_arg == Keep else new_arg
-            for arg, new_arg in zip(args, new_args)
-        ]
-        kwargs = deepcopy(self._kwargs)
-        kwargs.update(new_kwargs)
+        args = merge_args(self._args, new_args)
+        kwargs = {**self._kwargs, **new_kwargs}
         return self._call(*args, **kwargs)
 
+    def sweep(self, *arg_ranges, **kwarg_ranges) -> List[AbstractInvocation]:
+        """
+        Create a new Invocation for every combination of the values in
+        arg_ranges and kwarg_ranges applied over the arguments of this
+        Invocation. Positions in arg_ranges holding Keep retain the original
+        value
+
+        :param arg_ranges: Iterables of values for positional arguments
+        :param kwarg_ranges: Iterables of values for keyword arguments
+        :return:
+        """
+        return [
+            self._call(*args, **kwargs)
+            for args, kwargs in sweep(
+                self._args, self._kwargs, arg_ranges, kwarg_ranges
+            )
+        ]
+
+
+class MapResult(HasFuture, HasThroughput):
+    """
+    Compact record of the results of a Call.map or Call.amap run. Results are
+    stored in input order, with None in the positions of failed calls, when
+    the run is ordered and in completion order otherwise. Exceptions are
+    stored by input index
+    """
+    def __init__(self, procedure: str, ordered: bool=True):
+        self.__init_has_future__()
+        self.__init_has_throughput__()
+        self._procedure = procedure
+        self._ordered = ordered
+        self._results = []
+        self._exceptions = {}
+
+    @property
+    def procedure(self) -> str:
+        return self._procedure
+
+    @property
+    def ordered(self) -> bool:
+        return self._ordered
+
+    @property
+    def results(self) -> list:
+        return self._results
+
+    @property
+    def exceptions(self) -> Dict[int, Exception]:
+        return self._exceptions
+
+    @property
+    def failed(self) -> int:
+        return len(self._exceptions)
+
+    @property
+    def succeeded(self) -> int:
+        return self._count - len(self._exceptions)
+
+    async def _run(self, iterable: Iterable, concurrency: int,
+                   dispatch: Callable[[tuple], Awaitable]):
+        """
+        Dispatch every item in iterable with at most concurrency dispatches
+        in flight at once, collecting results and exceptions
+
+        :param iterable:
+        :param concurrency:
+        :param dispatch: Coroutine function called with the arguments tuple
+            for each item
+        :return:
+        """
+        ordered = self._ordered
+        results = self._results
+        exceptions = self._exceptions
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(index: int, args: tuple):
+            try:
+                result = await dispatch(args)
+                if ordered:
+                    results[index] = result
+                else:
+                    results.append(result)
+            except Exception as e:
+                exceptions[index] = e
+            finally:
+                self._count += 1
+                semaphore.release()
+
+        self._started = perf_counter()
+        for index, args in enumerate(iterable):
+            await semaphore.acquire()
+            if ordered:
+                results.append(None)
+            asyncio.ensure_future(
+                call(index, args if isinstance(args, tuple) else (args,))
+            )
+        for _ in range(concurrency):
+            await semaphore.acquire()
+        self._finished = perf_counter()
+
+    def __repr__(self):
+        return (
+            f'<MapResult {self._procedure} count={self._count} '
+            f'failed={self.failed} elapsed={self.elapsed or 0:.3f}s '
+            f'throughput={self.throughput or 0:.1f}/s>'
+        )
+
 
-class Call(ManagesNames, AbstractCall):
+class Call(HasClasses, HasOutput, TracksItems, ManagesNames,
+           AbstractCall):
     def __init__(self,
                  manager: AbstractCallManager,
                  procedure: str,
                  on_progress: Callable=None,
-                 call_options_kwargs: dict=None):
+                 call_options_kwargs: dict=None,
+                 keep: str='all',
+                 max_invocations: int=None,
+                 cache: LRU=None,
+                 coalesce: bool=False,
+                 store_progress: bool=True):
         self.__init_manages_names__()
         super().__init__(
             manager=manager,
             procedure=procedure,
             on_progress=on_progress,
-            call_options_kwargs=call_options_kwargs
+            call_options_kwargs=call_options_kwargs,
+            keep=keep,
+            max_invocations=max_invocations,
+            cache=cache,
+            coalesce=coalesce,
+            store_progress=store_progress
         )
+        self.__init_has_classes__(manager.classes)
+        self.__init_has_output__(manager.output)
+        self.__init_tracks_items__(keep, max_invocations)
         self._proxy = ManagesNamesProxy(self)
+        self._stats = CallStats()
+        self._in_flight = 0
+        self._dispatch_options = None
+        self._flights = {}
+        self._coalesced = 0
 
     @property
     def invocations(self) -> ManagesNamesProxy:
         return self._proxy
 
+    @property
+    def coalesced(self) -> int:
+        """
+        Number of router calls saved by coalescing identical concurrent calls
+
+        :return:
+        """
+        return self._coalesced
+
+    @property
+    def stats(self) -> CallStats:
+        return self._stats
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of Invocations and mapped calls which have not yet completed
+
+        :return:
+        """
+        return self._in_flight
+
+    def _completed(self, item: AbstractInvocation, failed: bool):
+        self._in_flight -= 1
+        if not item.cached:
+            self._stats.record(
+                item.queued_at, item.sent_at, item.completed_at, failed
+            )
+        super()._completed(item, failed)
+
+    def _key(self, args: Iterable, kwargs: Dict[str, Any]):
+        """
+        Key identifying the given arguments for caching and coalescing, or
+        None if this Call does neither or the arguments cannot be used as a
+        key
+
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if self._cache is None and not self._coalesce:
+            return None
+        return cache_key(self._procedure, args, kwargs)
+
+    async def _send(self, key: Optional[Hashable],
+                    send: Callable[[Optional[Callable]], Awaitable],
+                    on_progress: Callable=None) -> Any:
+        """
+        Await send(on_progress), sharing a single in-flight send among
+        concurrent callers with the same key if coalescing is enabled, and
+        store the result in the cache if there is one. Progressive results of
+        a shared send are passed to the on_progress of every caller attached
+        to it at the time
+
+        :param key:
+        :param send: Sends the call, reporting progressive results to the
+            callable it is given
+        :param on_progress: Optional. Receives progressive results
+        :return:
+        """
+        if key is None:
+            return await send(on_progress)
+        if self._coalesce:
+            try:
+                flight, listeners = self._flights[key]
+                self._coalesced += 1
+            except KeyError:
+                listeners = []
+
+                def fan_out(*args, **kwargs):
+                    for listener in listeners:
+                        listener(*args, **kwargs)
+
+                flight = asyncio.ensure_future(send(fan_out))
+                self._flights[key] = (flight, listeners)
+                flight.add_done_callback(
+                    lambda _: self._flights.pop(key, None)
+                )
+            if on_progress is not None:
+                listeners.append(on_progress)
+            result = await asyncio.shield(flight)
+        else:
+            result = await send(on_progress)
+        if self._cache is not None:
+            self._cache.put(key, result)
+        return result
+
+    def invalidate(self, *args, **kwargs) -> bool:
+        """
+        Remove the cached result for the given arguments. Use
+        Call.cache.clear() to remove every cached result
+
+        :param args:
+        :param kwargs:
+        :return: Whether a cached result was removed
+        """
+        if self._cache is None:
+            return False
+        key = self._key(args, kwargs)
+        return key is not None and self._cache.invalidate(key)
+
+    async def _dispatch(self, args: tuple, kwargs: dict=None, *,
+                        record: bool=True) -> Any:
+        """
+        Call the procedure directly using the WAMP session without creating an
+        Invocation, recording the call in the stats for this Call. Results are
+        served from and stored in the cache of this Call if it has one and
+        identical concurrent calls are coalesced if enabled
+
+        :param args:
+        :param kwargs:
+        :param record: Optional. Keyword-only argument. Whether to record the
+            call if the session is recording
+        :return:
+        """
+        kwargs = kwargs or {}
+        recorder = self._manager.session.recorder
+        if record and recorder is not None:
+            recorder.record(RECORD_CALL, self._procedure, args, kwargs)
+        key = self._key(args, kwargs)
+        if key is not None and self._cache is not None:
+            hit, result = self._cache.get(key)
+            if hit:
+                return result
+        session = self._manager.session.application_session
+        sent_at = perf_counter()
+        failed = False
+        self._in_flight += 1
+        try:
+            return await self._send(
+                key,
+                lambda on_progress: session.call(
+                    self._procedure, *args,
+                    options=self._options(on_progress), **kwargs
+                ),
+                self._on_progress
+            )
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._in_flight -= 1
+            self._stats.record(None, sent_at, perf_counter(), failed)
+
+    def _options(self, on_progress: Optional[Callable]):
+        """
+        CallOptions for dispatched calls reporting progressive results to
+        on_progress, reused while that is the on_progress of this Call
+
+        :param on_progress:
+        :return:
+        """
+        from autobahn.wamp import CallOptions
+
+        if on_progress is not self._on_progress:
+            return CallOptions(
+                on_progress=on_progress, **self._call_options_kwargs
+            )
+        if self._dispatch_options is None:
+            self._dispatch_options = CallOptions(
+                on_progress=on_progress, **self._call_options_kwargs
+            )
+        return self._dispatch_options
+
     def name_for(self, item):
-        invocation_class = get_class(environ['invocation'])
-        assert isinstance(item, invocation_class)
-        return super().name_for(id(item))
+        assert isinstance(item, self._classes['invocation'])
+        return super().name_for(item)
 
     def __call__(self, *args, **kwargs) -> AbstractInvocation:
-        name = self._generate_name()
-        print(f'Invoking {self.procedure} with name {name}')
-        invocation_class = get_class(environ['invocation'])
-        invocation = invocation_class(call=self, args=args, kwargs=kwargs)
-        invocation_id = id(invocation)
-        self._items[invocation_id] = invocation
-        self._items__names[invocation_id] = name
-        self._names__items[name] = invocation_id
+        recorder = self._manager.session.recorder
+        if recorder is not None:
+            recorder.record(RECORD_CALL, self._procedure, args, kwargs)
+        self._in_flight += 1
+        invocation = self._classes['invocation'](
+            call=self, args=args, kwargs=kwargs
+        )
+        invocation_id = self._track(invocation)
+        self._output.info(
+            'Invoking %s with name %s%d', self._procedure, self.NAME_PREFIX,
+            invocation_id,
+            summary=('invocations of', self._procedure, 'created')
+        )
         return invocation
 
+    def map(self, iterable: Iterable, concurrency: int=10,
+            ordered: bool=True) -> MapResult:
+        """
+        Schedules Call.amap and returns its MapResult immediately. The
+        MapResult is populated as calls complete and its future resolves once
+        every call has completed
+
+        :param iterable:
+        :param concurrency:
+        :param ordered:
+        :return:
+        """
+        map_result = MapResult(self._procedure, ordered)
+        loop = self._manager.session.connection.manager.loop
+        map_result._future = asyncio.ensure_future(
+            self.amap(iterable, concurrency, ordered, map_result=map_result),
+            loop=loop
+        )
+        return map_result
+
+    async def amap(self, iterable: Iterable, concurrency: int=10,
+                   ordered: bool=True, *,
+                   map_result: MapResult=None) -> MapResult:
+        """
+        Calls the procedure once for every item in iterable with at most
+        concurrency calls in flight at once. Tuple items are supplied as
+        positional arguments, all other items as a single positional argument.
+
+        Calls are sent directly using the WAMP session rather than by creating
+        Invocations, with results and exceptions collected in a MapResult
 
-class CallManager(HasSession, ManagesNames, AbstractCallManager):
+        :param iterable:
+        :param concurrency:
+        :param ordered:
+        :param map_result: Optional. Keyword-only argument. MapResult to
+            populate
+        :return:
+        """
+        assert concurrency > 0
+        map_result = map_result or MapResult(self._procedure, ordered)
+        await self._manager.session.future
+        self._output.info(
+            'Mapping %s with concurrency %s', self._procedure, concurrency
+        )
+        await map_result._run(iterable, concurrency, self._dispatch)
+        self._output.info(
+            'Mapping %s completed %s calls with %s failures in %.3fs '
+            '(%.1f calls/s)',
+            self._procedure, map_result.count, map_result.failed,
+            map_result.elapsed, map_result.throughput or 0
+        )
+        return map_result
+
+
+class CallManager(HasSession, HasClasses, HasOutput, ManagesNames,
+                  AbstractCallManager):
     def __init__(self, session: AbstractSession):
         self.__init_has_session__(session)
+        self.__init_has_classes__(session.classes)
+        self.__init_has_output__(session.output)
         self.__init_manages_names__()
 
     def name_for(self, item):
-        call_class = get_class(environ['call'])
-        assert isinstance(item, call_class)
+        assert isinstance(item, self._classes['call'])
         return super().name_for(id(item))
 
     @ManagesNames.with_name
@@ -177,6 +680,11 @@ class CallManager(HasSession, ManagesNames, AbstractCallManager):
                  on_progress: Callable=None,
                  *,
                  name: str=None,
+                 keep: str='all',
+                 max_invocations: int=None,
+                 cache: LRU=None,
+                 coalesce: bool=False,
+                 store_progress: bool=True,
                  **call_options_kwargs) -> AbstractCall:
         """
         Generates a Callable which can be called to initiate an asynchronous
@@ -186,17 +694,34 @@ class CallManager(HasSession, ManagesNames, AbstractCallManager):
         :param on_progress:
         :param timeout:
         :param name: Optional. Keyword-only argument.
+        :param keep: Optional. Keyword-only argument. Which Invocations to
+            retain: 'all', 'failures' or 'none'
+        :param max_invocations: Optional. Keyword-only argument. Maximum
+            number of Invocations to retain, the oldest being evicted first
+        :param cache: Optional. Keyword-only argument. Cache of results keyed
+            on the call arguments, e.g. LRU(maxsize=10000, ttl=30). Cached
+            Invocations complete immediately without calling the router
+        :param coalesce: Optional. Keyword-only argument. Whether concurrent
+            calls with equal arguments share a single router call
+        :param store_progress: Optional. Keyword-only argument. Whether
+            Invocations store their progressive results in progress
         :return:
         """
         # while name is None or name in self.__call_name__calls:
         #     name = generate_name(name)
-        print(f'Generating call to {procedure} with name {name}')
-        call_class = get_class(environ['call'])
-        call = call_class(
+        self._output.info(
+            'Generating call to %s with name %s', procedure, name
+        )
+        call = self._classes['call'](
             manager=self,
             procedure=procedure,
             on_progress=on_progress,
-            call_options_kwargs=call_options_kwargs
+            call_options_kwargs=call_options_kwargs,
+            keep=keep,
+            max_invocations=max_invocations,
+            cache=cache,
+            coalesce=coalesce,
+            store_progress=store_progress
         )
         call_id = id(call)
         self._items[call_id] = call
@@ -205,37 +730,199 @@ class CallManager(HasSession, ManagesNames, AbstractCallManager):
         return call
 
 
-class Registration(HasName, ManagesNames, HasFuture, AbstractRegistration):
-    Hit = namedtuple('Hit', ('timestamp', 'args', 'kwargs'))
+class Admission(object):
+    """
+    Admission control for a Registration end-point. At most max_concurrency
+    calls run at once and up to max_queue further calls wait for a slot in
+    arrival order, without limit if max_queue is None. Calls arriving once
+    the queue is full fail fast with a Rejected ApplicationError carrying
+    reject_uri
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_concurrency: int,
+                 max_queue: int=None, reject_uri: str=REJECT_URI):
+        assert isinstance(max_concurrency, int) and max_concurrency > 0
+        assert max_queue is None or (
+            isinstance(max_queue, int) and max_queue >= 0
+        )
+        self._loop = loop
+        self._max_concurrency = max_concurrency
+        self._max_queue = max_queue
+        self._reject_uri = reject_uri
+        self._waiters = deque()
+        self._running = 0
+        self._accepted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._completed = 0
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    @property
+    def max_queue(self) -> Optional[int]:
+        return self._max_queue
+
+    @property
+    def reject_uri(self) -> str:
+        return self._reject_uri
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def accepted(self) -> int:
+        """
+        Number of calls admitted to run, whether immediately or after queueing
+        """
+        return self._accepted
+
+    @property
+    def queued(self) -> int:
+        """
+        Number of calls which had to wait in the queue
+        """
+        return self._queued
+
+    @property
+    def rejected(self) -> int:
+        return self._rejected
+
+    @property
+    def completed(self) -> int:
+        return self._completed
+
+    async def acquire(self):
+        """
+        Wait for a slot to run a call in, raising Rejected if the queue is
+        full
+
+        :return:
+        """
+        waiters = self._waiters
+        if self._running < self._max_concurrency and not waiters:
+            self._running += 1
+            self._accepted += 1
+            return
+        if self._max_queue is not None and len(waiters) >= self._max_queue:
+            from opendna.autobahn.repl.wamp import Rejected
+
+            self._rejected += 1
+            raise Rejected(
+                self._reject_uri,
+                f'{self._running} calls running and {len(waiters)} queued'
+            )
+        waiter = self._loop.create_future()
+        waiters.append(waiter)
+        self._queued += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # The slot was handed over just before cancellation
+                self._release()
+            raise
+        self._accepted += 1
+
+    def _release(self):
+        waiters = self._waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    def release(self):
+        """
+        Free the slot of a completed call, handing it to the longest waiting
+        call if any
+
+        :return:
+        """
+        self._completed += 1
+        self._release()
+
+    def __repr__(self):
+        return (
+            f'<Admission max_concurrency={self._max_concurrency} '
+            f'max_queue={self._max_queue} running={self._running} '
+            f'queue_depth={len(self._waiters)} accepted={self._accepted} '
+            f'queued={self._queued} rejected={self._rejected} '
+            f'completed={self._completed}>'
+        )
+
+
+class Hit(Received):
+    """
+    Record of a call to a Registration end-point
+    """
+    __slots__ = ()
+
+
+class Registration(HasName, HasOutput, NamesSequentially, ManagesNames,
+                   HasFuture, AbstractRegistration):
+    NAME_PREFIX = 'h'
+    Hit = Hit
 
     def __init__(self, manager: Union[ManagesNames, AbstractRegistrationManager],
                  procedure: str, endpoint: Callable = None, prefix: str = None,
-                 register_options_kwargs: dict = None):
+                 register_options_kwargs: dict = None,
+                 executor: Union[str, Executor] = None,
+                 max_concurrency: int = None, max_queue: int = None,
+                 reject_uri: str = REJECT_URI):
         super().__init__(manager, procedure, endpoint, prefix,
-                         register_options_kwargs)
+                         register_options_kwargs, executor, max_concurrency,
+                         max_queue, reject_uri)
+        assert executor is None or not asyncio.iscoroutinefunction(endpoint)
+        assert max_queue is None or max_concurrency is not None
         self.__init_manages_names__()
         self.__init_has_name__(manager)
+        self.__init_has_output__(manager.output)
         self.__init_has_future__()
         self._proxy = ManagesNamesProxy(self)
+        connection_manager = manager.session.connection.manager
+        self._offload = None if executor is None else Offload(
+            connection_manager.loop,
+            connection_manager.executors.resolve(executor)
+        )
+        self._admission = None if max_concurrency is None else Admission(
+            connection_manager.loop, max_concurrency, max_queue, reject_uri
+        )
 
-        def invoke(future: asyncio.Future):
-            loop = manager.session.connection.manager.loop
-            try:
-                result = future.result()
-                self._future = asyncio.ensure_future(self._register(), loop=loop)
-            except Exception as e:
-                print(e)
-        # TODO: Fix this type confusion
-        manager.session.future.add_done_callback(invoke)
+        manager.session._enqueue(self, self._register)
 
     @property
     def hits(self) -> ManagesNamesProxy:
         return self._proxy
 
     @property
-    def registration(self) -> Optional[IRegistration]:
+    def registration(self) -> Optional['IRegistration']:
         return self._registration
 
+    @property
+    def offload(self) -> Optional[Offload]:
+        """
+        Queue depth and execution time statistics of the end-point when it
+        runs in an executor
+        """
+        return self._offload
+
+    @property
+    def admission(self) -> Optional[Admission]:
+        """
+        Counts of the calls accepted, queued, rejected and completed when
+        max_concurrency is set
+        """
+        return self._admission
+
     def deregister(self):
         if self._registration is None:
             raise Exception(f'{self._procedure} is not registered yet')
@@ -246,6 +933,10 @@ class Registration(HasName, ManagesNames, HasFuture, AbstractRegistration):
                  procedure: str=None,
                  endpoint: Callable=None,
                  prefix: str=None,
+                 *, executor: Union[str, Executor]=None,
+                 max_concurrency: int=None,
+                 max_queue: int=None,
+                 reject_uri: str=None,
                  **new_register_options_kwargs) -> AbstractRegistration:
         register_options_kwargs = deepcopy(self._register_options_kwargs)
         register_options_kwargs.update(new_register_options_kwargs)
@@ -253,71 +944,191 @@ class Registration(HasName, ManagesNames, HasFuture, AbstractRegistration):
             procedure or self._procedure,
             endpoint or self._endpoint,
             prefix or self._prefix,
+            executor=executor or self._executor,
+            max_concurrency=max_concurrency or self._max_concurrency,
+            max_queue=self._max_queue if max_queue is None else max_queue,
+            reject_uri=reject_uri or self._reject_uri,
             **register_options_kwargs
         )
 
     async def _deregister(self):
         try:
-            print(f'Deregistration of {self._procedure} with name {self.name} starting')
+            self._output.info(
+                'Deregistration of %s with name %s starting',
+                self._procedure, self.name
+            )
             await self._registration.unregister()
-            print(f'Deregistration of {self._procedure} with name {self.name} succeeded')
+            self._output.info(
+                'Deregistration of %s with name %s succeeded',
+                self._procedure, self.name
+            )
         except Exception as e:
-            print(f'Deregistration of {self._procedure} with name {self.name} failed')
+            self._output.error(
+                'Deregistration of %s with name %s failed',
+                self._procedure, self.name
+            )
             self._exception = e
 
+    def _replay(self) -> bool:
+        """
+        Re-issue this Registration on a new WAMP session if it was registered
+        and has not been deregistered
+
+        :return: Whether the Registration was re-issued
+        """
+        if self._registration is None or not self._registration.active:
+            return False
+        loop = self._manager.session.connection.manager.loop
+        self._registration = None
+        self._future = asyncio.ensure_future(self._register(), loop=loop)
+        return True
+
     async def _register(self):
+        from autobahn.wamp import RegisterOptions
+
         try:
             options = RegisterOptions(**self._register_options_kwargs)
             session = self._manager.session.application_session
-            print(f'Registration of {self._procedure} with name {self.name} starting')
+            self._output.info(
+                'Registration of %s with name %s starting',
+                self._procedure, self.name
+            )
             self._registration = await session.register(
                 endpoint=self._endpoint_wrapper,
                 procedure=self._procedure,
                 options=options,
                 prefix=self._prefix
             )
-            print(f'Registration of {self._procedure} with name {self.name} succeeded')
+            self._output.info(
+                'Registration of %s with name %s succeeded',
+                self._procedure, self.name
+            )
         except Exception as e:
-            print(f'Registration of {self._procedure} with name {self.name} failed')
+            self._output.error(
+                'Registration of %s with name %s failed',
+                self._procedure, self.name
+            )
             self._exception = e
 
+    def _fail(self, exception: Exception):
+        self._output.error(
+            'Registration of %s with name %s failed',
+            self._procedure, self.name
+        )
+        self._exception = exception
+
     async def _endpoint_wrapper(self, *args, **kwargs):
-        name = self._generate_name()
-        now = datetime.now()
+        admission = self._admission
+        if admission is None:
+            self._store_hit(time(), args, kwargs)
+            return await self._call_endpoint(args, kwargs)
+        received = time()
+        try:
+            await admission.acquire()
+        except Exception:
+            self._output.warning(
+                'End-point %s named %s rejected a call',
+                self._procedure, self.name,
+                summary=('calls rejected by end-point', self._procedure)
+            )
+            raise
+        try:
+            self._store_hit(received, args, kwargs)
+            return await self._call_endpoint(args, kwargs)
+        finally:
+            admission.release()
+
+    def _store_hit(self, timestamp: float, args: tuple, kwargs: dict):
+        """
+        Store, report and record a call accepted by the end-point
+
+        :param timestamp: Time at which the call was received
+        :param args:
+        :param kwargs:
+        :return:
+        """
         hit_id = len(self._items)
-        self._items[hit_id] = self.Hit(now, args, kwargs)
-        self._items__names[hit_id] = name
-        self._names__items[name] = hit_id
-        print(f'End-point {self._procedure} named {self.name} hit at {now}. '
-              f'Hit named {name} stored')
+        hit = self._items[hit_id] = self.Hit(timestamp, args, kwargs)
+        if self._output.enabled(INFO):
+            self._output.info(
+                'End-point %s named %s hit at %s. Hit named %s stored',
+                self._procedure, self.name, hit.timestamp,
+                self._name_of(hit_id),
+                summary=('hits on end-point', self._procedure)
+            )
+        recorder = self._manager.session.recorder
+        if recorder is not None:
+            recorder.record(RECORD_HIT, self._procedure, args, kwargs)
+
+    async def _call_endpoint(self, args: tuple, kwargs: dict):
         if asyncio.iscoroutinefunction(self._endpoint):
             return await self._endpoint(*args, **kwargs)
         if callable(self._endpoint):
+            if self._offload is not None:
+                return await self._offload.run(self._endpoint, args, kwargs)
             return self._endpoint(*args, **kwargs)
 
 
-class RegistrationManager(HasSession, ManagesNames, AbstractRegistrationManager):
+class RegistrationManager(HasSession, HasClasses, HasOutput, ManagesNames,
+                          AbstractRegistrationManager):
     def __init__(self, session: AbstractSession):
         self.__init_has_session__(session)
+        self.__init_has_classes__(session.classes)
+        self.__init_has_output__(session.output)
         self.__init_manages_names__()
 
     def name_for(self, item):
-        registration_class = get_class(environ['registration'])
-        assert isinstance(item, registration_class)
+        assert isinstance(item, self._classes['registration'])
         return super().name_for(id(item))
 
+    def _replay(self) -> int:
+        """
+        Re-issue every live Registration after the session reconnects
+
+        :return: Number of Registrations re-issued
+        """
+        return sum(
+            registration._replay() for registration in self._items.values()
+        )
+
     @ManagesNames.with_name
     def __call__(self,
                  procedure: str,
                  endpoint: Callable=None,
                  prefix: str=None,
                  *, name: str=None,
+                 executor: Union[str, Executor]=None,
+                 max_concurrency: int=None,
+                 max_queue: int=None,
+                 reject_uri: str=REJECT_URI,
                  **register_options_kwargs) -> AbstractRegistration:
-        print(f'Generating registration for {procedure} with name {name}')
-        registration_class = get_class(environ['registration'])
-        registration = registration_class(
+        """
+        Registers a WAMP RPC end-point
+
+        :param procedure:
+        :param endpoint: Optional. Function or coroutine called for each call
+        :param prefix:
+        :param name: Optional. Keyword-only argument.
+        :param executor: Optional. Keyword-only argument. Executor, or the
+            name of an executor in ConnectionManager.executors such as
+            'thread' or 'process', to run a synchronous endpoint in
+        :param max_concurrency: Optional. Keyword-only argument. Maximum
+            number of calls to endpoint running at once, in executor or not
+        :param max_queue: Optional. Keyword-only argument. Maximum number of
+            calls waiting for one of the max_concurrency slots. Further calls
+            fail with reject_uri. Unlimited if None
+        :param reject_uri: Optional. Keyword-only argument. WAMP error URI of
+            calls rejected because the queue is full
+        :return:
+        """
+        self._output.info(
+            'Generating registration for %s with name %s', procedure, name
+        )
+        registration = self._classes['registration'](
             manager=self, procedure=procedure, endpoint=endpoint, prefix=prefix,
-            register_options_kwargs=register_options_kwargs
+            register_options_kwargs=register_options_kwargs,
+            executor=executor, max_concurrency=max_concurrency,
+            max_queue=max_queue, reject_uri=reject_uri
         )
         register_id = id(registration)
         self._items[register_id] = registration
@@ -22,24 +22,35 @@
 # SOFTWARE.
 ################################################################################
 import asyncio
-from os import environ
+from collections import deque
+from functools import partial
 
-from typing import Union, List
-
-from autobahn.wamp import ComponentConfig
+from typing import Union, List, Callable, Awaitable, Iterable, Optional, \
+    TYPE_CHECKING
 
 from opendna.autobahn.repl.abc import (
     AbstractSession,
     AbstractConnection
 )
 from opendna.autobahn.repl.mixins import ManagesNames, HasName, HasFuture, \
-    ManagesNamesProxy
-from opendna.autobahn.repl.utils import get_class
+    ManagesNamesProxy, HasClasses, HasOutput
+from opendna.autobahn.repl.recording import Recorder, ReplayResult, \
+    read_records, REPLAY_KINDS
+from opendna.autobahn.repl.utils import RetryPolicy
+
+if TYPE_CHECKING:
+    from autobahn.wamp import ComponentConfig
+    from autobahn.wamp.message import Welcome
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
 
+DEFAULT_RECONNECT_POLICY = RetryPolicy(
+    retries=None, initial_delay=0.5, factor=2.0, max_delay=30.0, jitter=0.5
+)
+DEFAULT_MAX_CONCURRENCY = 1000
+
 
-class Session(HasFuture, HasName, AbstractSession):
+class Session(HasFuture, HasName, HasClasses, HasOutput, AbstractSession):
     def __init__(self,
                  connection: Union[ManagesNames, AbstractConnection],
                  authmethods: Union[str, List[str]]= 'anonymous',
@@ -49,7 +60,30 @@ class Session(HasFuture, HasName, AbstractSession):
                  resumable: bool=None,
                  resume_session: int=None,
                  resume_token: str=None,
+                 *,
+                 reconnect: RetryPolicy=None,
+                 max_concurrency: int=DEFAULT_MAX_CONCURRENCY,
                  **session_kwargs):
+        """
+
+        :param connection:
+        :param authmethods:
+        :param authid:
+        :param authrole:
+        :param authextra:
+        :param resumable:
+        :param resume_session:
+        :param resume_token:
+        :param reconnect: Optional. Keyword-only argument. RetryPolicy
+            governing reconnection after a joined session loses its transport.
+            Defaults to DEFAULT_RECONNECT_POLICY. Use RetryPolicy(retries=0)
+            to disable reconnection
+        :param max_concurrency: Optional. Keyword-only argument. Maximum
+            number of queued operations (Invocations, Publications,
+            Registrations and Subscriptions) in flight at once. None for no
+            limit
+        :param session_kwargs:
+        """
         super().__init__(
             connection=connection, authmethods=authmethods, authid=authid,
             authrole=authrole, authextra=authextra, resumable=resumable,
@@ -57,37 +91,342 @@ class Session(HasFuture, HasName, AbstractSession):
             **session_kwargs
         )
         self.__init_has_name__(connection)
-        self.__init_has_future__(connection.manager.loop.create_future())
-        call_manager_class = get_class(environ['call_manager'])
-        self._call_manager = call_manager_class(self)
+        assert max_concurrency is None or max_concurrency > 0
+        self._queue = deque()
+        self._max_concurrency = max_concurrency
+        self._operations = set()
+        self._failures = 0
+        self._ready = False
+        self._failed = None
+        self.__init_has_future__(self._create_future())
+        self.__init_has_classes__(connection.classes)
+        self.__init_has_output__(connection.output)
+        classes = self._classes
+        self._call_manager = classes['call_manager'](self)
         self._call_manager_proxy = ManagesNamesProxy(self._call_manager)
-        registration_manager_class = get_class(environ['registration_manager'])
-        self._register_manager = registration_manager_class(self)
+        self._register_manager = classes['registration_manager'](self)
         self._register_manager_proxy = ManagesNamesProxy(self._register_manager)
-        publisher_manager_class = get_class(environ['publisher_manager'])
-        self._publisher_manager = publisher_manager_class(self)
+        self._publisher_manager = classes['publisher_manager'](self)
         self._publisher_manager_proxy = ManagesNamesProxy(self._publisher_manager)
-        subscription_manager_class = get_class(environ['subscription_manager'])
-        self._subscribe_manager = subscription_manager_class(self)
+        self._subscribe_manager = classes['subscription_manager'](self)
         self._subscribe_manager_proxy = ManagesNamesProxy(self._subscribe_manager)
-        application_runner_class = get_class(environ['application_runner'])
-        runner = application_runner_class(
+        self._reconnect = (
+            DEFAULT_RECONNECT_POLICY if reconnect is None else reconnect
+        )
+        self._attempt = 0
+        self._has_joined = False
+        self._reconnects = 0
+        self._recorder = None
+        self._runner = classes['application_runner'](
             connection.uri, connection.realm, connection.extra,
             connection.serializers, connection.ssl, connection.proxy,
             connection.headers
         )
+        self._connect()
+
+    @property
+    def reconnect(self) -> RetryPolicy:
+        return self._reconnect
+
+    @property
+    def reconnects(self) -> int:
+        """
+        Number of times this session has re-joined after losing its transport
+
+        :return:
+        """
+        return self._reconnects
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of operations waiting to be sent
+
+        :return:
+        """
+        return len(self._queue)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of queued operations which have been sent and not yet completed
+
+        :return:
+        """
+        return len(self._operations)
+
+    @property
+    def outstanding(self) -> List[asyncio.Future]:
+        """
+        Futures to wait on for the queued operations of this Session to
+        settle: those of operations in flight and, while operations are still
+        queued, the future of the Session itself
+
+        :return:
+        """
+        outstanding = list(self._operations)
+        if self._queue and not self._future.cancelled():
+            outstanding.append(self._future)
+        return outstanding
+
+    @property
+    def failures(self) -> int:
+        """
+        Number of queued operations which failed, including those failed
+        because the Session could not join
+
+        :return:
+        """
+        return self._failures
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    @property
+    def recorder(self) -> Optional[Recorder]:
+        return self._recorder
+
+    def record(self, path: str) -> Recorder:
+        """
+        Start appending the traffic of this Session to the file at path:
+        outgoing calls and publications along with incoming events and
+        end-point hits. Any recording in progress is stopped first
+
+        :param path:
+        :return:
+        """
+        self.stop_recording()
+        self._recorder = self._classes['recorder'](path)
+        self._output.info('Session %s recording to %s', self.name, path)
+        return self._recorder
+
+    def stop_recording(self) -> Optional[Recorder]:
+        """
+        Stop the recording in progress, if any, and close its file
+
+        :return: The Recorder stopped
+        """
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
+    def replay(self, path: str, speed: Optional[float]=1.0,
+               kinds: Iterable[str]=REPLAY_KINDS,
+               max_in_flight: int=None) -> ReplayResult:
+        """
+        Schedules a replay of a recording made by Session.record and returns
+        its ReplayResult immediately. Records are sent through Calls and
+        Publishers of this Session at their recorded times divided by speed,
+        or as fast as possible if speed is None, and the ReplayResult future
+        resolves once every record sent has completed
+
+        :param path:
+        :param speed: Replay rate relative to the recording, e.g. 1.0 or 10.0,
+            or None for as fast as possible
+        :param kinds: Kinds of record to replay. Calls and publications by
+            default. End-point hits are replayed as calls and events as
+            publications
+        :param max_in_flight: Optional. Maximum number of records sent but
+            not yet completed, beyond which sending waits
+        :return:
+        """
+        assert speed is None or speed > 0
+        assert max_in_flight is None or max_in_flight > 0
+        replay_result = ReplayResult(path, speed)
+        loop = self._connection.manager.loop
+        replay_result._future = asyncio.ensure_future(
+            replay_result._run(self, read_records(path), kinds, max_in_flight),
+            loop=loop
+        )
+        return replay_result
+
+    def _create_future(self) -> asyncio.Future:
+        future = self._connection.manager.loop.create_future()
+        future.add_done_callback(self._future_done)
+        return future
+
+    def _future_done(self, future: asyncio.Future):
+        if future is not self._future or future.cancelled():
+            return
+        exception = future.exception()
+        if exception is not None:
+            self._fail_queue(exception)
+
+    def _enqueue(self, item: HasFuture, operation: Callable[[], Awaitable]):
+        """
+        Queue operation to be run once the session has joined, in FIFO order
+        and subject to max_concurrency. The task running operation is stored
+        as the future of item
+
+        :param item:
+        :param operation:
+        :return:
+        """
+        if self._failed is not None:
+            # The session will never join, so fail the item straight away.
+            # Completion is deferred so the owner has tracked item beforehand
+            item._future = self._failed_future(self._failed)
+            self._connection.manager.loop.call_soon(
+                self._fail_item, item, self._failed
+            )
+            return
+        self._queue.append((item, operation))
+        if self._ready:
+            self._drain()
+
+    def _drain(self):
+        queue = self._queue
+        limit = self._max_concurrency
+        loop = self._connection.manager.loop
+        operations = self._operations
+        while queue and (limit is None or len(operations) < limit):
+            item, operation = queue.popleft()
+            item._future = task = asyncio.ensure_future(operation(), loop=loop)
+            operations.add(task)
+            task.add_done_callback(partial(self._operation_done, item))
+
+    def _operation_done(self, item: HasFuture, task: asyncio.Future):
+        self._operations.discard(task)
+        failed = task.cancelled() or task.exception() is not None
+        if failed or item._exception is not None:
+            self._failures += 1
+        if item._future is task and not failed:
+            # Swap the finished task, which holds on to its coroutine, for a
+            # plain settled future so that retained items stay small
+            settled = task.get_loop().create_future()
+            settled.set_result(task.result())
+            item._future = settled
+        if self._ready and self._queue:
+            self._drain()
+
+    def _failed_future(self, exception: Exception) -> asyncio.Future:
+        future = self._connection.manager.loop.create_future()
+        future.set_exception(exception)
+        # The failure is reported on the item itself, so don't let asyncio
+        # complain about a future whose exception was never retrieved
+        future.exception()
+        return future
+
+    def _fail_item(self, item: HasFuture, exception: Exception):
+        """
+        Complete an item whose operation will never run, and which holds a
+        failed future, through the normal completion path of its owner
+
+        :param item:
+        :param exception:
+        :return:
+        """
+        self._failures += 1
+        item._fail(exception)
+
+    def _fail_queue(self, exception: Exception):
+        queue = self._queue
+        failed = len(queue)
+        while queue:
+            item, _ = queue.popleft()
+            item._future = self._failed_future(exception)
+            self._fail_item(item, exception)
+        if failed:
+            self._output.error(
+                '%s queued operations on session %s failed: %s',
+                failed, self.name, exception
+            )
+
+    def _connect(self):
         asyncio.ensure_future(
-            runner.run(
+            self._run(), loop=self._connection.manager.loop
+        )
+
+    async def _run(self):
+        try:
+            await self._runner.run(
                 make=self._factory,
                 start_loop=False,
                 log_level='info'  # TODO: Support custom log levels?
-            ),
-            loop=connection.manager.loop
+            )
+        except Exception as e:
+            self._output.error(
+                'Connection of session %s to %s failed: %s',
+                self.name, self._connection.uri, e
+            )
+            self._connection_lost(e)
+
+    def _welcomed(self, welcome: 'Welcome'):
+        """
+        Record the resumption details supplied by the router so that they can
+        be used if the session needs to reconnect
+
+        :param welcome:
+        :return:
+        """
+        if welcome.resumable and welcome.resume_token:
+            self._resume_session = welcome.session
+            self._resume_token = welcome.resume_token
+
+    def _joined(self, resumed: bool):
+        """
+        Called when the session has joined, before its future resolves, so
+        that operations issued as soon as the future has resolved are sent
+        straight away. If this is a reconnection which did not resume the
+        previous WAMP session then every live Registration and Subscription is
+        re-issued before queued operations are sent
+
+        :param resumed:
+        :return:
+        """
+        if self._has_joined:
+            self._reconnects += 1
+            if resumed:
+                self._output.warning('Session %s resumed', self.name)
+            else:
+                registrations = self._register_manager._replay()
+                subscriptions = self._subscribe_manager._replay()
+                self._output.warning(
+                    'Session %s reconnected. Re-issued %s registrations and '
+                    '%s subscriptions', self.name, registrations, subscriptions
+                )
+        self._has_joined = True
+        self._attempt = 0
+        self._ready = True
+        self._drain()
+
+    def _connection_lost(self, exception: Exception):
+        """
+        Called when the transport is lost or could not be established other
+        than as a result of leaving. Sessions which have joined at least once
+        reconnect according to their reconnect policy, with operations issued
+        in the meantime queued until the session joins again
+
+        :param exception:
+        :return:
+        """
+        loop = self._connection.manager.loop
+        if self._has_joined and self._future.done():
+            self._ready = False
+            self._future = self._create_future()
+        if not self._has_joined or \
+                not self._reconnect.should_retry(self._attempt):
+            self._output.error(
+                'Session %s disconnected: %s', self.name, exception
+            )
+            self._failed = exception
+            if not self._future.done():
+                self._future.set_exception(exception)
+            else:
+                self._fail_queue(exception)
+            return
+        delay = self._reconnect.delay(self._attempt)
+        self._attempt += 1
+        self._output.warning(
+            'Session %s disconnected: %s. Reconnecting in %.2fs (attempt %s)',
+            self.name, exception, delay, self._attempt
         )
+        loop.call_later(delay, self._connect)
 
-    def _factory(self, config: ComponentConfig):
-        application_session_class = get_class(environ['application_session'])
-        self._application_session = application_session_class(
+    def _factory(self, config: 'ComponentConfig'):
+        self._application_session = self._classes['application_session'](
             self, self._future, config
         )
         return self._application_session
@@ -0,0 +1,260 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from typing import Optional
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class LatencyHistogram(object):
+    """
+    Streaming, constant-memory latency histogram in the style of HdrHistogram.
+
+    Latencies are recorded in seconds and stored as whole microseconds in
+    log-linear buckets: values below 2**precision_bits microseconds are
+    recorded exactly while larger values are recorded with a relative error
+    of at most 2**(1-precision_bits) (under 1% with the default of 8 bits).
+    Memory use grows only with the logarithm of the largest value recorded
+    """
+    __slots__ = (
+        '_sub_bits', '_sub_count', '_half', '_counts', '_count', '_total',
+        '_min', '_max'
+    )
+
+    def __init__(self, precision_bits: int=8):
+        assert precision_bits > 1
+        self._sub_bits = precision_bits
+        self._sub_count = 1 << precision_bits
+        self._half = self._sub_count >> 1
+        self._counts = []
+        self._count = 0
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_count:
+            return value
+        exponent = value.bit_length() - self._sub_bits
+        return exponent * self._half + (value >> exponent)
+
+    def _value(self, index: int) -> int:
+        """
+        Highest value (in microseconds) recorded in the bucket at index
+        """
+        if index < self._sub_count:
+            return index
+        exponent = index // self._half - 1
+        return ((index - exponent * self._half + 1) << exponent) - 1
+
+    def record(self, latency: float):
+        """
+        Record a latency given in seconds
+
+        :param latency:
+        :return:
+        """
+        index = self._index(max(int(latency * 1e6), 0))
+        counts = self._counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self._count += 1
+        self._total += latency
+        if self._min is None or latency < self._min:
+            self._min = latency
+        if self._max is None or latency > self._max:
+            self._max = latency
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._total / self._count if self._count else None
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Latency in seconds at or below which percentile percent of the
+        recorded latencies fall
+
+        :param percentile: Number between 0 and 100
+        :return:
+        """
+        if not self._count:
+            return None
+        target = max(1, -(-self._count * percentile // 100))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index) / 1e6, self._max)
+        return self._max
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p90(self) -> Optional[float]:
+        return self.percentile(90)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(99)
+
+    @property
+    def p999(self) -> Optional[float]:
+        return self.percentile(99.9)
+
+    def reset(self):
+        self._counts = []
+        self._count = 0
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    def __repr__(self):
+        if not self._count:
+            return '<LatencyHistogram count=0>'
+        return (
+            f'<LatencyHistogram count={self._count} '
+            f'p50={self.p50 * 1000:.3f}ms p90={self.p90 * 1000:.3f}ms '
+            f'p99={self.p99 * 1000:.3f}ms p99.9={self.p999 * 1000:.3f}ms '
+            f'max={self._max * 1000:.3f}ms>'
+        )
+
+
+class CallStats(object):
+    """
+    Aggregate statistics for the invocations of a Call: counts, error rate,
+    throughput and histograms of the latency of each invocation (time from
+    being sent to completing) and of its queue delay (time from being created
+    to being sent)
+    """
+    def __init__(self):
+        self._latency = LatencyHistogram()
+        self._queue_delay = LatencyHistogram()
+        self._count = 0
+        self._errors = 0
+        self._first = None
+        self._last = None
+
+    def record(self, queued_at: Optional[float], sent_at: Optional[float],
+               completed_at: float, failed: bool):
+        """
+        Record a completed invocation using time.perf_counter timestamps
+
+        :param queued_at: Optional. None when the invocation was not queued
+        :param sent_at: Optional. None when the invocation failed before it
+            was sent, in which case it counts as an error without a latency
+            or queue delay
+        :param completed_at:
+        :param failed:
+        :return:
+        """
+        started = next(
+            at for at in (queued_at, sent_at, completed_at) if at is not None
+        )
+        if sent_at is not None:
+            if queued_at is not None:
+                self._queue_delay.record(sent_at - queued_at)
+            self._latency.record(completed_at - sent_at)
+        self._count += 1
+        if failed:
+            self._errors += 1
+        if self._first is None or started < self._first:
+            self._first = started
+        self._last = completed_at
+
+    @property
+    def latency(self) -> LatencyHistogram:
+        return self._latency
+
+    @property
+    def queue_delay(self) -> LatencyHistogram:
+        return self._queue_delay
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def errors(self) -> int:
+        return self._errors
+
+    @property
+    def error_rate(self) -> Optional[float]:
+        return self._errors / self._count if self._count else None
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """
+        Completed invocations per second between the first invocation being
+        created and the last one completing
+        """
+        if not self._count:
+            return None
+        elapsed = self._last - self._first
+        return self._count / elapsed if elapsed > 0 else None
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self._latency.p50
+
+    @property
+    def p90(self) -> Optional[float]:
+        return self._latency.p90
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self._latency.p99
+
+    @property
+    def p999(self) -> Optional[float]:
+        return self._latency.p999
+
+    def reset(self):
+        self.__init__()
+
+    def __repr__(self):
+        if not self._count:
+            return '<CallStats count=0>'
+        return (
+            f'<CallStats count={self._count} '
+            f'error_rate={self.error_rate:.2%} '
+            f'throughput={self.throughput or 0:.1f}/s '
+            f'p50={(self.p50 or 0) * 1000:.3f}ms '
+            f'p90={(self.p90 or 0) * 1000:.3f}ms '
+            f'p99={(self.p99 or 0) * 1000:.3f}ms '
+            f'p99.9={(self.p999 or 0) * 1000:.3f}ms>'
+        )
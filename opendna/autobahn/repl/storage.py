@@ -0,0 +1,400 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from array import array
+from bisect import bisect_right
+from mmap import mmap, ACCESS_READ
+from os import listdir, makedirs, remove, replace
+from os.path import join
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from struct import Struct
+from typing import Iterator, Tuple, Optional
+
+from opendna.autobahn.repl.utils import Received
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+SEGMENT_SIZE = 64 * 1024 * 1024
+SEGMENT_SUFFIX = '.seg'
+FIRST_ID_FILE = 'first_id'
+LOCK_FILE = 'lock'
+_LENGTH = Struct('<I')
+
+try:
+    from fcntl import flock, LOCK_EX, LOCK_NB
+
+    def _lock(file):
+        flock(file.fileno(), LOCK_EX | LOCK_NB)
+except ImportError:  # Windows
+    from msvcrt import locking, LK_NBLCK
+
+    def _lock(file):
+        locking(file.fileno(), LK_NBLCK, 1)
+
+
+class Segment(object):
+    """
+    A single file of an EventLog holding the records with consecutive ids
+    from first_id, along with the offset of each record in the file. The file
+    is memory-mapped for reading and re-mapped once records are read beyond
+    the mapped length
+    """
+    __slots__ = ('_path', '_first_id', '_offsets', '_size', '_file', '_map')
+
+    def __init__(self, path: str, first_id: int, writable: bool=False):
+        self._path = path
+        self._first_id = first_id
+        self._offsets = array('Q')
+        self._size = 0
+        self._file = open(path, 'ab') if writable else None
+        self._map = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def first_id(self) -> int:
+        return self._first_id
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def scan(self):
+        """
+        Rebuild the offset index of an existing file, ignoring a truncated
+        record at its end
+
+        :return:
+        """
+        with open(self._path, 'rb') as file:
+            data = file.read()
+        offsets = self._offsets
+        offset, end = 0, len(data)
+        while offset + _LENGTH.size <= end:
+            length, = _LENGTH.unpack_from(data, offset)
+            if offset + _LENGTH.size + length > end:
+                break
+            offsets.append(offset)
+            offset += _LENGTH.size + length
+        self._size = offset
+
+    def append(self, data: bytes):
+        self._offsets.append(self._size)
+        self._file.write(_LENGTH.pack(len(data)))
+        self._file.write(data)
+        self._size += _LENGTH.size + len(data)
+
+    def read(self, index: int) -> bytes:
+        """
+        The serialized record stored at index within this segment
+
+        :param index:
+        :return:
+        """
+        offsets = self._offsets
+        start = offsets[index] + _LENGTH.size
+        end = offsets[index + 1] if index + 1 < len(offsets) else self._size
+        if self._map is None or end > len(self._map):
+            self._remap()
+        return self._map[start:end]
+
+    def _remap(self):
+        if self._file is not None:
+            self._file.flush()
+        if self._map is not None:
+            self._map.close()
+        with open(self._path, 'rb') as file:
+            self._map = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+    def seal(self):
+        """
+        Flush and close the file once no more records will be appended
+
+        :return:
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        self.seal()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class EventLog(object):
+    """
+    Append-only store of Received records, such as Subscription events, kept
+    under consecutive ids in a directory of segment files rather than in
+    memory. Each record is appended to the active segment through a buffered
+    file as a length-prefixed pickle of (time, args, kwargs) and only an
+    8-byte offset per record is kept in memory. Records are read lazily
+    through memory-mapped segments. Once a segment fills up past segment_size
+    a new one is started, and segments are deleted once every record they
+    hold has been deleted, which is only permitted oldest first.
+
+    The log supports the parts of the dict interface used by ManagesNames
+    and RetainsItems, so it can replace their item storage. An existing
+    directory is re-opened with ids continuing after its last record. The id
+    of the first record not yet deleted is stored alongside the segments
+    whenever a segment is deleted and when the log is flushed or closed, so
+    that deleted records stay deleted once the directory is re-opened.
+
+    Only one EventLog may write to a directory at a time, which is enforced
+    using a lock file. Logs opened with read_only do not take the lock and
+    cannot be written to. As records are pickled, only open logs written by
+    a trusted source
+    """
+    def __init__(self, path: str, record_class: type=Received,
+                 segment_size: int=SEGMENT_SIZE, *, read_only: bool=False):
+        assert segment_size > 0
+        makedirs(path, exist_ok=True)
+        self._path = path
+        self._record_class = record_class
+        self._segment_size = segment_size
+        self._read_only = read_only
+        self._lock = None
+        if not read_only:
+            self._lock = open(join(path, LOCK_FILE), 'ab')
+            try:
+                _lock(self._lock)
+            except OSError:
+                self._lock.close()
+                raise RuntimeError(
+                    f'Event log {path} is already open for writing'
+                ) from None
+        self._segments = []
+        self._first_ids = []
+        for file_name in sorted(listdir(path)):
+            if file_name.endswith(SEGMENT_SUFFIX):
+                segment = Segment(
+                    join(path, file_name),
+                    int(file_name[:-len(SEGMENT_SUFFIX)])
+                )
+                segment.scan()
+                self._add_segment(segment)
+        first_id = self._read_first_id()
+        if self._segments:
+            last = self._segments[-1]
+            self._next = last.first_id + len(last)
+            self._first = min(
+                max(self._segments[0].first_id, first_id), self._next
+            )
+            if not read_only:
+                self._delete_segments()
+        else:
+            self._first = self._next = first_id
+        self._stored_first = self._first
+        self._active = None
+        self._closed = False
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def first_id(self) -> int:
+        return self._first
+
+    @property
+    def next_id(self) -> int:
+        return self._next
+
+    @property
+    def segments(self) -> int:
+        return len(self._segments)
+
+    @property
+    def size(self) -> int:
+        """
+        Number of bytes stored across all segments
+
+        :return:
+        """
+        return sum(segment.size for segment in self._segments)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def read_only(self) -> bool:
+        return self._read_only
+
+    def _read_first_id(self) -> int:
+        try:
+            with open(join(self._path, FIRST_ID_FILE)) as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def _store_first_id(self):
+        """
+        Store the id of the first record not yet deleted, replacing the file
+        holding it so that it is never left partially written
+
+        :return:
+        """
+        if self._stored_first == self._first:
+            return
+        path = join(self._path, FIRST_ID_FILE)
+        with open(f'{path}.tmp', 'w') as file:
+            file.write(str(self._first))
+        replace(f'{path}.tmp', path)
+        self._stored_first = self._first
+
+    def _delete_segments(self) -> bool:
+        """
+        Delete the segments holding only deleted records
+
+        :return: Whether any segments were deleted
+        """
+        segments = self._segments
+        deleted = False
+        while len(segments) > 1 and segments[1].first_id <= self._first:
+            segment = segments.pop(0)
+            self._first_ids.pop(0)
+            segment.close()
+            remove(segment.path)
+            deleted = True
+        return deleted
+
+    def _add_segment(self, segment: Segment):
+        self._segments.append(segment)
+        self._first_ids.append(segment.first_id)
+
+    def _roll(self) -> Segment:
+        if self._active is not None:
+            self._active.seal()
+        self._active = Segment(
+            join(self._path, f'{self._next:020d}{SEGMENT_SUFFIX}'),
+            self._next, writable=True
+        )
+        self._add_segment(self._active)
+        return self._active
+
+    def append(self, time: float, args: tuple, kwargs: Optional[dict]) -> int:
+        """
+        Append a record, returning its id
+
+        :param time:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        assert not self._closed and not self._read_only
+        segment = self._active
+        if segment is None or segment.size >= self._segment_size:
+            segment = self._roll()
+        segment.append(dumps((time, args, kwargs or None), HIGHEST_PROTOCOL))
+        item_id = self._next
+        self._next += 1
+        return item_id
+
+    def _locate(self, item_id: int) -> Tuple[Segment, int]:
+        if not (isinstance(item_id, int)
+                and self._first <= item_id < self._next):
+            raise KeyError(item_id)
+        segment = self._segments[bisect_right(self._first_ids, item_id) - 1]
+        return segment, item_id - segment.first_id
+
+    def __getitem__(self, item_id: int) -> Received:
+        segment, index = self._locate(item_id)
+        return self._record_class(*loads(segment.read(index)))
+
+    def __setitem__(self, item_id: int, record: Received):
+        assert item_id == self._next
+        self.append(record.time, record.args, record.kwargs)
+
+    def __delitem__(self, item_id: int):
+        """
+        Delete the oldest record, deleting its segment once it is empty
+
+        :param item_id:
+        :return:
+        """
+        assert not self._read_only
+        if item_id != self._first or item_id >= self._next:
+            raise KeyError(item_id)
+        self._first += 1
+        if self._delete_segments():
+            self._store_first_id()
+
+    def __contains__(self, item_id) -> bool:
+        return isinstance(item_id, int) and self._first <= item_id < self._next
+
+    def __len__(self) -> int:
+        return self._next - self._first
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._first, self._next))
+
+    def keys(self) -> range:
+        return range(self._first, self._next)
+
+    def values(self) -> Iterator[Received]:
+        for item_id in range(self._first, self._next):
+            yield self[item_id]
+
+    def items(self) -> Iterator[Tuple[int, Received]]:
+        for item_id in range(self._first, self._next):
+            yield item_id, self[item_id]
+
+    def flush(self):
+        if self._active is not None:
+            self._active.flush()
+        if not self._read_only:
+            self._store_first_id()
+
+    def close(self):
+        """
+        Flush and close every segment and release the lock. Records remain on
+        disk and can be read by opening the directory again
+
+        :return:
+        """
+        if not self._closed:
+            if not self._read_only:
+                self._store_first_id()
+            self._closed = True
+            for segment in self._segments:
+                segment.close()
+            if self._lock is not None:
+                self._lock.close()
+                self._lock = None
+
+    def __repr__(self):
+        return (
+            f'<{type(self).__name__} {self._path} records={len(self)} '
+            f'segments={len(self._segments)} size={self.size}>'
+        )
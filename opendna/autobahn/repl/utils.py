@@ -21,8 +21,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 ################################################################################
-from random import choice, choices
+from asyncio import AbstractEventLoop
+from collections import deque
+from datetime import datetime
+from random import choice, choices, uniform
 from importlib import import_module
+from itertools import product
+from os import environ
+from typing import Iterator, Tuple
 import string
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
@@ -48,6 +54,54 @@ def generate_name(name: str=None, length: int=8):
 Keep = type('Keep', (object,), {})()
 
 
+def merge_args(args: tuple, new_args: tuple) -> tuple:
+    """
+    Merge new_args over args for re-invocation. Positions in new_args holding
+    Keep, or missing from new_args, take the value from args while surplus
+    new_args are ignored. Values are passed by reference rather than copied
+
+    :param args:
+    :param new_args:
+    :return:
+    """
+    return tuple(
+        arg if new_arg is Keep else new_arg
+        for arg, new_arg in zip(args, new_args)
+    ) + tuple(args[len(new_args):])
+
+
+def sweep(args: tuple, kwargs: dict, arg_ranges: tuple,
+          kwarg_ranges: dict) -> Iterator[Tuple[tuple, dict]]:
+    """
+    Generate (args, kwargs) pairs for every combination of the values in
+    arg_ranges and kwarg_ranges applied over the template args and kwargs.
+    Positions in arg_ranges holding Keep, or missing from arg_ranges, keep
+    the template value while surplus arg_ranges are ignored. Template values
+    are passed by reference rather than copied
+
+    :param args:
+    :param kwargs:
+    :param arg_ranges: Iterables of values for positional arguments
+    :param kwarg_ranges: Iterables of values for keyword arguments
+    :return:
+    """
+    positions = [
+        position for position, values in enumerate(arg_ranges[:len(args)])
+        if values is not Keep
+    ]
+    names = list(kwarg_ranges)
+    ranges = [arg_ranges[position] for position in positions]
+    ranges.extend(kwarg_ranges[name] for name in names)
+    split = len(positions)
+    for values in product(*ranges):
+        new_args = list(args)
+        for position, value in zip(positions, values):
+            new_args[position] = value
+        new_kwargs = dict(kwargs)
+        new_kwargs.update(zip(names, values[split:]))
+        yield tuple(new_args), new_kwargs
+
+
 def get_class(fully_qualified_classpath: str, package: str=None) -> type:
     """
     Given a classpath, returns the class referenced
@@ -60,3 +114,336 @@ def get_class(fully_qualified_classpath: str, package: str=None) -> type:
     class_name = path.pop()
     module_ = import_module('.'.join(path), package)
     return getattr(module_, class_name)
+
+
+_PREFIX = 'opendna.autobahn.repl'
+DEFAULT_CLASSPATHS = {
+    'connection_manager': f'{_PREFIX}.connections.ConnectionManager',
+    'connection': f'{_PREFIX}.connections.Connection',
+    'session': f'{_PREFIX}.sessions.Session',
+    'session_pool': f'{_PREFIX}.pools.SessionPool',
+    'call_manager': f'{_PREFIX}.rpc.CallManager',
+    'call': f'{_PREFIX}.rpc.Call',
+    'invocation': f'{_PREFIX}.rpc.Invocation',
+    'registration_manager': f'{_PREFIX}.rpc.RegistrationManager',
+    'registration': f'{_PREFIX}.rpc.Registration',
+    'publisher_manager': f'{_PREFIX}.pubsub.PublisherManager',
+    'publisher': f'{_PREFIX}.pubsub.Publisher',
+    'publication': f'{_PREFIX}.pubsub.Publication',
+    'subscription_manager': f'{_PREFIX}.pubsub.SubscriptionManager',
+    'subscription': f'{_PREFIX}.pubsub.Subscription',
+    'recorder': f'{_PREFIX}.recording.Recorder',
+    'event_log': f'{_PREFIX}.storage.EventLog',
+    'application_runner': 'autobahn.asyncio.wamp.ApplicationRunner',
+    'application_session': f'{_PREFIX}.wamp.REPLApplicationSession',
+    'output': f'{_PREFIX}.output.BufferedOutput'
+}
+
+
+class ClassRegistry(dict):
+    """
+    Mapping of class destinations (e.g. `call`, `invocation`) to the classes
+    used by the REPL. Destinations not supplied when the registry is created
+    are resolved from the classpath stored under the same key in os.environ,
+    or DEFAULT_CLASSPATHS, on first access and cached thereafter
+    """
+    def __missing__(self, key: str) -> type:
+        class_ = self[key] = get_class(
+            environ.get(key) or DEFAULT_CLASSPATHS[key]
+        )
+        return class_
+
+
+class RingBuffer(object):
+    """
+    Fixed-capacity FIFO buffer backed by a pre-allocated list. Supports the
+    subset of the collections.deque interface needed to track items in
+    insertion order: append, popleft, indexing, len and iteration
+    """
+    __slots__ = ('_slots', '_capacity', '_start', '_length')
+
+    def __init__(self, capacity: int):
+        assert isinstance(capacity, int) and capacity > 0
+        self._slots = [None] * capacity
+        self._capacity = capacity
+        self._start = 0
+        self._length = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def full(self) -> bool:
+        return self._length == self._capacity
+
+    def append(self, item):
+        if self._length == self._capacity:
+            raise IndexError('append to a full RingBuffer')
+        self._slots[(self._start + self._length) % self._capacity] = item
+        self._length += 1
+
+    def popleft(self):
+        if not self._length:
+            raise IndexError('pop from an empty RingBuffer')
+        item = self._slots[self._start]
+        self._slots[self._start] = None
+        self._start = (self._start + 1) % self._capacity
+        self._length -= 1
+        return item
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('RingBuffer index out of range')
+        return self._slots[(self._start + index) % self._capacity]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self._slots[(self._start + index) % self._capacity]
+
+
+class Received(object):
+    """
+    Compact record of a message received by the REPL, such as a Subscription
+    event or a Registration hit. The timestamp is stored as a POSIX time and
+    converted to a datetime when accessed and empty kwargs are not stored.
+    Records unpack, index and compare like a (timestamp, args, kwargs) tuple
+    """
+    __slots__ = ('_time', '_args', '_kwargs')
+
+    def __init__(self, time: float, args: tuple, kwargs: dict):
+        self._time = time
+        self._args = args
+        self._kwargs = kwargs or None
+
+    @property
+    def time(self) -> float:
+        return self._time
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self._time)
+
+    @property
+    def args(self) -> tuple:
+        return self._args
+
+    @property
+    def kwargs(self) -> dict:
+        return {} if self._kwargs is None else self._kwargs
+
+    def __iter__(self):
+        return iter((self.timestamp, self._args, self.kwargs))
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Received, tuple)):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return (
+            f'{type(self).__name__}(timestamp={self.timestamp!r}, '
+            f'args={self._args!r}, kwargs={self.kwargs!r})'
+        )
+
+
+class BufferedStream(object):
+    """
+    Asynchronous iterator over items fed by a producer through a bounded
+    buffer of up to maxsize items. Items are handed to the consumer as given,
+    without copying. When the consumer falls behind and the buffer is full
+    the overflow policy applies:
+
+    * drop_oldest: The oldest buffered item is dropped to make room
+    * drop_new: The incoming item is dropped
+    * block: The producer waits until there is room, if it awaits _put.
+      Producers are not necessarily serialised, WAMP event handlers each run
+      in a task of their own, so at most maxsize producers wait at once and
+      items from further producers are dropped
+
+    Dropped items are counted. Iteration ends once the stream is closed and
+    its buffer is drained
+    """
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_new', 'block')
+
+    def __init__(self, loop: AbstractEventLoop, maxsize: int=1000,
+                 overflow: str='drop_oldest'):
+        assert isinstance(maxsize, int) and maxsize > 0
+        assert overflow in self.OVERFLOW_POLICIES
+        self._loop = loop
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._buffer = deque()
+        self._getter = None
+        self._putters = deque()
+        self._received = 0
+        self._dropped = 0
+        self._closed = False
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @property
+    def overflow(self) -> str:
+        return self._overflow
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of buffered items not yet consumed
+        """
+        return len(self._buffer)
+
+    @property
+    def received(self) -> int:
+        return self._received
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _wake_getter(self):
+        getter, self._getter = self._getter, None
+        if getter is not None and not getter.done():
+            getter.set_result(None)
+
+    def _offer(self, item) -> bool:
+        """
+        Buffer item without waiting, applying the overflow policy
+
+        :param item:
+        :return: False if the buffer is full and the policy is block
+        """
+        buffer = self._buffer
+        if len(buffer) >= self._maxsize:
+            if self._overflow == 'block':
+                return False
+            self._dropped += 1
+            if self._overflow == 'drop_new':
+                self._received += 1
+                return True
+            buffer.popleft()
+        buffer.append(item)
+        self._received += 1
+        self._wake_getter()
+        return True
+
+    async def _put(self, item):
+        """
+        Buffer item, waiting for room if the buffer is full and the policy
+        is block. The item is dropped if maxsize producers are already
+        waiting
+
+        :param item:
+        :return:
+        """
+        while not self._closed and not self._offer(item):
+            if len(self._putters) >= self._maxsize:
+                self._dropped += 1
+                self._received += 1
+                return
+            putter = self._loop.create_future()
+            self._putters.append(putter)
+            await putter
+
+    def close(self):
+        """
+        Stop buffering items. Items already buffered are still yielded
+
+        :return:
+        """
+        if not self._closed:
+            self._closed = True
+            self._wake_getter()
+            while self._putters:
+                putter = self._putters.popleft()
+                if not putter.done():
+                    putter.set_result(None)
+
+    def __aiter__(self) -> 'BufferedStream':
+        return self
+
+    async def __anext__(self):
+        buffer = self._buffer
+        while not buffer:
+            if self._closed:
+                raise StopAsyncIteration
+            self._getter = self._loop.create_future()
+            await self._getter
+        item = buffer.popleft()
+        if self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+        return item
+
+    def __repr__(self):
+        return (
+            f'<{type(self).__name__} overflow={self._overflow} '
+            f'pending={len(self._buffer)}/{self._maxsize} '
+            f'received={self._received} dropped={self._dropped}'
+            f'{" closed" if self._closed else ""}>'
+        )
+
+
+class RetryPolicy(object):
+    """
+    Describes how many times a failed operation is retried and how long to
+    wait before each retry. Delays grow exponentially from initial_delay by
+    factor up to max_delay and are randomised by up to +/- jitter (a fraction
+    of the delay). A retries value of None retries indefinitely
+    """
+    def __init__(self, retries: int=0, initial_delay: float=0.0,
+                 factor: float=2.0, max_delay: float=None,
+                 jitter: float=0.0):
+        assert retries is None or retries >= 0
+        assert initial_delay >= 0 and factor >= 1 and 0 <= jitter <= 1
+        self._retries = retries
+        self._initial_delay = initial_delay
+        self._factor = factor
+        self._max_delay = max_delay
+        self._jitter = jitter
+
+    @property
+    def retries(self):
+        return self._retries
+
+    def should_retry(self, attempt: int) -> bool:
+        """
+        Whether a retry is permitted after attempt (zero-based) failed
+
+        :param attempt:
+        :return:
+        """
+        return self._retries is None or attempt < self._retries
+
+    def delay(self, attempt: int) -> float:
+        """
+        Number of seconds to wait before retrying after attempt (zero-based)
+        failed
+
+        :param attempt:
+        :return:
+        """
+        delay = self._initial_delay * self._factor ** attempt
+        if self._max_delay is not None:
+            delay = min(delay, self._max_delay)
+        if self._jitter:
+            delay += uniform(-self._jitter, self._jitter) * delay
+        return delay
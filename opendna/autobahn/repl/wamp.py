@@ -25,24 +25,45 @@ import asyncio
 
 from autobahn.asyncio.wamp import ApplicationSession
 from autobahn.wamp import ComponentConfig, auth
+from autobahn.wamp.exception import ApplicationError, TransportLost
 
 from opendna.autobahn.repl.abc import AbstractSession
 
 __author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
 
 
+class Rejected(ApplicationError):
+    """
+    Error returned to callers of a Registration end-point which rejected the
+    call because it was at capacity
+    """
+
+
 class REPLApplicationSession(ApplicationSession):
 
     def __init__(self, session: AbstractSession, future: asyncio.Future,
                  config: ComponentConfig=None):
         self._session = session
         self._future = future
+        self._resumed = False
+        self._leaving = False
+        self._close_details = None
         super().__init__(config)
 
+    def onWelcome(self, welcome):
+        self._resumed = bool(welcome.resumed)
+        self._session._welcomed(welcome)
+        return super().onWelcome(welcome)
+
     def onJoin(self, details):
         super().onJoin(details)
+        self._session._joined(self._resumed)
         self._future.set_result(self)
 
+    def leave(self, reason=None, message=None):
+        self._leaving = True
+        return super().leave(reason, message)
+
     def handle_ticket_challenge(self, challenge):
         """
         Default handler for WAMP-Ticket authentication
@@ -142,15 +163,32 @@ class REPLApplicationSession(ApplicationSession):
             raise
 
     def onDisconnect(self):
+        """
+        Reports the loss of the transport to the parent
+        opendna.autobahn.repl.abc.AbstractSession instance unless it was the
+        result of calling leave, so that it can reconnect
+
+        :return:
+        """
         super().onDisconnect()
+        if not self._leaving:
+            details = self._close_details
+            self._session._connection_lost(
+                TransportLost() if details is None else
+                ApplicationError(details.reason, details.message)
+            )
 
     def onClose(self, wasClean):
         super().onClose(wasClean)
 
     def onLeave(self, details):
+        self._close_details = details
         return super().onLeave(details)
 
     def onUserError(self, fail, msg):
+        # Rejections are reported by the Registration in summarised form
+        if isinstance(getattr(fail, 'value', None), Rejected):
+            return
         super().onUserError(fail, msg)
 
     def onMessage(self, msg):
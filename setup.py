@@ -43,7 +43,7 @@ setup(
     description='A REPL interface for interacting with WAMP routers',
     long_description=long_description,
     version=__version__,
-    packages=find_packages(),
+    packages=find_packages(exclude=('tests', 'tests.*')),
     url='https://github.com/opn-oss/autobahn-python-repl',
     license='MIT',
     author='Adam Jorgensen',
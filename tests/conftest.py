@@ -0,0 +1,99 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+from logging import WARNING
+
+import pytest
+
+from opendna.autobahn.repl.connections import ConnectionManager
+from opendna.autobahn.repl.loopback import LoopbackApplicationRunner
+from opendna.autobahn.repl.output import PrintOutput
+from opendna.autobahn.repl.utils import ClassRegistry
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+URI = 'ws://loopback/ws'
+
+
+class UnreachableApplicationRunner(LoopbackApplicationRunner):
+    """
+    Application runner whose connection attempts are always refused, as if
+    the router were unreachable
+    """
+    def run(self, make, start_loop: bool=True, log_level: str='info'):
+        async def refuse():
+            raise ConnectionRefusedError(f'{self.url} is unreachable')
+        return refuse()
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+def connection_manager(loop: asyncio.AbstractEventLoop,
+                       application_runner: type) -> ConnectionManager:
+    classes = ClassRegistry({'application_runner': application_runner})
+    return ConnectionManager(loop, classes, PrintOutput(loop, WARNING))
+
+
+@pytest.fixture
+def connection(loop, request):
+    """
+    Connection to a loopback router with a realm of its own, so that tests
+    never share routes
+    """
+    manager = connection_manager(loop, LoopbackApplicationRunner)
+    return manager(URI, request.node.name)
+
+
+@pytest.fixture
+def unreachable(loop, request):
+    """
+    Connection to a router which refuses every connection attempt
+    """
+    manager = connection_manager(loop, UnreachableApplicationRunner)
+    return manager(URI, request.node.name)
+
+
+async def join(connection, count: int=2) -> list:
+    sessions = [connection.session() for _ in range(count)]
+    for session in sessions:
+        await session.future
+    return sessions
+
+
+async def completion(item):
+    """
+    Wait for a Call, Registration or Subscription item to complete. Items
+    are only given a future once their session has joined
+    """
+    while item.future is None:
+        await asyncio.sleep(0)
+    return await item.future
@@ -0,0 +1,88 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+import pytest
+
+from opendna.autobahn.repl.rpc import Admission
+from opendna.autobahn.repl.wamp import Rejected
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_admission_hands_slots_over_in_arrival_order(loop):
+    async def scenario():
+        admission = Admission(loop, 1, max_queue=2, reject_uri='busy')
+        await admission.acquire()
+        order = []
+
+        async def wait(x):
+            await admission.acquire()
+            order.append(x)
+
+        waiting = [loop.create_task(wait(x)) for x in range(2)]
+        await asyncio.sleep(0)
+        assert admission.queue_depth == 2
+        with pytest.raises(Rejected) as raised:
+            await admission.acquire()
+        assert raised.value.error == 'busy'
+        for _ in range(3):
+            admission.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiting)
+        assert order == [0, 1]
+        assert (admission.accepted, admission.queued) == (3, 2)
+        assert (admission.rejected, admission.completed) == (1, 3)
+        assert admission.running == 0
+
+    loop.run_until_complete(scenario())
+
+
+def test_admission_rejects_calls_beyond_queue(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+
+        async def slow(x):
+            await asyncio.sleep(0.01)
+            return x
+
+        registration = callee.register(
+            'slow', slow, max_concurrency=1, max_queue=1,
+            reject_uri='com.example.busy'
+        )
+        await completion(registration)
+        call = caller.call('slow')
+        invocations = [call(x) for x in range(4)]
+        for invocation in invocations:
+            await completion(invocation)
+        assert [i.result for i in invocations[:2]] == [0, 1]
+        for invocation in invocations[2:]:
+            assert invocation.exception.error == 'com.example.busy'
+        admission = registration.admission
+        assert (admission.accepted, admission.rejected) == (2, 2)
+        assert admission.completed == 2
+        assert [hit.args for hit in registration] == [(0,), (1,)]
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,133 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from opendna.autobahn.repl import cache
+from opendna.autobahn.repl.cache import LRU, cache_key
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_lru_evicts_least_recently_used_entries():
+    lru = LRU(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == (True, 1)
+    lru.put('c', 3)
+    assert 'b' not in lru
+    assert lru.get('b') == (False, None)
+    assert (len(lru), lru.hits, lru.misses, lru.evictions) == (2, 1, 1, 1)
+    assert lru.hit_rate == 0.5
+    assert lru.invalidate('a')
+    assert not lru.invalidate('a')
+
+
+def test_lru_entries_expire_after_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache, 'monotonic', lambda: now[0])
+    lru = LRU(ttl=10)
+    lru.put('a', 1)
+    now[0] = 9
+    assert lru.get('a') == (True, 1)
+    now[0] = 10
+    assert lru.get('a') == (False, None)
+    assert 'a' not in lru
+
+
+def test_cache_key_freezes_containers():
+    assert cache_key('p', ([1, 2], {'a': {3}}), {'x': 1, 'y': 2}) == \
+        cache_key('p', ([1, 2], {'a': {3}}), {'y': 2, 'x': 1})
+    assert cache_key('p', ([1, 2],), {}) != cache_key('p', ((1, 2),), {})
+    assert cache_key('p', (object,), {}) is not None
+    assert cache_key('p', (bytearray(),), {}) is None
+
+
+def test_cache_key_distinguishes_equal_values_of_different_types():
+    keys = {
+        cache_key('p', (value,), {}) for value in (1, True, 1.0)
+    }
+    assert len(keys) == 3
+    assert cache_key('p', ([1],), {}) != cache_key('p', ([True],), {})
+    assert cache_key('p', ({1: 'a'},), {}) != \
+        cache_key('p', ({True: 'a'},), {})
+    assert cache_key('p', (), {'x': 1}) != cache_key('p', (), {'x': 1.0})
+
+
+def test_cache_key_includes_procedure():
+    assert cache_key('p', (1,), {}) != cache_key('q', (1,), {})
+
+
+def test_cache_hit_completes_without_calling_router(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+        hits = []
+        await completion(
+            callee.register('square', lambda x: hits.append(x) or x * x)
+        )
+        call = caller.call('square', cache=LRU(maxsize=10))
+        first = call(3)
+        await completion(first)
+        second = call(3)
+        assert second.future.done()
+        assert (first.cached, second.cached) == (False, True)
+        assert second.result == 9
+        assert hits == [3]
+        assert call.stats.count == 1
+        assert call.invalidate(3)
+        await completion(call(3))
+        assert hits == [3, 3]
+
+    loop.run_until_complete(scenario())
+
+
+def test_results_of_equal_arguments_are_cached_by_type(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+        await completion(callee.register('kind', lambda x: type(x).__name__))
+        call = caller.call('kind', cache=LRU(maxsize=10))
+        invocations = []
+        for value in (1, True, 1.0):
+            invocations.append(call(value))
+            await completion(invocations[-1])
+        assert [invocation.result for invocation in invocations] == \
+            ['int', 'bool', 'float']
+        assert not any(invocation.cached for invocation in invocations)
+
+    loop.run_until_complete(scenario())
+
+
+def test_calls_sharing_a_cache_keep_results_apart(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+        await completion(callee.register('double', lambda x: x * 2))
+        await completion(callee.register('negate', lambda x: -x))
+        lru = LRU(maxsize=10)
+        double = caller.call('double', cache=lru)
+        negate = caller.call('negate', cache=lru)
+        await completion(double(3))
+        invocation = negate(3)
+        await completion(invocation)
+        assert (invocation.cached, invocation.result) == (False, -3)
+        assert len(lru) == 2
+
+    loop.run_until_complete(scenario())
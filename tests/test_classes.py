@@ -0,0 +1,60 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from collections import OrderedDict
+
+from opendna.autobahn.repl.mixins import HasClasses
+from opendna.autobahn.repl.utils import ClassRegistry
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+CLASSPATH = 'collections.OrderedDict'
+
+
+def test_supplied_classes_are_returned_as_given():
+    classes = ClassRegistry({'call': dict})
+    assert classes['call'] is dict
+
+
+def test_missing_classes_are_resolved_from_environ(monkeypatch):
+    monkeypatch.setenv('call', CLASSPATH)
+    classes = ClassRegistry()
+    assert classes['call'] is OrderedDict
+    assert 'call' in classes
+
+
+def test_resolved_classes_are_cached(monkeypatch):
+    monkeypatch.setenv('call', CLASSPATH)
+    classes = ClassRegistry()
+    classes['call']
+    monkeypatch.setenv('call', 'collections.Counter')
+    assert classes['call'] is OrderedDict
+
+
+def test_has_classes_shares_the_registry():
+    class Owner(HasClasses):
+        def __init__(self, classes):
+            self.__init_has_classes__(classes)
+
+    classes = ClassRegistry({'call': dict})
+    assert Owner(classes).classes is classes
@@ -0,0 +1,127 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from autobahn.wamp import RegisterOptions
+
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def lookup(connection):
+    """
+    Register an endpoint upper-casing its argument after a delay and return a
+    coalescing Call to it along with a record of the arguments received
+    """
+    callee, caller = await join(connection)
+    hits = []
+
+    async def endpoint(key):
+        hits.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    await completion(callee.register('lookup', endpoint))
+    return caller.call('lookup', coalesce=True), hits
+
+
+def test_coalescing_shares_one_router_call(loop, connection):
+    async def scenario():
+        call, hits = await lookup(connection)
+        invocations = [call('a') for _ in range(3)] + [call('b')]
+        for invocation in invocations:
+            await completion(invocation)
+        assert [i.result for i in invocations] == ['A', 'A', 'A', 'B']
+        assert sorted(hits) == ['a', 'b']
+        assert call.coalesced == 2
+        assert call.stats.count == 4
+
+    loop.run_until_complete(scenario())
+
+
+def test_calls_after_completion_are_not_coalesced(loop, connection):
+    async def scenario():
+        call, hits = await lookup(connection)
+        await completion(call('a'))
+        await completion(call('a'))
+        assert hits == ['a', 'a']
+        assert call.coalesced == 0
+
+    loop.run_until_complete(scenario())
+
+
+def test_equal_arguments_of_different_types_are_not_coalesced(loop,
+                                                              connection):
+    async def scenario():
+        callee, caller = await join(connection)
+        hits = []
+
+        async def kind(x):
+            hits.append(x)
+            await asyncio.sleep(0.01)
+            return type(x).__name__
+
+        await completion(callee.register('kind', kind))
+        call = caller.call('kind', coalesce=True)
+        invocations = [call(value) for value in (1, True, 1.0, 1)]
+        for invocation in invocations:
+            await completion(invocation)
+        assert [i.result for i in invocations] == \
+            ['int', 'bool', 'float', 'int']
+        assert len(hits) == 3
+        assert call.coalesced == 1
+
+    loop.run_until_complete(scenario())
+
+
+def test_coalesced_invocations_all_receive_progress(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+
+        async def count(n, details=None):
+            for i in range(n):
+                details.progress(i)
+                await asyncio.sleep(0.001)
+            return n
+
+        await callee.application_session.register(
+            count, 'count', options=RegisterOptions(details_arg='details')
+        )
+        received = []
+        call = caller.call(
+            'count', lambda *args: received.append(args), coalesce=True
+        )
+        invocations = [call(3) for _ in range(2)]
+        await asyncio.sleep(0)
+        streams = [invocation.progress_stream() for invocation in invocations]
+        for invocation in invocations:
+            await completion(invocation)
+        assert call.coalesced == 1
+        for invocation, stream in zip(invocations, streams):
+            assert invocation.progress == [0, 1, 2]
+            assert [value async for value in stream] == [0, 1, 2]
+        assert len(received) == 6
+
+    loop.run_until_complete(scenario())
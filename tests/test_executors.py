@@ -0,0 +1,114 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from opendna.autobahn.repl.executors import Executors, Offload
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_default_executors_created_on_first_use():
+    executors = Executors()
+    assert 'thread' not in executors
+    thread = executors.resolve('thread')
+    assert isinstance(thread, ThreadPoolExecutor)
+    assert executors.resolve('thread') is thread
+    assert executors.resolve(None) is None
+    with pytest.raises(KeyError):
+        executors.resolve('crunch')
+    executors['crunch'] = crunch = ThreadPoolExecutor(1)
+    assert executors.resolve('crunch') is crunch
+    executors.shutdown()
+    assert not executors
+
+
+def test_offload_limits_concurrency(loop):
+    lock = threading.Lock()
+    running = {'now': 0, 'peak': 0}
+
+    def work(x):
+        with lock:
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+        threading.Event().wait(0.01)
+        with lock:
+            running['now'] -= 1
+        return x * 2
+
+    async def scenario():
+        with ThreadPoolExecutor(4) as executor:
+            offload = Offload(loop, executor, max_concurrency=2)
+            results = await asyncio.gather(
+                *(offload.run(work, (x,), {}) for x in range(5))
+            )
+        assert results == [0, 2, 4, 6, 8]
+        assert running['peak'] == 2
+        assert offload.peak_queued == 3
+        assert offload.queued == offload.running == 0
+        assert offload.completed == 5
+        assert offload.execution.count == 5
+
+    loop.run_until_complete(scenario())
+
+
+def test_offload_counts_failures(loop):
+    async def scenario():
+        with ThreadPoolExecutor(1) as executor:
+            offload = Offload(loop, executor)
+            with pytest.raises(ZeroDivisionError):
+                await offload.run(divmod, (1, 0), {})
+        assert (offload.completed, offload.failed) == (0, 1)
+        assert offload.running == 0
+
+    loop.run_until_complete(scenario())
+
+
+def test_endpoint_runs_in_executor(loop, connection):
+    threads = set()
+
+    def endpoint(x):
+        threads.add(threading.get_ident())
+        return x + 1
+
+    async def scenario():
+        callee, caller = await join(connection)
+        registration = callee.register(
+            'offloaded', endpoint, executor='thread', max_concurrency=1
+        )
+        await completion(registration)
+        call = caller.call('offloaded')
+        invocations = [call(x) for x in range(3)]
+        for invocation in invocations:
+            await completion(invocation)
+        assert [invocation.result for invocation in invocations] == [1, 2, 3]
+        assert threading.get_ident() not in threads
+        assert registration.offload.completed == 3
+        connection.manager.executors.shutdown()
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,111 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from autobahn.wamp import RegisterOptions
+
+from opendna.autobahn.repl.loopback import LoopbackRouter
+from tests.conftest import URI, join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_sessions_share_a_router_per_uri_and_realm(loop, connection):
+    async def scenario():
+        await join(connection)
+        router = LoopbackRouter.instance(URI, connection.realm)
+        assert router is LoopbackRouter.instance(URI, connection.realm)
+        assert router.sessions == 2
+        assert LoopbackRouter.instance(URI, 'elsewhere') is not router
+
+    loop.run_until_complete(scenario())
+
+
+def test_call_reaches_registered_endpoint(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+        registration = callee.register('add', lambda x, y=0: x + y)
+        await completion(registration)
+        invocation = caller.call('add')(1, y=2)
+        await completion(invocation)
+        assert invocation.result == 3
+        assert invocation.exception is None
+        hit, = (registration.hits[name] for name in dir(registration.hits))
+        assert hit.args == (1,)
+        assert hit.kwargs == {'y': 2}
+
+    loop.run_until_complete(scenario())
+
+
+def test_call_to_missing_procedure_fails(loop, connection):
+    async def scenario():
+        session, = await join(connection, 1)
+        invocation = session.call('missing')()
+        await completion(invocation)
+        assert invocation.result is None
+        assert invocation.exception.error == 'wamp.error.no_such_procedure'
+
+    loop.run_until_complete(scenario())
+
+
+def test_progressive_results_are_delivered(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+
+        async def count(n, details=None):
+            for i in range(n):
+                details.progress(i)
+                await asyncio.sleep(0)
+            return n
+
+        await callee.application_session.register(
+            count, 'count', options=RegisterOptions(details_arg='details')
+        )
+        invocation = caller.call('count')(3)
+        await completion(invocation)
+        assert invocation.progress == [0, 1, 2]
+        assert invocation.result == 3
+
+    loop.run_until_complete(scenario())
+
+
+def test_published_events_reach_other_sessions(loop, connection):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        received = []
+        subscription = subscriber.subscribe(
+            'ticks', lambda *args, **kwargs: received.append((args, kwargs))
+        )
+        own = publisher.subscribe('ticks')
+        await completion(subscription)
+        await completion(own)
+        publication = publisher.publish('ticks', acknowledge=True)(1, x=2)
+        await completion(publication)
+        await asyncio.sleep(0.01)
+        assert publication.exception is None
+        assert received == [((1,), {'x': 2})]
+        assert len(dir(subscription.events)) == 1
+        assert not dir(own.events)
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,82 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def divide(connection):
+    """
+    Register an endpoint dividing its arguments after a delay and return a
+    Call to it along with a record of the peak number of concurrent calls
+    """
+    callee, caller = await join(connection)
+    calls = {'running': 0, 'peak': 0}
+
+    async def endpoint(x, y=1):
+        calls['running'] += 1
+        calls['peak'] = max(calls['peak'], calls['running'])
+        try:
+            await asyncio.sleep(0.001 * (x % 3))
+            return x / y
+        finally:
+            calls['running'] -= 1
+
+    await completion(callee.register('divide', endpoint))
+    return caller.call('divide'), calls
+
+
+def test_amap_limits_concurrency(loop, connection):
+    async def scenario():
+        call, calls = await divide(connection)
+        result = await call.amap(range(10), concurrency=3)
+        assert result.results == [float(x) for x in range(10)]
+        assert (result.count, result.failed, result.succeeded) == (10, 0, 10)
+        assert calls['peak'] == 3
+        assert result.elapsed > 0 and result.throughput > 0
+
+    loop.run_until_complete(scenario())
+
+
+def test_map_collects_exceptions_by_index(loop, connection):
+    async def scenario():
+        call, _ = await divide(connection)
+        result = call.map([(4, 2), (1, 0), 3])
+        await result.future
+        assert result.results == [2.0, None, 3.0]
+        assert list(result.exceptions) == [1]
+        assert result.failed == 1
+
+    loop.run_until_complete(scenario())
+
+
+def test_unordered_results_are_in_completion_order(loop, connection):
+    async def scenario():
+        call, _ = await divide(connection)
+        result = await call.amap([2, 1, 0], concurrency=3, ordered=False)
+        assert result.results == [0.0, 1.0, 2.0]
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,72 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from opendna.autobahn.repl.output import PrintOutput, BufferedOutput, \
+    SummarisingOutput, DEBUG, INFO, WARNING
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class Unformattable(object):
+    def __repr__(self):
+        raise AssertionError('formatted below the output level')
+
+
+def test_messages_below_the_level_are_not_formatted(loop, capsys):
+    output = PrintOutput(loop, WARNING)
+    output.info('Invoking %r', Unformattable())
+    output.warning('Invoking %s with name %s', 'add', 'n0')
+    assert not output.enabled(INFO)
+    assert capsys.readouterr().out == 'Invoking add with name n0\n'
+    output.level = DEBUG
+    output.debug('debugging')
+    assert capsys.readouterr().out == 'debugging\n'
+
+
+def test_buffered_output_writes_once_per_interval(loop, capsys):
+    output = BufferedOutput(loop, INFO, interval=0.01)
+    output.info('one')
+    output.info('two')
+    assert capsys.readouterr().out == ''
+    loop.run_until_complete(asyncio.sleep(0.02))
+    assert capsys.readouterr().out == 'one\ntwo\n'
+    output.info('three')
+    output.flush()
+    assert capsys.readouterr().out == 'three\n'
+
+
+def test_summarising_output_collapses_bursts(loop, capsys):
+    output = SummarisingOutput(loop, INFO, interval=1, threshold=2)
+    summary = ('events received on', 'ticks')
+    for _ in range(5):
+        output.info('Event received on ticks', summary=summary)
+    output.info('Joined session')
+    output.info('Event received on quotes', summary=('quotes',))
+    output.flush()
+    assert capsys.readouterr().out.splitlines() == [
+        '5 events received on ticks in last 1s',
+        'Joined session',
+        'Event received on quotes'
+    ]
@@ -0,0 +1,94 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def serve(connection, procedure: str='echo', delay: float=0):
+    callee, = await join(connection, 1)
+
+    async def echo(x):
+        await asyncio.sleep(delay * (x + 1))
+        return x
+
+    await completion(callee.register(procedure, echo))
+
+
+def test_round_robin_uses_members_in_turn(loop, connection):
+    async def scenario():
+        await serve(connection)
+        pool = connection.pool(3)
+        await pool.future
+        call = pool.call('echo')
+        invocations = [call(x) for x in range(6)]
+        for invocation in invocations:
+            await completion(invocation)
+        assert [invocation.result for invocation in invocations] == \
+            list(range(6))
+        assert [len(dir(member.invocations)) for member in call.members] == \
+            [2, 2, 2]
+
+    loop.run_until_complete(scenario())
+
+
+def test_least_loaded_uses_member_with_fewest_in_flight(loop, connection):
+    async def scenario():
+        await serve(connection, 'slow', delay=0.01)
+        pool = connection.pool(2, 'least_loaded')
+        await pool.future
+        call = pool.call('slow')
+        first = call(0)
+        assert pool.in_flight == [1, 0]
+        second = call(1)
+        assert pool.in_flight == [1, 1]
+        await completion(first)
+        third = call(2)
+        assert pool.in_flight == [1, 1]
+        await completion(second)
+        await completion(third)
+        assert pool.in_flight == [0, 0]
+        assert [len(dir(member.invocations)) for member in call.members] == \
+            [2, 1]
+
+    loop.run_until_complete(scenario())
+
+
+def test_pool_map_and_stream_dispatch_across_members(loop, connection):
+    async def scenario():
+        await serve(connection)
+        subscriber, = await join(connection, 1)
+        received = []
+        await completion(subscriber.subscribe('ticks', received.append))
+        pool = connection.pool(2)
+        result = await pool.call('echo').amap(range(10), concurrency=4)
+        assert result.results == list(range(10))
+        stream = await pool.publish('ticks').astream(range(10), window=4)
+        await asyncio.sleep(0.01)
+        assert stream.acknowledged == 10
+        assert sorted(received) == list(range(10))
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,80 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from autobahn.wamp import RegisterOptions
+
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def chunks(connection):
+    """
+    Register an end-point sending n chunks of bytes as progressive results
+    and return the calling session
+    """
+    callee, caller = await join(connection)
+
+    async def download(n, details=None):
+        for i in range(n):
+            details.progress(bytes(i + 1))
+            await asyncio.sleep(0.001)
+        return n
+
+    await callee.application_session.register(
+        download, 'download', options=RegisterOptions(details_arg='details')
+    )
+    return caller
+
+
+def test_progress_stream_yields_results_as_they_arrive(loop, connection):
+    async def scenario():
+        caller = await chunks(connection)
+        invocation = caller.call('download')(4)
+        await asyncio.sleep(0)
+        received = [len(chunk) async for chunk in invocation.progress_stream()]
+        assert received == [1, 2, 3, 4]
+        await completion(invocation)
+        assert invocation.result == 4
+
+        # Streams opened once the Invocation has completed yield the
+        # progressive results stored
+        stream = invocation.progress_stream(maxsize=2)
+        assert [len(chunk) async for chunk in stream] == [3, 4]
+        assert stream.dropped == 2
+
+    loop.run_until_complete(scenario())
+
+
+def test_progress_need_not_be_stored(loop, connection):
+    async def scenario():
+        caller = await chunks(connection)
+        invocation = caller.call('download', store_progress=False)(4)
+        await completion(invocation)
+        assert invocation.progress == []
+        assert invocation.progress_count == 4
+        assert invocation.progress_bytes == 10
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,73 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+import pytest
+
+from opendna.autobahn.repl.utils import RetryPolicy
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_retry_policy_delays_grow_exponentially():
+    policy = RetryPolicy(retries=3, initial_delay=0.1, max_delay=0.3)
+    assert [policy.should_retry(attempt) for attempt in range(4)] == \
+        [True, True, True, False]
+    assert [policy.delay(attempt) for attempt in range(3)] == \
+        pytest.approx([0.1, 0.2, 0.3])
+
+
+def test_retry_policy_jitter_bounds_delays():
+    policy = RetryPolicy(retries=None, initial_delay=1, jitter=0.5)
+    assert policy.should_retry(1000)
+    assert all(0.5 <= policy.delay(0) <= 1.5 for _ in range(100))
+
+
+def test_stream_publishes_every_item(loop, connection):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        received = []
+        await completion(subscriber.subscribe('ticks', received.append))
+        result = publisher.publish('ticks').stream(range(20), window=4)
+        await result.future
+        await asyncio.sleep(0.01)
+        assert received == list(range(20))
+        assert (result.count, result.acknowledged, result.failed) == \
+            (20, 20, 0)
+        assert result.in_flight == 0
+
+    loop.run_until_complete(scenario())
+
+
+def test_stream_retries_failed_publications(loop, connection):
+    async def scenario():
+        publisher, = await join(connection, 1)
+        result = await publisher.publish('bad topic').astream(
+            [1, 2], retry_policy=RetryPolicy(retries=2)
+        )
+        assert sorted(result.exceptions) == [0, 1]
+        assert (result.count, result.failed, result.retried) == (2, 2, 4)
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,103 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+from datetime import datetime
+from time import time
+
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def publish(publisher, *calls):
+    for args, kwargs in calls:
+        await completion(publisher(*args, **kwargs))
+    # Acknowledgements can overtake the events they acknowledge
+    await asyncio.sleep(0.01)
+
+
+def test_events_are_queried_by_indexed_kwargs(loop, connection):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        subscription = subscriber.subscribe('ticks', indexes=('symbol',))
+        await completion(subscription)
+        ticks = publisher.publish('ticks', acknowledge=True)
+        await publish(ticks, *(
+            ((price,), {'symbol': 'ABC'[price % 3], 'even': not price % 2})
+            for price in range(6)
+        ))
+        events = subscription.events
+        assert [event.args for event in events.where(symbol='A')] == \
+            [(0,), (3,)]
+        assert [event.args for event in events.where(even=True)] == \
+            [(0,), (2,), (4,)]
+        assert events.where(symbol='A', even=False)[0].args == (3,)
+        assert events.count() == 6
+        assert events.count(symbol='B') == 2
+        assert events.count(symbol='D') == 0
+        assert events.first(symbol='C').args == (2,)
+        assert events.last(symbol='B').args == (4,)
+        assert events.last(symbol='D') is None
+
+    loop.run_until_complete(scenario())
+
+
+def test_events_are_queried_by_time(loop, connection):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        subscription = subscriber.subscribe('ticks')
+        await completion(subscription)
+        ticks = publisher.publish('ticks', acknowledge=True)
+        await publish(ticks, ((0,), {}), ((1,), {}))
+        middle = time()
+        await publish(ticks, ((2,), {}))
+        events = subscription.events
+        assert [event.args for event in events.between(middle)] == [(2,)]
+        assert [event.args for event in events.between(end=middle)] == \
+            [(0,), (1,)]
+        assert events.count(datetime.fromtimestamp(middle)) == 1
+
+    loop.run_until_complete(scenario())
+
+
+def test_queries_skip_evicted_events(loop, connection):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        subscription = subscriber.subscribe(
+            'ticks', indexes=('symbol',), max_events=3
+        )
+        await completion(subscription)
+        ticks = publisher.publish('ticks', acknowledge=True)
+        await publish(ticks, *(
+            ((price,), {'symbol': 'AB'[price % 2]}) for price in range(10)
+        ))
+        events = subscription.events
+        assert [event.args for event in events.between()] == \
+            [(7,), (8,), (9,)]
+        assert 'e6' not in events
+        assert events.first().args == (7,)
+        assert events.count(symbol='A') == 1
+        assert events.first(symbol='B').args == (7,)
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,106 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+import pytest
+
+from tests.conftest import completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_operations_are_queued_until_the_session_joins(loop, connection):
+    async def scenario():
+        session = connection.session()
+        registration = session.register('echo', lambda x: x)
+        invocation = session.call('echo')(1)
+        assert session.queue_depth == 2
+        assert session.outstanding == [session.future]
+        await completion(registration)
+        await completion(invocation)
+        assert registration.exception is None
+        assert invocation.result == 1
+        assert session.queue_depth == 0
+        assert session.in_flight == 0
+        assert session.outstanding == []
+        assert session.failures == 0
+
+    loop.run_until_complete(scenario())
+
+
+def test_max_concurrency_limits_operations_in_flight(loop, connection):
+    async def scenario():
+        session = connection.session(max_concurrency=2)
+        other = connection.session()
+        await session.future
+        await other.future
+
+        async def slow(x):
+            await asyncio.sleep(0.01)
+            return x
+
+        await completion(other.register('slow', slow))
+        call = session.call('slow')
+        invocations = [call(x) for x in range(6)]
+        peak = 0
+        while session.outstanding:
+            peak = max(peak, session.in_flight)
+            await asyncio.sleep(0.001)
+        assert peak == 2
+        assert [invocation.result for invocation in invocations] == \
+            list(range(6))
+
+    loop.run_until_complete(scenario())
+
+
+def test_queued_operations_fail_with_the_session(loop, unreachable):
+    async def scenario():
+        session = unreachable.session()
+        call = session.call('echo', keep='failures')
+        invocation = call(1)
+        publication = session.publish('topic')(1)
+        subscription = session.subscribe('topic')
+        with pytest.raises(ConnectionRefusedError):
+            await session.future
+        await asyncio.sleep(0)
+        for item in (invocation, publication, subscription):
+            assert isinstance(item.exception, ConnectionRefusedError)
+            assert isinstance(item.future.exception(), ConnectionRefusedError)
+        assert call.in_flight == 0
+        assert call.stats.errors == 1
+        assert call.stats.latency.count == 0
+        assert (invocation.sent_at, invocation.latency) == (None, None)
+        assert list(call.invocations) == [invocation]
+        assert session.failures == 3
+        assert session.queue_depth == 0
+
+        # Operations issued once the session has failed fail straight away
+        late = call(2)
+        assert isinstance(late.future.exception(), ConnectionRefusedError)
+        await asyncio.sleep(0)
+        assert isinstance(late.exception, ConnectionRefusedError)
+        assert call.stats.errors == 2
+        assert session.failures == 4
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,87 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from autobahn.wamp.message import Welcome
+from autobahn.wamp.role import RoleBrokerFeatures
+
+from opendna.autobahn.repl.loopback import LoopbackRouter
+from opendna.autobahn.repl.utils import RetryPolicy
+from tests.conftest import URI, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_session_reconnects_after_router_restart(loop, connection):
+    async def scenario():
+        reconnect = RetryPolicy(retries=None, initial_delay=0.01)
+        callee = connection.session(reconnect=reconnect)
+        caller = connection.session(reconnect=reconnect)
+        await callee.future
+        await caller.future
+        await completion(callee.register('echo', lambda x: x))
+        call = caller.call('echo')
+        invocation = call(1)
+        await completion(invocation)
+        assert invocation.result == 1
+        LoopbackRouter.instance(URI, connection.realm).restart()
+        await asyncio.sleep(0.05)
+        await callee.future
+        await caller.future
+        await asyncio.sleep(0.01)
+        invocation = call(2)
+        await completion(invocation)
+        assert invocation.result == 2
+        assert callee.reconnects == 1
+        assert caller.reconnects == 1
+
+    loop.run_until_complete(scenario())
+
+
+def test_resumed_session_is_not_replayed(loop, connection, monkeypatch):
+    async def scenario():
+        session = connection.session(resumable=True)
+        await session.future
+        replayed = []
+        for manager in (session.register, session.subscribe):
+            monkeypatch.setattr(
+                manager, '_replay',
+                lambda manager=manager: replayed.append(manager) or 0
+            )
+        session._welcomed(Welcome(
+            1234, {'broker': RoleBrokerFeatures()}, resumable=True,
+            resume_token='token'
+        ))
+        assert (session.resume_session, session.resume_token) == \
+            (1234, 'token')
+
+        session._joined(True)
+        assert session.reconnects == 1
+        assert replayed == []
+
+        session._joined(False)
+        assert session.reconnects == 2
+        assert replayed == [session.register, session.subscribe]
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,103 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from opendna.autobahn.repl.recording import read_records, RECORD_CALL, \
+    RECORD_PUBLISH, RECORD_EVENT, RECORD_HIT
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def record(connection, path: str):
+    """
+    Record the traffic of a session which calls an end-point, publishes an
+    event and receives both an event and an end-point hit, returning the
+    session along with a session serving the end-point and topic
+    """
+    session, other = await join(connection)
+    await completion(other.register('add', lambda x, y: x + y))
+    await completion(other.subscribe('ticks'))
+    await completion(session.register('echo', lambda x: x))
+    await completion(session.subscribe('quotes'))
+    recorder = session.record(path)
+    await completion(session.call('add')(1, 2))
+    await completion(session.publish('ticks', acknowledge=True)(3))
+    await completion(other.call('echo')(b'\x00'))
+    await completion(other.publish('quotes', acknowledge=True)(4, x=5))
+    await asyncio.sleep(0.01)
+    assert session.stop_recording() is recorder
+    assert recorder.closed
+    return session, other
+
+
+def test_session_traffic_is_recorded(loop, connection, tmp_path):
+    async def scenario():
+        path = str(tmp_path / 'traffic')
+        await record(connection, path)
+        records = list(read_records(path))
+        assert [
+            (record.kind, record.uri, record.args, record.kwargs)
+            for record in records
+        ] == [
+            (RECORD_CALL, 'add', [1, 2], {}),
+            (RECORD_PUBLISH, 'ticks', [3], {}),
+            (RECORD_HIT, 'echo', [b'\x00'], {}),
+            (RECORD_EVENT, 'quotes', [4], {'x': 5})
+        ]
+        offsets = [record.offset for record in records]
+        assert offsets == sorted(offsets)
+
+    loop.run_until_complete(scenario())
+
+
+def test_recorded_traffic_is_replayed(loop, connection, tmp_path):
+    async def scenario():
+        path = str(tmp_path / 'traffic')
+        session, other = await record(connection, path)
+        added = other.registrations[dir(other.registrations)[0]]
+        ticks = other.subscriptions[dir(other.subscriptions)[0]]
+        result = session.replay(path, speed=10)
+        await result.future
+        await asyncio.sleep(0.01)
+        assert (result.scheduled, result.succeeded, result.failed) == \
+            (2, 2, 0)
+        assert result.lag.count == 2
+        assert len(dir(added.hits)) == 2
+        assert len(dir(ticks.events)) == 2
+
+    loop.run_until_complete(scenario())
+
+
+def test_replayed_traffic_is_not_recorded(loop, connection, tmp_path):
+    async def scenario():
+        path = str(tmp_path / 'traffic')
+        session, _ = await record(connection, path)
+        recorder = session.record(str(tmp_path / 'replayed'))
+        await session.replay(path, speed=None).future
+        await completion(session.call('add')(3, 4))
+        session.stop_recording()
+        assert recorder.count == 1
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,68 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+from datetime import datetime
+
+from opendna.autobahn.repl.utils import Received
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_received_records_behave_like_tuples():
+    record = Received(0.0, (1,), {})
+    timestamp, args, kwargs = record
+    assert timestamp == datetime.fromtimestamp(0.0)
+    assert (args, kwargs) == ((1,), {})
+    assert record[1] == (1,)
+    assert record == (timestamp, (1,), {})
+    assert record._kwargs is None
+    assert not hasattr(record, '__dict__')
+
+
+def test_items_are_named_sequentially(loop, connection):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        subscription = subscriber.subscribe('ticks')
+        await completion(subscription)
+        registration = subscriber.register('echo', lambda x: x)
+        await completion(registration)
+        call = publisher.call('echo')
+        invocations = [call(x) for x in range(2)]
+        ticks = publisher.publish('ticks', acknowledge=True)
+        for x in range(2):
+            await completion(ticks(x))
+        for invocation in invocations:
+            await completion(invocation)
+        await asyncio.sleep(0.01)
+        assert not hasattr(invocations[0], '__dict__')
+        assert sorted(dir(call.invocations)) == ['n0', 'n1']
+        assert call.invocations.n1 is invocations[1]
+        assert invocations[1].name == 'n1'
+        assert sorted(dir(subscription.events)) == ['e0', 'e1']
+        assert subscription.events.e1.args == (1,)
+        assert sorted(dir(registration.hits)) == ['h0', 'h1']
+        assert registration.hits['h0'].args == (0,)
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,137 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import sys
+
+import pytest
+
+from tests.conftest import LoopbackApplicationRunner, \
+    UnreachableApplicationRunner, URI
+from opendna.autobahn.repl.executors import Executors
+from opendna.autobahn.repl.output import BufferedOutput, PrintOutput, \
+    WARNING
+from opendna.autobahn.repl.utils import ClassRegistry
+from opendna.autobahn.repl import repl
+from opendna.autobahn.repl.repl import run_script, EXIT_INVOCATIONS_FAILED, \
+    EXIT_SCRIPT_FAILED
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+SCRIPT = f'''
+session = connect({URI!r}, {{realm!r}}).session()
+await session.future
+session.register('echo', lambda x: x)
+session.call({{procedure!r}})(1)
+session.publish('topic')(1)
+'''
+UNJOINED_SCRIPT = f'''
+session = connect({URI!r}, {{realm!r}}).session()
+session.call({{procedure!r}})(1)
+'''
+
+
+def run(loop, tmp_path, application_runner: type, realm: str,
+        procedure: str='echo', script: str=SCRIPT, output: type=PrintOutput
+        ) -> int:
+    path = tmp_path / 'script.py'
+    path.write_text(script.format(realm=realm, procedure=procedure))
+    classes = ClassRegistry({'application_runner': application_runner})
+    argv = sys.argv
+    try:
+        return loop.run_until_complete(run_script(
+            loop, str(path), (), classes, output(loop, WARNING)
+        ))
+    finally:
+        sys.argv = argv
+
+
+def test_run_script_succeeds(loop, tmp_path, request):
+    status = run(loop, tmp_path, LoopbackApplicationRunner, request.node.name)
+    assert status == 0
+
+
+def test_run_script_reports_failed_invocations(loop, tmp_path, request):
+    status = run(
+        loop, tmp_path, LoopbackApplicationRunner, request.node.name,
+        procedure='missing'
+    )
+    assert status == EXIT_INVOCATIONS_FAILED
+
+
+def test_run_script_fails_against_unreachable_router(loop, tmp_path, request):
+    status = run(
+        loop, tmp_path, UnreachableApplicationRunner, request.node.name,
+        script=UNJOINED_SCRIPT
+    )
+    assert status == EXIT_INVOCATIONS_FAILED
+
+
+def test_run_script_reports_exceptions(loop, tmp_path, request):
+    status = run(
+        loop, tmp_path, LoopbackApplicationRunner, request.node.name,
+        script='raise ValueError({realm!r}, {procedure!r})'
+    )
+    assert status == EXIT_SCRIPT_FAILED
+
+
+def test_run_script_flushes_output_before_traceback(loop, tmp_path, request,
+                                                    capsys):
+    status = run(
+        loop, tmp_path, LoopbackApplicationRunner, request.node.name,
+        script='connect.output.warning("logged")\nraise ValueError()',
+        output=BufferedOutput
+    )
+    assert status == EXIT_SCRIPT_FAILED
+    captured = capsys.readouterr()
+    assert captured.out == 'logged\n'
+    assert 'ValueError' in captured.err
+
+
+def test_run_script_shuts_down_executors(loop, tmp_path, request,
+                                        monkeypatch):
+    shut_down = []
+    shutdown = Executors.shutdown
+
+    def record(executors, wait: bool=True):
+        shut_down.extend(executors.values())
+        shutdown(executors, wait)
+
+    monkeypatch.setattr(Executors, 'shutdown', record)
+    status = run(
+        loop, tmp_path, LoopbackApplicationRunner, request.node.name,
+        script="thread = executors.resolve('thread')"
+    )
+    assert status == 0
+    assert len(shut_down) == 1
+    assert shut_down[0]._shutdown
+
+
+def test_main_rejects_bad_classpaths(monkeypatch, capsys):
+    monkeypatch.setattr(repl, 'environ', {})
+    monkeypatch.setattr(
+        sys, 'argv', ['autobahn-repl', '--call', 'no.such.Call', 'run', 'x']
+    )
+    with pytest.raises(SystemExit) as exit_info:
+        repl.main()
+    assert exit_info.value.code == 2
+    assert '--call: cannot load no.such.Call' in capsys.readouterr().err
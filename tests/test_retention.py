@@ -0,0 +1,93 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import pytest
+
+from opendna.autobahn.repl import mixins
+from opendna.autobahn.repl.mixins import ManagesNames, RetainsItems
+from opendna.autobahn.repl.utils import RingBuffer
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class Store(ManagesNames, RetainsItems):
+    def __init__(self, max_items: int=None, max_age: float=None):
+        self.__init_manages_names__()
+        self.__init_retains_items__(max_items, max_age)
+        self._next_id = 0
+
+    def store(self, item):
+        item_id = self._next_id
+        self._next_id += 1
+        self._retain(item_id, f'i{item_id}', item)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(mixins, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_ring_buffer_is_first_in_first_out():
+    buffer = RingBuffer(3)
+    for item in range(3):
+        buffer.append(item)
+    assert buffer.full
+    with pytest.raises(IndexError):
+        buffer.append(3)
+    assert buffer.popleft() == 0
+    buffer.append(3)
+    assert list(buffer) == [1, 2, 3]
+    assert (buffer[0], buffer[-1], len(buffer)) == (1, 3, 3)
+
+
+def test_retention_is_unbounded_by_default():
+    store = Store()
+    for item in range(100):
+        store.store(item)
+    assert store.i0 == 0
+    assert store[99] == 99
+
+
+def test_max_items_evicts_oldest_items():
+    store = Store(max_items=3)
+    for item in range(5):
+        store.store(item)
+    assert 'i1' not in store
+    assert 1 not in store
+    assert [store[f'i{item_id}'] for item_id in (2, 3, 4)] == [2, 3, 4]
+
+
+def test_max_age_evicts_expired_items(clock):
+    store = Store(max_age=10)
+    store.store('a')
+    clock[0] = 5
+    store.store('b')
+    clock[0] = 12
+    store.store('c')
+    assert 'i0' not in store
+    assert (store.i1, store.i2) == ('b', 'c')
+    clock[0] = 30
+    store.store('d')
+    assert list(dir(store)) == ['i3']
@@ -0,0 +1,58 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import os.path
+import subprocess
+import sys
+
+from opendna.autobahn.repl.utils import ClassRegistry, DEFAULT_CLASSPATHS
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+MODULES = ('connections', 'sessions', 'rpc', 'pubsub', 'output')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_object_model_does_not_import_autobahn():
+    script = '; '.join(
+        [f'import opendna.autobahn.repl.{module}' for module in MODULES]
+        + [
+            'import sys',
+            "print(sorted({m.split('.')[0] for m in sys.modules} & "
+            "{'autobahn', 'txaio', 'ptpython'}))"
+        ]
+    )
+    imported = subprocess.run(
+        [sys.executable, '-c', script], cwd=ROOT, check=True,
+        stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout
+    assert imported.strip() == '[]'
+
+
+def test_default_classes_are_resolved_on_first_use(monkeypatch):
+    monkeypatch.delenv('session_pool', raising=False)
+    classes = ClassRegistry()
+    assert 'session_pool' not in classes
+    pool = classes['session_pool']
+    assert f'{pool.__module__}.{pool.__name__}' == \
+        DEFAULT_CLASSPATHS['session_pool']
@@ -0,0 +1,86 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import pytest
+
+from opendna.autobahn.repl.stats import LatencyHistogram, CallStats
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_small_latencies_are_recorded_exactly():
+    histogram = LatencyHistogram()
+    for microseconds in range(1, 101):
+        histogram.record(microseconds / 1e6)
+    assert histogram.count == 100
+    assert histogram.p50 == pytest.approx(50e-6)
+    assert histogram.p99 == pytest.approx(99e-6)
+    assert (histogram.min, histogram.max) == (1e-6, 100e-6)
+    assert histogram.mean == pytest.approx(50.5e-6)
+
+
+def test_large_latencies_are_recorded_within_precision():
+    histogram = LatencyHistogram(precision_bits=8)
+    latencies = [0.001 * n for n in range(1, 1001)]
+    for latency in latencies:
+        histogram.record(latency)
+    for percentile in (50, 90, 99, 99.9):
+        expected = latencies[int(len(latencies) * percentile / 100) - 1]
+        assert histogram.percentile(percentile) == \
+            pytest.approx(expected, rel=2 ** -7)
+    assert histogram.percentile(100) == histogram.max == 1.0
+    assert len(histogram._counts) < 2048
+
+
+def test_empty_histogram_and_reset():
+    histogram = LatencyHistogram()
+    assert (histogram.count, histogram.mean, histogram.p50) == (0, None, None)
+    histogram.record(0.5)
+    histogram.reset()
+    assert (histogram.count, histogram.max) == (0, None)
+
+
+def test_call_stats_separate_queue_delay_and_latency():
+    stats = CallStats()
+    stats.record(None, 10.0, 10.5, False)
+    stats.record(10.0, 10.25, 11.0, True)
+    assert (stats.count, stats.errors, stats.error_rate) == (2, 1, 0.5)
+    assert stats.latency.count == 2
+    assert stats.queue_delay.count == 1
+    assert stats.queue_delay.max == 0.25
+    assert stats.latency.max == 0.75
+    assert stats.throughput == 2.0
+    stats.reset()
+    assert (stats.count, stats.throughput) == (0, None)
+
+
+def test_call_stats_record_unsent_failures_as_errors_only():
+    stats = CallStats()
+    stats.record(10.0, None, 10.5, True)
+    assert (stats.count, stats.errors) == (1, 1)
+    assert (stats.latency.count, stats.queue_delay.count) == (0, 0)
+    assert stats.p50 is None
+    assert 'error_rate=100.00%' in repr(stats)
+    stats.record(None, 11.0, 11.5, False)
+    assert (stats.count, stats.latency.count) == (2, 1)
+    assert stats.throughput == 2 / 1.5
@@ -0,0 +1,172 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+import os
+
+import pytest
+
+from opendna.autobahn.repl.storage import EventLog, SEGMENT_SUFFIX
+from opendna.autobahn.repl.utils import Received
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def segments(path) -> list:
+    return sorted(
+        name for name in os.listdir(str(path)) if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def test_records_are_appended_and_read_back(tmp_path):
+    log = EventLog(str(tmp_path))
+    assert [log.append(float(n), (n,), {'n': n} if n else {})
+            for n in range(3)] == [0, 1, 2]
+    assert log[2] == Received(2.0, (2,), {'n': 2})
+    assert log[0].kwargs == {}
+    assert (len(log), list(log), 3 in log) == (3, [0, 1, 2], False)
+    with pytest.raises(KeyError):
+        log[3]
+    log.close()
+
+
+def test_segments_roll_over_and_are_deleted_oldest_first(tmp_path):
+    log = EventLog(str(tmp_path), segment_size=1)
+    for n in range(3):
+        log.append(float(n), (n,), None)
+    assert log.segments == 3
+    with pytest.raises(KeyError):
+        del log[1]
+    del log[0]
+    del log[1]
+    assert segments(tmp_path) == [f'{2:020d}{SEGMENT_SUFFIX}']
+    assert (log.first_id, log[2].args) == (2, (2,))
+    log.close()
+
+
+def test_existing_logs_are_reopened(tmp_path):
+    log = EventLog(str(tmp_path), segment_size=64)
+    for n in range(10):
+        log.append(float(n), (n,), None)
+    log.close()
+    last, = segments(tmp_path)[-1:]
+    with open(str(tmp_path / last), 'ab') as file:
+        file.write(b'\xff\x00')
+    log = EventLog(str(tmp_path), segment_size=64)
+    assert (log.first_id, log.next_id) == (0, 10)
+    assert [record.args[0] for record in log.values()] == list(range(10))
+    log.close()
+
+
+def test_deleted_records_stay_deleted_when_reopened(tmp_path):
+    log = EventLog(str(tmp_path))
+    for n in range(10):
+        log.append(float(n), (n,), None)
+    # The only segment still holds records, so it is kept
+    for n in range(4):
+        del log[n]
+    assert log.segments == 1
+    log.close()
+    log = EventLog(str(tmp_path))
+    assert (log.first_id, log.next_id) == (4, 10)
+    assert [record.args[0] for record in log.values()] == list(range(4, 10))
+    log.close()
+
+
+def test_logs_are_written_by_one_event_log_at_a_time(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append(0.0, (0,), None)
+    log.flush()
+    with pytest.raises(RuntimeError):
+        EventLog(str(tmp_path))
+    reader = EventLog(str(tmp_path), read_only=True)
+    assert [record.args for record in reader.values()] == [(0,)]
+    with pytest.raises(AssertionError):
+        reader.append(1.0, (1,), None)
+    reader.close()
+    log.close()
+    log = EventLog(str(tmp_path))
+    assert log.next_id == 1
+    log.close()
+
+
+def test_subscription_events_are_stored_in_the_log(loop, connection,
+                                                   tmp_path):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        path = str(tmp_path / 'ticks')
+        subscription = subscriber.subscribe(
+            'ticks', log_path=path, max_events=2
+        )
+        await completion(subscription)
+        ticks = publisher.publish('ticks', acknowledge=True)
+        for price in range(3):
+            await completion(ticks(price, symbol='A'))
+        await asyncio.sleep(0.01)
+        assert isinstance(subscription.log, EventLog)
+        assert subscription._items is subscription.log
+        assert [event.args for event in subscription.events] == [(1,), (2,)]
+        assert subscription.events.e2.kwargs == {'symbol': 'A'}
+        assert subscription.events.count() == 2
+
+    loop.run_until_complete(scenario())
+
+
+def test_event_log_is_closed_and_reopened(loop, connection, tmp_path):
+    async def scenario():
+        subscriber, publisher = await join(connection)
+        path = str(tmp_path / 'ticks')
+        ticks = publisher.publish('ticks', acknowledge=True)
+        first = subscriber.subscribe('ticks', log_path=path)
+        await completion(first)
+        for price in range(3):
+            await completion(ticks(price))
+        await asyncio.sleep(0.01)
+        first.unsubscribe()
+        await asyncio.sleep(0.01)
+        assert first.log.closed
+
+        second = subscriber.subscribe('ticks', log_path=path)
+        await completion(second)
+        assert second.count() == 3
+        await completion(ticks(3))
+        await asyncio.sleep(0.01)
+        assert [event.args[0] for event in second.events] == [0, 1, 2, 3]
+        assert second.events.e3.args == (3,)
+
+    loop.run_until_complete(scenario())
+
+
+def test_subscriptions_cannot_share_an_event_log(loop, connection, tmp_path):
+    async def scenario():
+        subscriber, = await join(connection, 1)
+        path = str(tmp_path / 'ticks')
+        first = subscriber.subscribe('ticks', log_path=path)
+        await completion(first)
+        with pytest.raises(RuntimeError):
+            subscriber.subscribe('ticks', log_path=path)
+        first.unsubscribe()
+        await asyncio.sleep(0.01)
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,110 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import asyncio
+
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+async def subscribe(connection):
+    subscriber, publisher = await join(connection)
+    subscription = subscriber.subscribe('ticks')
+    await completion(subscription)
+    return subscription, publisher.publish('ticks', acknowledge=True)
+
+
+async def publish(ticks, values):
+    for value in values:
+        await completion(ticks(value))
+    # Acknowledgements can overtake the events they acknowledge
+    await asyncio.sleep(0.01)
+
+
+def test_streams_apply_their_overflow_policy(loop, connection):
+    async def scenario():
+        subscription, ticks = await subscribe(connection)
+        oldest = subscription.stream(maxsize=2)
+        new = subscription.stream(maxsize=2, overflow='drop_new')
+        await publish(ticks, range(3))
+        oldest.close()
+        new.close()
+        assert [event.args[0] async for event in oldest] == [1, 2]
+        assert [event.args[0] async for event in new] == [0, 1]
+        assert (oldest.received, oldest.dropped) == (3, 1)
+        assert (new.received, new.dropped) == (3, 1)
+        assert subscription._streams == []
+
+    loop.run_until_complete(scenario())
+
+
+def test_blocking_stream_delivers_every_event(loop, connection):
+    async def scenario():
+        subscription, ticks = await subscribe(connection)
+        stream = subscription.stream(maxsize=2, overflow='block')
+        await publish(ticks, range(4))
+        assert stream.pending == 2
+        received = []
+        async for event in stream:
+            received.append(event.args[0])
+            if len(received) == 4:
+                break
+        assert received == [0, 1, 2, 3]
+        assert stream.dropped == 0
+        stream.close()
+
+    loop.run_until_complete(scenario())
+
+
+def test_blocking_stream_bounds_waiting_events(loop, connection):
+    async def scenario():
+        subscription, ticks = await subscribe(connection)
+        stream = subscription.stream(maxsize=1, overflow='block')
+        await publish(ticks, range(4))
+        assert (stream.pending, len(stream._putters)) == (1, 1)
+        assert (stream.received, stream.dropped) == (3, 2)
+        first = await stream.__anext__()
+        await asyncio.sleep(0)
+        stream.close()
+        rest = [event.args[0] async for event in stream]
+        assert [first.args[0]] + rest == [0, 1]
+
+    loop.run_until_complete(scenario())
+
+
+def test_streams_end_when_unsubscribed(loop, connection):
+    async def scenario():
+        subscription, ticks = await subscribe(connection)
+        stream = subscription.stream()
+
+        async def consume():
+            return [event.args[0] async for event in stream]
+
+        consumer = asyncio.ensure_future(consume())
+        await publish(ticks, range(3))
+        subscription.unsubscribe()
+        assert await asyncio.wait_for(consumer, 1) == [0, 1, 2]
+        assert stream.closed
+
+    loop.run_until_complete(scenario())
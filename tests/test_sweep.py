@@ -0,0 +1,64 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+from opendna.autobahn.repl.utils import Keep, merge_args, sweep
+from tests.conftest import join, completion
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+def test_merge_args_keeps_and_pads_from_the_original():
+    shared = [1, 2]
+    args = merge_args((shared, 'a', 'b'), (Keep, 'c'))
+    assert args == ([1, 2], 'c', 'b')
+    assert args[0] is shared
+    assert merge_args((1, 2), (3, 4, 5)) == (3, 4)
+
+
+def test_sweep_generates_every_combination():
+    shared = {'deep': [1]}
+    pairs = list(sweep(
+        (shared, 0, 'x'), {'z': 1}, (Keep, range(2)), {'z': (1, 2)}
+    ))
+    assert [(args[1:], kwargs) for args, kwargs in pairs] == [
+        ((0, 'x'), {'z': 1}), ((0, 'x'), {'z': 2}),
+        ((1, 'x'), {'z': 1}), ((1, 'x'), {'z': 2})
+    ]
+    assert all(args[0] is shared for args, _ in pairs)
+
+
+def test_invocations_are_re_invoked_and_swept(loop, connection):
+    async def scenario():
+        callee, caller = await join(connection)
+        await completion(
+            callee.register('add', lambda x, y, z=0: x + y + z)
+        )
+        invocation = caller.call('add')(1, 2, z=3)
+        again = invocation(Keep, 10)
+        swept = invocation.sweep(range(3), Keep, z=(0, 100))
+        for item in [invocation, again] + swept:
+            await completion(item)
+        assert (invocation.result, again.result) == (6, 14)
+        assert [item.result for item in swept] == [2, 102, 3, 103, 4, 104]
+
+    loop.run_until_complete(scenario())
@@ -0,0 +1,83 @@
+################################################################################
+# MIT License
+#
+# Copyright (c) 2017 OpenDNA Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################################
+import gc
+
+from opendna.autobahn.repl.mixins import ManagesNames, TracksItems
+
+__author__ = 'Adam Jorgensen <adam.jorgensen.za@gmail.com>'
+
+
+class Tracker(TracksItems, ManagesNames):
+    def __init__(self, keep: str, max_items: int=None):
+        self.__init_manages_names__()
+        self.__init_tracks_items__(keep, max_items)
+
+
+def track(tracker: Tracker, item) -> str:
+    tracker._track(item)
+    return tracker.name_for(item)
+
+
+class Item(object):
+    pass
+
+
+def test_keep_all_retains_every_item():
+    tracker = Tracker('all')
+    names = [track(tracker, Item()) for _ in range(3)]
+    assert all(name in tracker for name in names)
+    assert isinstance(tracker[names[0]], Item)
+
+
+def test_keep_failures_retains_only_failed_items():
+    tracker = Tracker('failures')
+    succeeded, failed = Item(), Item()
+    succeeded_name = track(tracker, succeeded)
+    failed_name = track(tracker, failed)
+    assert tracker[succeeded_name] is succeeded
+    tracker._completed(succeeded, False)
+    tracker._completed(failed, True)
+    del succeeded, failed
+    gc.collect()
+    assert succeeded_name not in tracker
+    assert isinstance(tracker[failed_name], Item)
+
+
+def test_keep_none_tracks_items_while_referenced():
+    tracker = Tracker('none')
+    item = Item()
+    name = track(tracker, item)
+    assert tracker.name_for(item) == name
+    assert list(dir(tracker)) == [name]
+    del item
+    gc.collect()
+    assert name not in tracker
+    assert list(dir(tracker)) == []
+
+
+def test_max_items_bounds_retained_items():
+    tracker = Tracker('all', max_items=2)
+    names = [track(tracker, Item()) for _ in range(3)]
+    gc.collect()
+    assert [name in tracker for name in names] == [False, True, True]